@@ -0,0 +1,114 @@
+import argparse
+import http.client
+import json
+import random
+import threading
+import time
+from collections import Counter
+from typing import List
+from urllib.parse import quote
+
+RESOURCES = ["vegetables", "species", "dishes"]
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))
+    return sorted_values[index]
+
+
+def build_paths(host: str, port: int, detail: bool) -> List[str]:
+    """各リソースのキー一覧を取得し、リクエストするパスの一覧を作る。"""
+    conn = http.client.HTTPConnection(host, port, timeout=10)
+    paths = ["/api/index"]
+    for resource in RESOURCES:
+        conn.request("GET", f"/api/{resource}")
+        keys = json.loads(conn.getresponse().read())
+        for key in keys:
+            path = f"/api/{resource}/{quote(key)}"
+            paths.append(path)
+            if detail and resource != "dishes":
+                paths.append(path + "/detail")
+    conn.close()
+    return paths
+
+
+def worker(host, port, paths, deadline, gzip, etag_ratio, latencies, statuses, lock):
+    """keep-alive の接続1本で、deadline までランダムなパスを取得し続ける。"""
+    rng = random.Random()
+    conn = http.client.HTTPConnection(host, port, timeout=10)
+    etags = {}
+    local_latencies = []
+    local_statuses = Counter()
+    while time.perf_counter() < deadline:
+        path = rng.choice(paths)
+        headers = {"Accept-Encoding": "gzip"} if gzip else {}
+        if path in etags and rng.random() < etag_ratio:
+            headers["If-None-Match"] = etags[path]
+        start = time.perf_counter()
+        try:
+            conn.request("GET", path, headers=headers)
+            response = conn.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            local_statuses["error"] += 1
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=10)
+            continue
+        local_latencies.append(time.perf_counter() - start)
+        local_statuses[response.status] += 1
+        if response.getheader("ETag"):
+            etags[path] = response.getheader("ETag")
+    conn.close()
+    with lock:
+        latencies.extend(local_latencies)
+        statuses.update(local_statuses)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ローカルの Vegitage API に負荷をかけ、rps と遅延を測る")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--concurrency", type=int, default=16, help="同時接続数（スレッド数）")
+    parser.add_argument("--duration", type=float, default=10.0, help="計測時間（秒）")
+    parser.add_argument("--detail", action="store_true", help="詳細データも対象にする")
+    parser.add_argument("--no-gzip", action="store_true", help="Accept-Encoding: gzip を送らない")
+    parser.add_argument("--etag-ratio", type=float, default=0.0, help="If-None-Match を付ける割合 (0〜1)")
+    args = parser.parse_args()
+
+    paths = build_paths(args.host, args.port, args.detail)
+    print(f"{len(paths)}件のパスに対して、{args.concurrency}並列で{args.duration}秒間リクエストします。")
+
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.duration
+    threads = [
+        threading.Thread(
+            target=worker,
+            args=(args.host, args.port, paths, deadline, not args.no_gzip, args.etag_ratio,
+                  latencies, statuses, lock),
+        )
+        for _ in range(args.concurrency)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"リクエスト数: {len(latencies):,}  ({len(latencies) / elapsed:,.0f} req/s)")
+    print(
+        f"遅延: p50 {percentile(latencies, 50) * 1000:.2f} ms, "
+        f"p95 {percentile(latencies, 95) * 1000:.2f} ms, "
+        f"p99 {percentile(latencies, 99) * 1000:.2f} ms, "
+        f"max {(latencies[-1] if latencies else 0) * 1000:.2f} ms"
+    )
+    print(f"ステータス: {dict(statuses)}")
+
+
+if __name__ == "__main__":
+    main()
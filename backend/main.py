@@ -0,0 +1,147 @@
+import os
+import sys
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+from fastapi import FastAPI, HTTPException, Request, Response
+
+from record_store import INDEX_KEY, RecordStore
+
+# 検索エンジンはデータ処理側の正規化 (search_index.normalize_key) を共有する
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "data_processing" / "2_scripts"))
+from facet_index import FACETS, FacetIndex  # noqa: E402
+from search_engine import SearchEngine  # noqa: E402
+
+# -----------------------------
+# 設定（環境変数）
+# -----------------------------
+# 5_app_data と同じ構成のディレクトリ（vegetable_summary/, species_detail/, ..., _index.json）
+DATA_DIR = Path(os.getenv("VEGITAGE_DATA_DIR", "/var/data/vegitage/ja"))
+# 0 なら起動時に全件を読み込む。正の数なら最近使われたその件数だけを保持する
+CACHE_SIZE = int(os.getenv("VEGITAGE_CACHE_SIZE", "0"))
+CACHE_CONTROL = os.getenv("VEGITAGE_CACHE_CONTROL", "public, max-age=300")
+# 6_dish_facet_index.py が作る料理の絞り込み用索引。なければ起動時に dish_data から作る
+FACET_INDEX_FILE = DATA_DIR / "_dish_facet_index.json"
+
+# URL のリソース名 → (概要のコレクション, 詳細のコレクション)
+RESOURCES = {
+    "vegetables": ("vegetable_summary", "vegetable_detail"),
+    "species": ("species_summary", "species_detail"),
+    "varieties": ("varieties_summary", "varieties_detail"),
+    "dishes": ("dish_data", None),
+    "regional-dishes": ("dish_regional_data", None),
+}
+
+# URL のリソース名 → 関係グラフのコレクション（/api/{resource}/{key}/links）
+LINKS = {
+    "vegetables": "vegetable_links",
+    "species": "vegetable_links",
+    "varieties": "variety_links",
+    "dishes": "dish_links",
+    "regions": "region_links",
+}
+
+store = RecordStore(DATA_DIR, max_cached=CACHE_SIZE or None)
+search_engine = SearchEngine()
+dish_facets = FacetIndex([], {}, {})
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global search_engine, dish_facets
+    search_engine = SearchEngine.from_app_data(DATA_DIR)
+    print(f"{len(search_engine.documents)}件（検索キー {len(search_engine)}件）の検索索引を作成しました。")
+    if FACET_INDEX_FILE.exists():
+        dish_facets = FacetIndex.load(FACET_INDEX_FILE)
+    else:
+        dish_facets = FacetIndex.from_app_data(DATA_DIR)
+    print(f"料理 {len(dish_facets)}件の絞り込み索引を読み込みました。")
+    if CACHE_SIZE == 0:
+        count = store.preload()
+        print(f"{DATA_DIR} から {count}件を読み込みました。")
+    yield
+
+
+app = FastAPI(title="Vegitage API", docs_url=None, redoc_url=None, lifespan=lifespan)
+
+
+def _if_none_match(request: Request):
+    header = request.headers.get("if-none-match")
+    if not header:
+        return set()
+    return {tag.strip().removeprefix("W/") for tag in header.split(",")}
+
+
+def _respond(request: Request, collection: str, key: str) -> Response:
+    record = store.get(collection, key)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+    use_gzip = "gzip" in request.headers.get("accept-encoding", "")
+    etag = record.gzip_etag if use_gzip else record.etag
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL, "Vary": "Accept-Encoding"}
+
+    tags = _if_none_match(request)
+    if tags and ({record.etag, record.gzip_etag, "*"} & tags):
+        return Response(status_code=304, headers=headers)
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=record.gzip_body, media_type="application/json", headers=headers)
+    return Response(content=record.body, media_type="application/json", headers=headers)
+
+
+@app.get("/api/health")
+async def health():
+    return store.info()
+
+
+@app.get("/api/index")
+async def get_index(request: Request):
+    return _respond(request, *INDEX_KEY)
+
+
+@app.get("/api/search")
+async def search(q: str = "", limit: int = 20, fuzzy: bool = True):
+    limit = max(1, min(limit, 100))
+    return [result.to_dict() for result in search_engine.search(q, limit=limit, fuzzy=fuzzy)]
+
+
+@app.get("/api/dish-facets")
+async def search_dishes(
+    region: str = "", language: str = "", alias: str = "", ingredient: str = "", limit: int = 20, offset: int = 0,
+):
+    limit = max(1, min(limit, 100))
+    result = dish_facets.match(region=region, language=language, alias=alias, ingredient=ingredient)
+    return {
+        "total": result.bit_count(),
+        "results": dish_facets.page(result, limit, max(0, offset)),
+        "facets": {facet: dish_facets.facet_counts(result, facet) for facet in FACETS if dish_facets.labels.get(facet)},
+    }
+
+
+@app.get("/api/{resource}")
+async def list_keys(resource: str):
+    if resource not in RESOURCES:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return store.keys(RESOURCES[resource][0])
+
+
+@app.get("/api/{resource}/{key}")
+async def get_summary(resource: str, key: str, request: Request):
+    if resource not in RESOURCES:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return _respond(request, RESOURCES[resource][0], key)
+
+
+@app.get("/api/{resource}/{key}/detail")
+async def get_detail(resource: str, key: str, request: Request):
+    if resource not in RESOURCES or RESOURCES[resource][1] is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return _respond(request, RESOURCES[resource][1], key)
+
+
+@app.get("/api/{resource}/{key}/links")
+async def get_links(resource: str, key: str, request: Request):
+    if resource not in LINKS:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return _respond(request, LINKS[resource], key)
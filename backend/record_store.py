@@ -0,0 +1,122 @@
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional, Tuple
+
+# API で公開するコレクション（5_app_data のサブディレクトリ）
+COLLECTIONS = (
+    "vegetable_summary",
+    "vegetable_detail",
+    "species_summary",
+    "species_detail",
+    "varieties_summary",
+    "varieties_detail",
+    "dish_data",
+    "dish_regional_data",
+    # 関係グラフ（6_relationship_graph.py）のノードごとの隣接リスト
+    "vegetable_links",
+    "variety_links",
+    "dish_links",
+    "region_links",
+)
+INDEX_KEY = ("", "_index")
+
+GZIP_LEVEL = 6
+
+
+class Record(NamedTuple):
+    """レスポンスにそのまま書けるよう、シリアライズ・圧縮済みの1レコード。"""
+    body: bytes
+    gzip_body: bytes
+    etag: str       # 非圧縮の表現用
+    gzip_etag: str  # gzip の表現用（表現ごとに異なる強い ETag にする）
+
+
+def make_record(data_bytes: bytes) -> Record:
+    """JSON のバイト列を最小化し、gzip 版と内容ハッシュの ETag を添えて返す。"""
+    body = json.dumps(json.loads(data_bytes), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    digest = hashlib.sha256(body).hexdigest()[:32]
+    return Record(
+        body=body,
+        gzip_body=gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0),
+        etag=f'"{digest}"',
+        gzip_etag=f'"{digest}-gz"',
+    )
+
+
+class RecordStore:
+    """
+    5_app_data と同じ構成のデータディレクトリからレコードを読み、メモリに保持する。
+
+    max_cached=None なら起動時に全件を読み込む（全体で数十MB程度なので、通常はこちら）。
+    数値を指定した場合は、最近使われた max_cached 件だけを保持する LRU キャッシュになる。
+    ヒット時は辞書を1回引くだけで、JSON の解析も圧縮も行わない。
+    """
+
+    def __init__(self, data_dir: Path, max_cached: Optional[int] = None):
+        self.data_dir = data_dir
+        self.max_cached = max_cached
+        self._records: "OrderedDict[Tuple[str, str], Record]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "loaded": 0}
+
+    def _path(self, collection: str, key: str) -> Optional[Path]:
+        if (collection, key) == INDEX_KEY:
+            return self.data_dir / "_index.json"
+        # パス区切りや ".." を含むキーでデータディレクトリの外を読ませない
+        if collection not in COLLECTIONS or not key or key.startswith(".") or Path(key).name != key:
+            return None
+        return self.data_dir / collection / f"{key}.json"
+
+    def preload(self) -> int:
+        """全コレクションを読み込み、件数を返す。"""
+        count = 0
+        for collection in COLLECTIONS:
+            for file_path in sorted((self.data_dir / collection).glob("*.json")):
+                self._records[(collection, file_path.stem)] = make_record(file_path.read_bytes())
+                count += 1
+        index_file = self.data_dir / "_index.json"
+        if index_file.exists():
+            self._records[INDEX_KEY] = make_record(index_file.read_bytes())
+            count += 1
+        self.stats["loaded"] = count
+        return count
+
+    def get(self, collection: str, key: str) -> Optional[Record]:
+        cache_key = (collection, key)
+        record = self._records.get(cache_key)
+        if record is not None:
+            self.stats["hits"] += 1
+            if self.max_cached is not None:
+                with self._lock:
+                    if cache_key in self._records:
+                        self._records.move_to_end(cache_key)
+            return record
+
+        self.stats["misses"] += 1
+        if self.max_cached is None and self.stats["loaded"]:
+            return None  # 全件読み込み済みなら、無いものは無い
+        path = self._path(collection, key)
+        if path is None or not path.is_file():
+            return None
+        record = make_record(path.read_bytes())
+        if self.max_cached is None:
+            self._records[cache_key] = record
+            return record
+        with self._lock:
+            self._records[cache_key] = record
+            while len(self._records) > self.max_cached:
+                self._records.popitem(last=False)
+        return record
+
+    def keys(self, collection: str):
+        """コレクション内のキー一覧（ファイル名順）。"""
+        if collection not in COLLECTIONS:
+            return []
+        return sorted(p.stem for p in (self.data_dir / collection).glob("*.json"))
+
+    def info(self) -> Dict[str, int]:
+        return dict(self.stats, cached=len(self._records))
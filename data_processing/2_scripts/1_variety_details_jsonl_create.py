@@ -1,6 +1,10 @@
+import argparse
 import json
 
 import config
+import instrumentation
+import response_cache
+from prompt_compaction import estimate_tokens
 
 # ディレクトリ
 IN_JSON = config.INPUT_LISTS / "varieties_list_ja_0.json"
@@ -18,7 +22,9 @@ PROMPT_SPECIAL_FILE = PROMPT_DIR / "3_special.md"
 PROMPT_SPECIAL = PROMPT_SPECIAL_FILE.read_text(encoding="utf-8")
 
 
-def main():
+@instrumentation.instrumented("variety_details_jsonl", outputs=[OUTPUT_FILE])
+def main(only_misses=False):
+    """only_misses=True の場合、応答キャッシュにないリクエストだけを JSONL に出力する。"""
     rec_num = START_NUM
     with open(IN_JSON, 'r', encoding='utf-8') as f:
         data = json.load(f)
@@ -50,6 +56,15 @@ def main():
             },
         })
 
+    if only_misses:
+        request_list = response_cache.drop_cached_requests(request_list, OUTPUT_FILE)
+
+    metrics = instrumentation.current()
+    if metrics is not None:
+        for request in request_list:
+            metrics.count("records")
+            metrics.count("prompt_tokens", estimate_tokens(request["request"]["contents"][0]["parts"][0]["text"]))
+
     with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
         for request in request_list:
             f.write(json.dumps(request, ensure_ascii=False) + "\n")
@@ -59,4 +74,7 @@ def main():
     print("\n--- 処理終了 ---")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--only-misses", action="store_true", help="応答キャッシュにないリクエストだけを出力する")
+    args = parser.parse_args()
+    main(only_misses=args.only_misses)
\ No newline at end of file
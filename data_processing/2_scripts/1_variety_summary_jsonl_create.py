@@ -1,22 +1,55 @@
+import argparse
 import json
 
 import config
+import instrumentation
+import response_cache
+from prompt_compaction import CompactionReport, PromptCompactor, estimate_tokens
+from species_repository import SpeciesRepository
 
 # ディレクトリ
 IN_DIR = config.RAW_DATA / "varieties_detail"
 PROMPT_DIR = config.PROMPTS_DIR / "5_varieties_summary"
 SPECIES_DIR = config.PROCESSING_DATA / "species_detail"
 OUTPUT_FILE = config.INPUT_LISTS / "varieties_summary_0.jsonl"
+COMPACTION_REPORT_FILE = config.INPUT_LISTS / "varieties_summary_0_compaction.json"
 
 PROMPT_SYSTEM_FILE = PROMPT_DIR / "1_system.txt"
 PROMPT_SYSTEM = PROMPT_SYSTEM_FILE.read_text(encoding="utf-8")
 PROMPT_SCHEME_FILE = PROMPT_DIR / "2_schema.json"
 PROMPT_SCHEME = PROMPT_SCHEME_FILE.read_text(encoding="utf-8")
 
+# 親品目の detail は1件数十KBあり品目数も増え続けるため、最近使った分だけ保持する
+SPECIES_CACHE_SIZE = 64
 
-def main():
+
+def build_prompt(variety_detail_data, species_detail_data):
+    prompt = PROMPT_SYSTEM.format(
+        VARIETY_DETAIL_DATA=variety_detail_data,
+        SPECIES_DETAIL_DATA=species_detail_data,
+    )
+    prompt += f"\n'''\n{PROMPT_SCHEME}\n'''\n"
+    return prompt
+
+
+@instrumentation.instrumented("variety_summary_jsonl", outputs=[OUTPUT_FILE])
+def main(only_misses=False, compact=False, token_budget=None):
+    """
+    only_misses=True の場合、応答キャッシュにないリクエストだけを JSONL に出力する。
+    compact=True の場合、埋め込む JSON を最小化・不要項目の削除をしてから埋め込み、
+    token_budget（概算トークン数）を超えないように削る。削っても超えるリクエストは出力しない（レポートに記録する）。
+    """
     response_files = list(IN_DIR.glob("*.json"))
     print(f'{len(response_files)}件の処理を開始')
+    species_details = SpeciesRepository(SPECIES_DIR, max_cached=SPECIES_CACHE_SIZE)
+    compactor = None
+    report = CompactionReport()
+    if compact or token_budget is not None:
+        compactor = PromptCompactor(
+            PROMPT_SCHEME_FILE,
+            token_budget=token_budget,
+            overhead_tokens=estimate_tokens(build_prompt("", "")),
+        )
     request_list = []
     for file_path in response_files:
         try:
@@ -25,14 +58,17 @@ def main():
                 data = json.loads(variety_detail_data)
                 variety_profile = data.get("variety_profile", {})
                 parent_species_url = variety_profile.get("parent_species_url")
-            with open(SPECIES_DIR / f"{parent_species_url}.json", 'r', encoding='utf-8') as f:
-                species_detail_data = f.read()
-
-            prompt = PROMPT_SYSTEM.format(
-                VARIETY_DETAIL_DATA=variety_detail_data,
-                SPECIES_DETAIL_DATA=species_detail_data,
-            )
-            prompt += f"\n'''\n{PROMPT_SCHEME}\n'''\n"
+            species_detail_data = species_details.get_text(parent_species_url)
+
+            prompt = build_prompt(variety_detail_data, species_detail_data)
+            if compactor is not None:
+                compacted = compactor.compact(data, species_details.get(parent_species_url))
+                compacted_prompt = build_prompt(compacted.variety_text, compacted.species_text)
+                report.add(file_path.name, prompt, compacted_prompt, compacted)
+                if compacted.over_budget:
+                    print(f"⚠️ {file_path.name}: 切り詰めても予算 {token_budget:,} tokens を超えるため除外します")
+                    continue
+                prompt = compacted_prompt
             request_list.append({
                 "key": file_path.name,
                 "request": {
@@ -43,13 +79,34 @@ def main():
             print(f"{file_path.name}: {e}")
             continue
 
+    if only_misses:
+        request_list = response_cache.drop_cached_requests(request_list, OUTPUT_FILE)
+
+    metrics = instrumentation.current()
+    if metrics is not None:
+        for request in request_list:
+            metrics.count("records")
+            metrics.count("prompt_tokens", estimate_tokens(request["request"]["contents"][0]["parts"][0]["text"]))
+
     with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
         for request in request_list:
             f.write(json.dumps(request, ensure_ascii=False) + "\n")
 
     print("--------------------------------------")
+    if compactor is not None:
+        report.save(COMPACTION_REPORT_FILE)
+        report.print_summary()
+        print(f"圧縮レポート: {COMPACTION_REPORT_FILE}")
+        skipped = report.over_budget_keys()
+        if skipped:
+            print(f"⚠️ 予算を超えた {len(skipped)}件を除外しました: {', '.join(skipped)}")
     print(f"{len(request_list)}件処理しました")
     print("\n--- 処理終了 ---")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--only-misses", action="store_true", help="応答キャッシュにないリクエストだけを出力する")
+    parser.add_argument("--compact", action="store_true", help="埋め込む JSON を最小化し、不要な項目を削除する")
+    parser.add_argument("--token-budget", type=int, default=None, help="1リクエストの概算トークン数の上限（--compact を含む）")
+    args = parser.parse_args()
+    main(only_misses=args.only_misses, compact=args.compact, token_budget=args.token_budget)
\ No newline at end of file
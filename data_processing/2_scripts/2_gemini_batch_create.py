@@ -1,94 +1,318 @@
-import google.genai as genai
-from google.genai import types
-from dotenv import load_dotenv
-import time
+import argparse
+import asyncio
+import hashlib
+import json
+import shutil
+from pathlib import Path
+from typing import Any, Dict, List, Optional
 
 import config
+import instrumentation
+
+try:
+    import httpx
+except ImportError:  # google-genai の依存。無い環境では通信エラーを組み込み例外だけで判定する
+    httpx = None
 
 INPUT_FILE = config.INPUT_LISTS / "varieties_summary_0.jsonl"
-OUTPUT_FLILE = config.RAW_RESPONSES / "varieties_summary_0.jsonl"
+OUTPUT_FILE = config.RAW_RESPONSES / "varieties_summary_0.jsonl"
+SHARD_DIR = config.RAW_RESPONSES / "shards"
+STATE_FILE = config.RAW_RESPONSES / "batch_state.json"
+
+MODEL = config.GEMINI_MODEL
+MAX_SHARD_BYTES = 100 * 1024 * 1024
+MAX_CONCURRENCY = 4
+POLL_INTERVAL = 30       # 秒。ジョブごとに1.5倍ずつ延ばす
+MAX_POLL_INTERVAL = 600
+MAX_API_RETRIES = 5      # 一時的なエラー（429 / 5xx / 通信エラー）を再試行する回数
+TRANSIENT_STATUS_CODES = {408, 429, 500, 502, 503, 504}
 
-load_dotenv()
-client = genai.Client()
+COMPLETED_STATES = {
+    'JOB_STATE_SUCCEEDED',
+    'JOB_STATE_FAILED',
+    'JOB_STATE_CANCELLED',
+    'JOB_STATE_EXPIRED',
+}
 
-# Upload the file to the File API
-uploaded_file = client.files.upload(
-    file=INPUT_FILE,
-    config=types.UploadFileConfig(display_name='my-batch-requests', mime_type='jsonl')
-)
 
-print(f"Uploaded file: {uploaded_file.name}")
+def split_into_shards(input_file: Path, shard_dir: Path, max_bytes: int = MAX_SHARD_BYTES) -> List[Path]:
+    """
+    リクエスト JSONL を1行ずつ読み、max_bytes を超えないシャードに分割する。
+    1行が max_bytes を超える場合は、その行だけで1シャードにする。
+    """
+    shard_dir.mkdir(parents=True, exist_ok=True)
+    for old in shard_dir.glob(f"{input_file.stem}_*.jsonl"):
+        old.unlink()
 
-# Assumes `uploaded_file` is the file object from the previous step
-file_batch_job = client.batches.create(
-    model="gemini-2.5-pro",
-    src=uploaded_file.name,
-    config={
-        'display_name': "file-upload-job-1",
-    },
-)
+    shards: List[Path] = []
+    out = None
+    size = 0
+    try:
+        with open(input_file, 'rb') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                if out is None or (size and size + len(line) > max_bytes):
+                    if out is not None:
+                        out.close()
+                    shard = shard_dir / f"{input_file.stem}_{len(shards):03d}.jsonl"
+                    shards.append(shard)
+                    out = open(shard, 'wb')
+                    size = 0
+                out.write(line)
+                size += len(line)
+    finally:
+        if out is not None:
+            out.close()
+    return shards
 
-print(f"Created batch job: {file_batch_job.name}")
 
+def _sha256(file_path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
 
-# Use the name of the job you want to check
-# e.g., inline_batch_job.name from the previous ste
 
-job_name = file_batch_job.name
-batch_job = client.batches.get(name=job_name)
+def is_transient(error: Exception) -> bool:
+    """再試行すれば通る可能性のあるエラーか（google.genai.errors.APIError は code を持つ）。"""
+    code = getattr(error, "code", None)
+    if isinstance(code, int):
+        return code in TRANSIENT_STATUS_CODES
+    if httpx is not None and isinstance(error, httpx.TransportError):
+        return True
+    return isinstance(error, (ConnectionError, TimeoutError))
 
-completed_states = set([
-    'JOB_STATE_SUCCEEDED',
-    'JOB_STATE_FAILED',
-    'JOB_STATE_CANCELLED',
-    'JOB_STATE_EXPIRED',
-])
-
-print(f"Polling status for job: {job_name}")
-batch_job = client.batches.get(name=job_name) # Initial get
-while batch_job.state.name not in completed_states:
-  print(f"Current state: {batch_job.state.name}")
-  time.sleep(60) # Wait for 30 seconds before polling again
-  batch_job = client.batches.get(name=job_name)
-
-print(f"Job finished with state: {batch_job.state.name}")
-if batch_job.state.name == 'JOB_STATE_FAILED':
-    print(f"Error: {batch_job.error}")
-
-batch_job = client.batches.get(name=job_name)
-
-if batch_job.state.name == 'JOB_STATE_SUCCEEDED':
-
-    # If batch job was created with a file
-    if batch_job.dest and batch_job.dest.file_name:
-        # Results are in a file
-        result_file_name = batch_job.dest.file_name
-        print(f"Results are in file: {result_file_name}")
-
-        print("Downloading result file content...")
-        file_content = client.files.download(file=result_file_name)
-        # Process file_content (bytes) as needed
-        with open(OUTPUT_FLILE, 'wb') as f:
-            f.write(file_content)
-
-    # If batch job was created with inline request
-    # (for embeddings, use batch_job.dest.inlined_embed_content_responses)
-    elif batch_job.dest and batch_job.dest.inlined_responses:
-        # Results are inline
-        print("Results are inline:")
-        for i, inline_response in enumerate(batch_job.dest.inlined_responses):
-            print(f"Response {i+1}:")
-            if inline_response.response:
-                # Accessing response, structure may vary.
-                try:
-                    print(inline_response.response.text)
-                except AttributeError:
-                    print(inline_response.response) # Fallback
-            elif inline_response.error:
-                print(f"Error: {inline_response.error}")
-    else:
-        print("No results found (neither file nor inline).")
-else:
-    print(f"Job did not succeed. Final state: {batch_job.state.name}")
-    if batch_job.error:
-        print(f"Error: {batch_job.error}")
\ No newline at end of file
+
+def _state_name(job) -> str:
+    """SDK の列挙型でも、テスト用クライアントの文字列でも状態名を返す。"""
+    return getattr(job.state, "name", job.state)
+
+
+class BatchState:
+    """
+    シャードごとのアップロード名・ジョブ名・結果ファイルを記録する状態ファイル。
+    途中で落ちても、再実行時に作成済みのジョブを引き継いでポーリングから再開できる。
+    入力ファイルの内容が変わっていた場合は最初からやり直す。
+    """
+
+    def __init__(self, state_file: Path, input_hash: str):
+        self.state_file = state_file
+        self.data: Dict[str, Any] = {"input_sha256": input_hash, "shards": {}}
+        if state_file.exists():
+            with open(state_file, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            if saved.get("input_sha256") == input_hash:
+                self.data = saved
+            else:
+                print("入力ファイルが前回と異なるため、新しいバッチとして実行します。")
+
+    def shard(self, name: str) -> Dict[str, Any]:
+        return self.data["shards"].setdefault(name, {})
+
+    def save(self):
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_file.with_suffix(".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=2)
+        tmp_path.replace(self.state_file)
+
+
+class BatchSubmitter:
+    """
+    シャードを並行してアップロード・ジョブ作成し、1つのイベントループで全ジョブをポーリングする。
+
+    client は google.genai.Client 互換のオブジェクト
+    （files.upload / files.download / batches.create / batches.get）であればよく、
+    ローカルの偽バッチサービスに差し替えて動作確認できる。
+    SDK は同期 API なので、呼び出しは asyncio.to_thread で逃がす。
+    """
+
+    def __init__(
+        self,
+        client,
+        state: BatchState,
+        model: str = MODEL,
+        max_concurrency: int = MAX_CONCURRENCY,
+        poll_interval: float = POLL_INTERVAL,
+        max_poll_interval: float = MAX_POLL_INTERVAL,
+        max_api_retries: int = MAX_API_RETRIES,
+    ):
+        self.client = client
+        self.state = state
+        self.model = model
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.max_api_retries = max_api_retries
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run(self, shards: List[Path]) -> List[Optional[Path]]:
+        """
+        全シャードを処理し、シャード順に結果ファイル（失敗時は None）を返す。
+        1つのシャードで API エラーが起きても、ほかのシャードのポーリングは続ける。
+        """
+        results = await asyncio.gather(*(self._process_shard(shard) for shard in shards), return_exceptions=True)
+        for shard, result in zip(shards, results):
+            if isinstance(result, BaseException):
+                if not isinstance(result, Exception):
+                    raise result
+                print(f"[{shard.name}] API エラーのため中断しました（再実行すると続きから処理します）: {result}")
+        return [None if isinstance(result, BaseException) else result for result in results]
+
+    async def _call(self, shard_name: str, func, **kwargs):
+        """SDK の呼び出しを別スレッドで実行し、一時的なエラーはポーリングと同じ間隔で延ばしながら再試行する。"""
+        interval = self.poll_interval
+        for attempt in range(self.max_api_retries + 1):
+            try:
+                return await asyncio.to_thread(func, **kwargs)
+            except Exception as e:
+                if attempt == self.max_api_retries or not is_transient(e):
+                    raise
+                print(f"[{shard_name}] 一時的なエラーのため {interval:.0f}秒後に再試行します: {e}")
+                await asyncio.sleep(interval)
+                interval = min(interval * 1.5, self.max_poll_interval)
+
+    async def _process_shard(self, shard: Path) -> Optional[Path]:
+        entry = self.state.shard(shard.name)
+        result_path = shard.with_suffix(".result.jsonl")
+        if entry.get("result") and result_path.exists():
+            print(f"[{shard.name}] 取得済みの結果を使用します")
+            return result_path
+
+        if not entry.get("job"):
+            async with self._semaphore:
+                if not entry.get("file"):
+                    uploaded_file = await self._call(
+                        shard.name, self.client.files.upload,
+                        file=shard,
+                        config={'display_name': shard.stem, 'mime_type': 'jsonl'},
+                    )
+                    entry["file"] = uploaded_file.name
+                    self.state.save()
+                    print(f"[{shard.name}] Uploaded file: {uploaded_file.name}")
+                batch_job = await self._call(
+                    shard.name, self.client.batches.create,
+                    model=self.model,
+                    src=entry["file"],
+                    config={'display_name': shard.stem},
+                )
+                entry["job"] = batch_job.name
+                self.state.save()
+                print(f"[{shard.name}] Created batch job: {batch_job.name}")
+
+        batch_job = await self._wait(shard.name, entry["job"])
+        entry["state"] = _state_name(batch_job)
+        if entry["state"] != 'JOB_STATE_SUCCEEDED':
+            # 終了したジョブは再開できないので、次回の実行でアップロードからやり直す
+            # （アップロードしたファイルも期限切れになっている可能性がある）
+            entry.pop("job", None)
+            entry.pop("file", None)
+            self.state.save()
+            print(f"[{shard.name}] Job did not succeed. Final state: {entry['state']}")
+            if batch_job.error:
+                print(f"[{shard.name}] Error: {batch_job.error}")
+            return None
+        self.state.save()
+        if not (batch_job.dest and batch_job.dest.file_name):
+            print(f"[{shard.name}] 結果ファイルがありません（inline 結果には未対応）。")
+            return None
+
+        async with self._semaphore:
+            await self._call(shard.name, self._download, file_name=batch_job.dest.file_name, result_path=result_path)
+        entry["result"] = str(result_path)
+        self.state.save()
+        print(f"[{shard.name}] Results saved: {result_path}")
+        return result_path
+
+    async def _wait(self, shard_name: str, job_name: str):
+        interval = self.poll_interval
+        batch_job = await self._call(shard_name, self.client.batches.get, name=job_name)
+        while _state_name(batch_job) not in COMPLETED_STATES:
+            print(f"[{shard_name}] Current state: {_state_name(batch_job)}")
+            await asyncio.sleep(interval)
+            interval = min(interval * 1.5, self.max_poll_interval)
+            batch_job = await self._call(shard_name, self.client.batches.get, name=job_name)
+        return batch_job
+
+    def _download(self, file_name: str, result_path: Path):
+        """
+        結果を一時ファイルに書いてから置き換える（途中で落ちても壊れた結果を残さない）。
+        google-genai の files.download はストリーミングに対応しておらず、結果全体を bytes で返す。
+        チャンクの反復可能オブジェクトを返すクライアントなら、そのまま1チャンクずつディスクに書く。
+        """
+        tmp_path = result_path.with_suffix(".part")
+        content = self.client.files.download(file=file_name)
+        with open(tmp_path, 'wb') as f:
+            if isinstance(content, (bytes, bytearray)):
+                f.write(content)
+            else:
+                for chunk in content:
+                    f.write(chunk)
+        tmp_path.replace(result_path)
+
+
+def merge_results(result_files: List[Path], output_file: Path):
+    """シャードの結果をシャード順に1つの JSONL へストリーミングで連結する。"""
+    with open(output_file, 'wb') as out:
+        for result_file in result_files:
+            with open(result_file, 'rb') as f:
+                shutil.copyfileobj(f, out)
+
+
+@instrumentation.instrumented("gemini_batch", outputs=[config.RAW_RESPONSES])
+def main(
+    client=None,
+    input_file: Path = INPUT_FILE,
+    output_file: Path = OUTPUT_FILE,
+    state_file: Path = STATE_FILE,
+    max_shard_bytes: int = MAX_SHARD_BYTES,
+    max_concurrency: int = MAX_CONCURRENCY,
+    poll_interval: float = POLL_INTERVAL,
+    model: str = MODEL,
+):
+    if client is None:
+        api_key = config.require_api_key("GOOGLE_API_KEY")
+        import google.genai as genai
+        client = genai.Client(api_key=api_key)
+
+    state = BatchState(state_file, _sha256(input_file))
+    shard_dir = state_file.parent / SHARD_DIR.name
+    shards = sorted(shard_dir.glob(f"{input_file.stem}_*.jsonl"))
+    shards = [s for s in shards if not s.name.endswith(".result.jsonl")]
+    if not state.data["shards"] or not shards:
+        shards = split_into_shards(input_file, shard_dir, max_shard_bytes)
+    print(f"{len(shards)}個のシャードで実行します")
+
+    submitter = BatchSubmitter(
+        client, state, model=model, max_concurrency=max_concurrency, poll_interval=poll_interval,
+    )
+    results = asyncio.run(submitter.run(shards))
+
+    failed = [shard.name for shard, result in zip(shards, results) if result is None]
+    if failed:
+        print(f"失敗したシャード: {', '.join(failed)}（再実行すると未完了のシャードのみ処理します）")
+        return None
+
+    merge_results(results, output_file)
+    print(f"結果を {output_file} に保存しました。")
+    return output_file
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gemini バッチジョブをシャード分割して投入・回収する")
+    parser.add_argument("--input", type=Path, default=INPUT_FILE)
+    parser.add_argument("--output", type=Path, default=OUTPUT_FILE)
+    parser.add_argument("--max-shard-mb", type=int, default=MAX_SHARD_BYTES // (1024 * 1024))
+    parser.add_argument("--concurrency", type=int, default=MAX_CONCURRENCY)
+    parser.add_argument("--poll-interval", type=float, default=POLL_INTERVAL)
+    parser.add_argument("--model", default=MODEL)
+    args = parser.parse_args()
+    main(
+        input_file=args.input,
+        output_file=args.output,
+        max_shard_bytes=args.max_shard_mb * 1024 * 1024,
+        max_concurrency=args.concurrency,
+        poll_interval=args.poll_interval,
+        model=args.model,
+    )
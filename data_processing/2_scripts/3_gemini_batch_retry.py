@@ -0,0 +1,164 @@
+import argparse
+import json
+from pathlib import Path
+from typing import Optional, Set
+
+import config
+import instrumentation
+import parallel
+import schema_validation
+from pipeline import load_stage_module
+
+REQUEST_FILE = config.INPUT_LISTS / "varieties_summary_0.jsonl"
+RESULT_FILE = config.RAW_RESPONSES / "varieties_summary_0.jsonl"
+MAX_RETRIES = 3
+
+
+def request_keys(request_file: Path) -> Set[str]:
+    keys = set()
+    with open(request_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                keys.add(json.loads(line)["key"])
+    return keys
+
+
+def failed_keys(result_file: Path) -> Set[str]:
+    """3_gemini_batch_to_files.py が書き出した再送リストのキー。"""
+    retry_file = schema_validation.retry_list_file(result_file)
+    if not retry_file.exists():
+        return set()
+    with open(retry_file, 'r', encoding='utf-8') as f:
+        return {json.loads(line)["key"] for line in f if line.strip()}
+
+
+def result_keys(result_file: Path) -> Set[str]:
+    """バッチ結果 JSONL に応答があるキー。"""
+    keys = set()
+    with open(result_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                try:
+                    keys.add(json.loads(line).get("key"))
+                except json.JSONDecodeError:
+                    continue
+    return keys
+
+
+def pending_keys(keys: Set[str], result_file: Optional[Path]) -> Set[str]:
+    """
+    元のバッチ結果に応答が無かったキーと、分割・検証に失敗したキー（再送リストのキー）。
+    出力ファイルの有無は見ない（前回までの古いファイルが、今回の欠落を隠してしまうため）。
+    """
+    if result_file is None:
+        return set(keys)
+    return (keys - result_keys(result_file)) | (failed_keys(result_file) & keys)
+
+
+def write_retry_requests(request_file: Path, keys: Set[str], retry_request_file: Path) -> int:
+    """元のリクエスト JSONL から、対象キーの行だけをそのまま書き出す。"""
+    count = 0
+    with open(request_file, 'r', encoding='utf-8') as src, open(retry_request_file, 'w', encoding='utf-8') as dst:
+        for line in src:
+            if line.strip() and json.loads(line)["key"] in keys:
+                dst.write(line if line.endswith("\n") else line + "\n")
+                count += 1
+    return count
+
+
+def clear_retry_files(request_file: Path, shard_dir: Path) -> int:
+    """
+    前回の再送で作ったリクエスト・結果・シャード・バッチ状態ファイルを消し、件数を返す。
+    再送ファイル名は回数だけで決まるため、残っていると前回の結果や終了済みのジョブを引き継いでしまう。
+    """
+    pattern = f"{request_file.stem}_retry_*"
+    stale = [
+        *config.INPUT_LISTS.glob(f"{pattern}.jsonl"),
+        *config.RAW_RESPONSES.glob(f"{pattern}.jsonl"),
+        *config.RAW_RESPONSES.glob(f"batch_state_{pattern}.json"),
+        *shard_dir.glob(pattern),
+    ]
+    for file_path in stale:
+        file_path.unlink(missing_ok=True)
+    return len(stale)
+
+
+@instrumentation.instrumented("gemini_retry", outputs=[config.INPUT_LISTS, config.RAW_DATA / "varieties_summary"])
+def main(
+    client=None,
+    request_file: Path = REQUEST_FILE,
+    result_file: Path = RESULT_FILE,
+    max_retries: int = MAX_RETRIES,
+    workers: int = 1,
+    schema_name: Optional[str] = "varieties_summary",
+    poll_interval: Optional[float] = None,
+):
+    """
+    元のバッチで失敗・欠落したキーだけを小さなバッチにして再送し、
+    2_gemini_batch_create.py で投入、3_gemini_batch_to_files.py で分割する。
+    すべて揃うか max_retries 回に達するまで繰り返し、残ったキーの数を返す。
+    """
+    batch_create = load_stage_module("2_gemini_batch_create.py")
+    batch_to_files = load_stage_module("3_gemini_batch_to_files.py")
+    all_keys = request_keys(request_file)
+    pending = pending_keys(all_keys, result_file if result_file.exists() else None)
+    print(f"{len(all_keys)}件中 {len(pending)}件が失敗または欠落しています")
+    cleared = clear_retry_files(request_file, batch_create.SHARD_DIR)
+    if cleared:
+        print(f"前回の再送ファイル {cleared}件を削除しました")
+
+    for attempt in range(1, max_retries + 1):
+        if not pending:
+            break
+        stem = f"{request_file.stem}_retry_{attempt}"
+        retry_request_file = config.INPUT_LISTS / f"{stem}.jsonl"
+        retry_result_file = config.RAW_RESPONSES / f"{stem}.jsonl"
+        count = write_retry_requests(request_file, pending, retry_request_file)
+        print(f"--- 再送 {attempt}/{max_retries}: {count}件 ({retry_request_file}) ---")
+
+        options = {} if poll_interval is None else {"poll_interval": poll_interval}
+        submitted = batch_create.main(
+            client=client,
+            input_file=retry_request_file,
+            output_file=retry_result_file,
+            state_file=config.RAW_RESPONSES / f"batch_state_{stem}.json",
+            **options,
+        )
+        if submitted is None:
+            # 残りのキーは次の回でまとめて再送する
+            print("再送バッチが完了しませんでした")
+            continue
+
+        # 今回の再送結果から実際に書き出せたキーだけを成功とする
+        written = batch_to_files.main(retry_result_file, request_file, workers=workers, schema_name=schema_name)
+        pending -= written
+        print(f"残り {len(pending)}件")
+
+    remaining_file = config.RAW_RESPONSES / f"{request_file.stem}_remaining.json"
+    with open(remaining_file, 'w', encoding='utf-8') as f:
+        json.dump(sorted(pending), f, ensure_ascii=False, indent=2)
+    if pending:
+        print(f"⚠️ {len(pending)}件が {max_retries}回の再送後も失敗しています（{remaining_file}）")
+    else:
+        print("✅ すべてのキーの応答が揃いました")
+    return len(pending)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gemini バッチで失敗・欠落したキーだけを再送する")
+    parser.add_argument("--requests", type=Path, default=REQUEST_FILE, help="元のリクエスト JSONL")
+    parser.add_argument("--results", type=Path, default=RESULT_FILE, help="元のバッチ結果 JSONL")
+    parser.add_argument("--max-retries", type=int, default=MAX_RETRIES, help="再送の最大回数")
+    parser.add_argument(
+        "--schema", default="varieties_summary", choices=sorted(schema_validation.SCHEMA_FILES),
+        help="応答を検証するスキーマ",
+    )
+    parallel.add_arguments(parser)
+    args = parser.parse_args()
+    main(
+        request_file=args.requests,
+        result_file=args.results,
+        max_retries=args.max_retries,
+        workers=args.workers,
+        schema_name=args.schema,
+    )
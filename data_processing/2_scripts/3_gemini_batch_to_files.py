@@ -1,41 +1,177 @@
+import argparse
 import json
 import os
+from collections import Counter
+from pathlib import Path
 
 import config
+import instrumentation
+import parallel
+import response_cache
+import schema_validation
+from json_repair import is_complete, loads_with_repair
 
 
 JSONL_FILENAME = config.RAW_RESPONSES / "varieties_summary_0.jsonl"
+REQUEST_FILE = config.INPUT_LISTS / "varieties_summary_0.jsonl"
 OUTPUT_DIR = config.RAW_DATA / "varieties_summary"
 ERROR_DIR = config.RAW_DATA / "varieties_summary_error"
+SCHEMA_NAME = "varieties_summary"
+FAILED_STATUSES = {"invalid", "incomplete", "error"}
 
+# ワーカーごとに init_worker() で設定する
+_prompt_keys = {}
+_cache = None
+_schema = None
 
-def main():
-    """JSONLファイルを個別のJSONファイルに分割"""
-    with (open(JSONL_FILENAME, 'r', encoding='utf-8') as f):
-        for line_num, line in enumerate(f):
-            if line.strip():  # 空行をスキップ
-                try:
-                    data = json.loads(line)
-                    text = data.get("response").get("candidates")[0].get("content").get("parts")[0].get("text").strip().replace("```json", "").replace("```", "").strip()
-                    output_data = json.loads(text)
-
-                    # custom_idからファイル名を作成
-                    key = data.get('key')
-                    filename = key # f"{key}.json"
-                    filepath = os.path.join(OUTPUT_DIR, filename)
-                    # 個別ファイルに保存
-                    with open(filepath, 'w', encoding='utf-8') as out_f:
-                        json.dump(output_data, out_f, ensure_ascii=False, indent=2)
-
-                    print(f"作成: {filepath}")
-                except json.JSONDecodeError as e:
-                    key = data.get('key')
-                    filepath = ERROR_DIR / f"{key}.json"
-                    with open(filepath, 'w', encoding='utf-8') as out_f:
-                        out_f.write(text)
-                except Exception as e:
-                    print(f"エラーが発生しました:{line_num} {e}")
+
+def init_worker(prompt_keys, schema_name=SCHEMA_NAME):
+    """{リクエストのkey: キャッシュキー} を受け取り、応答キャッシュとコンパイル済みスキーマを用意する。"""
+    global _prompt_keys, _cache, _schema
+    _prompt_keys = prompt_keys
+    _cache = response_cache.ResponseCache()
+    _schema = schema_validation.load_schema(schema_name) if schema_name else None
+
+
+def process_line(numbered_line):
+    """
+    バッチ結果の1行を解析して個別ファイルに保存する。
+    (行番号, 結果, キー, メッセージ) を返す。結果は ok / repaired / invalid / incomplete / error / skip のいずれか。
+    invalid の場合、メッセージはスキーマ検証のエラーのリスト。
+    incomplete は MAX_TOKENS などで途中で打ち切られた応答（エラーディレクトリに保存し、再送リストに回す）。
+    """
+    result = _split_line(numbered_line)
+    _, status, key, _ = result
+    # キャッシュから復元した応答が使えなかった場合は、キャッシュからも消して次回は再送させる
+    if status in FAILED_STATUSES and key in _prompt_keys:
+        _cache.discard(_prompt_keys[key])
+    return result
+
+
+def _split_line(numbered_line):
+    line_num, line = numbered_line
+    if not line.strip():  # 空行をスキップ
+        return line_num, "skip", None, None
+
+    key = None
+    text = None
+    try:
+        data = json.loads(line)
+        key = data.get('key')
+        candidate = data.get("response").get("candidates")[0]
+        text = candidate.get("content").get("parts")[0].get("text")
+        if not is_complete(candidate):
+            filepath = ERROR_DIR / f"{key}.json"
+            with open(filepath, 'w', encoding='utf-8') as out_f:
+                out_f.write(text)
+            return line_num, "incomplete", key, f"finishReason={candidate.get('finishReason')}（{filepath} に保存）"
+        output_data, repaired = loads_with_repair(text)
+
+        # 構造の不正は後段で落ちる前にここで止め、再送リストに回す
+        errors = _schema.validate(output_data) if _schema is not None else []
+        if errors:
+            with open(ERROR_DIR / f"{key}.json", 'w', encoding='utf-8') as out_f:
+                json.dump(output_data, out_f, ensure_ascii=False, indent=2)
+            return line_num, "invalid", key, errors
+
+        # custom_idからファイル名を作成
+        filename = key # f"{key}.json"
+        filepath = os.path.join(OUTPUT_DIR, filename)
+        # 個別ファイルに保存
+        with open(filepath, 'w', encoding='utf-8') as out_f:
+            json.dump(output_data, out_f, ensure_ascii=False, indent=2)
+        # 次回以降、同じプロンプトを再送しないよう応答をキャッシュする。
+        # 修復した応答はキャッシュしない（再送すれば正しい応答が得られるかもしれないため）
+        if key in _prompt_keys and not repaired:
+            _cache.put(_prompt_keys[key], json.dumps(output_data, ensure_ascii=False))
+        return line_num, "repaired" if repaired else "ok", key, filepath
+    except json.JSONDecodeError as e:
+        if key is None or text is None:
+            return line_num, "error", key, f"バッチ結果の行が不正です: {e}"
+        # 途中で切れた・余分なテキストがあるなど、安全に修復できないものは手作業用にエラーディレクトリへ
+        filepath = ERROR_DIR / f"{key}.json"
+        with open(filepath, 'w', encoding='utf-8') as out_f:
+            out_f.write(text)
+        return line_num, "error", key, f"{filepath} に保存: {e}"
+    except Exception as e:
+        return line_num, "error", key, str(e)
+
+
+@instrumentation.instrumented("batch_to_files", outputs=[OUTPUT_DIR, ERROR_DIR])
+def main(jsonl_filename=JSONL_FILENAME, request_file=REQUEST_FILE, workers=1, schema_name=SCHEMA_NAME):
+    """JSONLファイルを個別のJSONファイルに分割し、書き出せた（検証を通った）キーの集合を返す。"""
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    ERROR_DIR.mkdir(parents=True, exist_ok=True)
+
+    # 元のリクエストが残っていれば、key からプロンプトのハッシュを引けるようにする
+    prompt_keys = {}
+    if request_file is not None and Path(request_file).exists():
+        prompt_keys = response_cache.load_prompt_keys(Path(request_file))
+
+    counts = Counter()
+    written = set()
+    cached = 0
+    failures = []
+    metrics = instrumentation.current()
+    if metrics is not None:
+        metrics.read_file(jsonl_filename)
+    # 1行ずつ読みながらワーカーに渡すので、巨大なバッチ結果でもメモリ使用量は一定
+    with open(jsonl_filename, 'r', encoding='utf-8') as f:
+        results = parallel.imap_bounded(
+            process_line, enumerate(f), workers,
+            initializer=init_worker, initargs=(prompt_keys, schema_name),
+        )
+        for line_num, status, key, message in results:
+            counts[status] += 1
+            if status in ("ok", "repaired"):
+                written.add(key)
+            if status == "ok":
+                print(f"作成: {message}")
+                if key in prompt_keys:
+                    cached += 1
+            elif status == "repaired":
+                print(f"修復して作成: {message}")
+            elif status == "invalid":
+                print(f"スキーマ検証エラー:{line_num} {key}")
+                for error in message:
+                    print(f"    {error}")
+                failures.append({"key": key, "schema": schema_name, "errors": message})
+            elif status == "incomplete":
+                print(f"応答が途中で打ち切られています:{line_num} {key} {message}")
+                failures.append({"key": key, "schema": schema_name, "errors": [message]})
+            elif status == "error":
+                print(f"エラーが発生しました:{line_num} {key} {message}")
+                if key is not None:
+                    failures.append({"key": key, "schema": schema_name, "errors": [message]})
+
+    # 応答キャッシュへの登録はワーカーごとに行うので、件数だけをここで統計に加える
+    if prompt_keys:
+        cache = response_cache.ResponseCache()
+        cache.stats["stored"] = cached
+        cache.export_stats()
+
+    retry_file = schema_validation.retry_list_file(Path(jsonl_filename))
+    schema_validation.write_retry_list(retry_file, failures)
+
+    print("--------------------------------------")
+    print(
+        f"作成 {counts['ok']}件、修復 {counts['repaired']}件、"
+        f"検証エラー {counts['invalid']}件、打ち切り {counts['incomplete']}件、エラー {counts['error']}件"
+    )
+    if failures:
+        print(f"再送が必要な {len(failures)}件を {retry_file} に書き出しました")
+    return written
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Gemini のバッチ結果 JSONL を個別の JSON ファイルに分割する")
+    parser.add_argument("--input", type=Path, default=JSONL_FILENAME, help="バッチ結果 JSONL")
+    parser.add_argument("--requests", type=Path, default=REQUEST_FILE, help="応答キャッシュ登録用の元リクエスト JSONL")
+    parser.add_argument(
+        "--schema", default=SCHEMA_NAME, choices=sorted(schema_validation.SCHEMA_FILES),
+        help="応答を検証するスキーマ",
+    )
+    parser.add_argument("--no-validate", action="store_true", help="スキーマ検証を行わない")
+    parallel.add_arguments(parser)
+    args = parser.parse_args()
+    main(args.input, args.requests, workers=args.workers, schema_name=None if args.no_validate else args.schema)
@@ -1,11 +1,15 @@
 import config
+import instrumentation
 import json
 import os
 
+from json_repair import loads_with_repair
+
 OUTPUT_DIR = config.RAW_DATA / "species_detail"
 ERROR_DIR = config.RAW_DATA / "species_detail_error"
 
 
+@instrumentation.instrumented("data_cleansing", outputs=[OUTPUT_DIR])
 def main():
     files = list(ERROR_DIR.glob("*.json"))
     if not files:
@@ -17,9 +21,9 @@ def main():
     num = 0
     for filepath in sorted(files):
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                output_path = OUTPUT_DIR / filepath.name
+            # 手で直したファイルに残ったフェンスや末尾カンマは除去する（途中で切れたものは残す）
+            data, _ = loads_with_repair(filepath.read_text(encoding='utf-8'))
+            output_path = OUTPUT_DIR / filepath.name
             with open(output_path, "w") as f_out:
                 json.dump(data, f_out, ensure_ascii=False, indent=2)
             os.remove(filepath)
@@ -1,49 +1,57 @@
 import json
 
 import config
+import instrumentation
+import parallel
 
 RAW_SPECIES_SUMMARY_DIR = config.RAW_DATA / "species_summary"
 RAW_SPECIES_DETAIL_DIR = config.RAW_DATA / "species_detail"
 PROCESSING_SPECIES_SUMMARY_DIR = config.PROCESSING_DATA / "species_summary"
 PROCESSING_SPECIES_DETAIL_DIR = config.PROCESSING_DATA / "species_detail"
 
-def main():
-    # ... あなたのファイル読み込みロジック ...
-    response_files = list(RAW_SPECIES_SUMMARY_DIR.glob("*.json"))
+
+def process_file(file_path):
+    """1品目分の summary / detail を url 名で保存する。失敗時はメッセージを返す。"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        veg_summary = json.load(f)
+    if not veg_summary:
+        return "データが空"
+
+    global_info = veg_summary.get("global_info", {})
+    url = global_info.get("url")
+
+    proc_summary_path = PROCESSING_SPECIES_SUMMARY_DIR / f"{url}.json"
+    with open(proc_summary_path, 'w', encoding='utf-8') as f:
+        json.dump(veg_summary, f, ensure_ascii=False, indent=2)
+
+    raw_detail_path = RAW_SPECIES_DETAIL_DIR / file_path.name
+    with open(raw_detail_path, 'r', encoding='utf-8') as f:
+        veg_detail = json.load(f)
+    proc_detail_path = PROCESSING_SPECIES_DETAIL_DIR / f"{url}.json"
+    with open(proc_detail_path, 'w', encoding='utf-8') as f:
+        json.dump(veg_detail, f, ensure_ascii=False, indent=2)
+    return None
+
+
+@instrumentation.instrumented("species_processing", outputs=[PROCESSING_SPECIES_SUMMARY_DIR, PROCESSING_SPECIES_DETAIL_DIR])
+def main(files=None, workers=1, chunksize=None):
+    """
+    files を指定した場合は、そのファイルだけを処理する（pipeline.py からの差分実行用）。
+    処理に失敗したファイルのリストを返す。
+    """
+    response_files = list(files) if files is not None else list(RAW_SPECIES_SUMMARY_DIR.glob("*.json"))
     total_count = len(response_files)
     print(f"{total_count}件の処理を開始します")
-    num = 0
-    error_count = 0
-    for file_path in response_files:
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                veg_summary = json.load(f)
-                if veg_summary:
-                    global_info = veg_summary.get("global_info", {})
-                    url = global_info.get("url")
-
-                    proc_summary_path = PROCESSING_SPECIES_SUMMARY_DIR / f"{url}.json"
-                    with open(proc_summary_path, 'w', encoding='utf-8') as f:
-                        json.dump(veg_summary, f, ensure_ascii=False, indent=2)
-
-                    raw_detail_path = RAW_SPECIES_DETAIL_DIR / file_path.name
-                    with open(raw_detail_path, 'r', encoding='utf-8') as f:
-                        veg_detail = json.load(f)
-                    proc_detail_path = PROCESSING_SPECIES_DETAIL_DIR /  f"{url}.json"
-                    with open(proc_detail_path, 'w', encoding='utf-8') as f:
-                        json.dump(veg_detail, f, ensure_ascii=False, indent=2)
-                    num += 1
-                else:
-                    print(f"{file_path.name}: データが空")
-                    error_count += 1
-
-        except Exception as e:
-            print(f"{file_path.name}: {e}")
-            error_count += 1
+
+    results = parallel.process_files(process_file, response_files, workers, chunksize)
+    num, error_count = parallel.report(results)
 
     print(f" {num}件の処理が成功、 {error_count}件の失敗")
+    # pipeline.py は失敗したファイルを記録せず、次回また再処理する
+    return [file_path for file_path, error in results if error is not None]
 
 if __name__ == "__main__":
-    main()
+    args = parallel.parse_args("品目データ(species)を url 名のファイルに整理する")
+    main(workers=args.workers, chunksize=args.chunksize)
 
 
@@ -1,30 +1,41 @@
 import json
 import config
+import instrumentation
+import parallel
 
 INL_DIR = config.RAW_DATA / "varieties_detail"
 OUT_DIR = config.PROCESSING_DATA / "varieties_detail"
 
-def main():
-    response_files = sorted(INL_DIR.glob("*.json"))
+
+def process_file(file_path):
+    """1品種分の詳細データを url 名で保存する。"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        variety_detail = json.load(f)
+    variety_profile = variety_detail.get("variety_profile", {})
+    url = variety_profile.get("url")
+    output_path = OUT_DIR / f"{url}.json"
+    with open(output_path, "w") as f_out:
+        json.dump(variety_detail, f_out, ensure_ascii=False, indent=2)
+    return None
+
+
+@instrumentation.instrumented("variety_detail", outputs=[OUT_DIR])
+def main(files=None, workers=1, chunksize=None):
+    """
+    files を指定した場合は、そのファイルだけを処理する（pipeline.py からの差分実行用）。
+    処理に失敗したファイルのリストを返す。
+    """
+    response_files = sorted(files) if files is not None else sorted(INL_DIR.glob("*.json"))
     print(f"{len(response_files)}件の処理を開始します")
-    num = 0
-    error_count = 0
-    for file_path in response_files:
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                variety_detail = json.load(f)
-                variety_profile = variety_detail.get("variety_profile", {})
-                url = variety_profile.get("url")
-                output_path = OUT_DIR / f"{url}.json"
-                with open(output_path, "w") as f_out:
-                    json.dump(variety_detail, f_out, ensure_ascii=False, indent=2)
-                num += 1
-        except Exception as e:
-            print(f"{file_path.name}: {e}")
-            error_count += 1
-
-    print(f"{num}件の処理が完了")
+
+    results = parallel.process_files(process_file, response_files, workers, chunksize)
+    num, error_count = parallel.report(results)
+
+    print(f"{num}件の処理が完了、{error_count}件の失敗")
+    # pipeline.py は失敗したファイルを記録せず、次回また再処理する
+    return [file_path for file_path, error in results if error is not None]
 
 if __name__ == "__main__":
-    main()
+    args = parallel.parse_args("品種の詳細データを url 名のファイルに整理する")
+    main(workers=args.workers, chunksize=args.chunksize)
 
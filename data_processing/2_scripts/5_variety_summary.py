@@ -1,18 +1,25 @@
 import json
 import config
+import instrumentation
+import parallel
+from corpus_model import GlobalInfo, Names
+from species_repository import SpeciesRepository
 
 IN_DIR = config.RAW_DATA / "varieties_summary"
 IN_DETAIL_DIR = config.RAW_DATA / "varieties_detail"
 SPECIES_SUMMARY_DIR = config.PROCESSING_DATA / "species_summary"
 OUT_DIR = config.PROCESSING_DATA / "varieties_summary"
 
-def generate_global_info(profile, species_global_info):
+# 親品目の summary は小さいので、一度読んだものは全て保持する
+species_summaries = SpeciesRepository(SPECIES_SUMMARY_DIR)
+
+def generate_global_info(profile, species_global_info: GlobalInfo):
     """
     Geminiが生成した詳細データから、ファーストビュー用の global_info を生成する。
 
     Args:
         profile: Geminiが生成した詳細な分析データ（JSONを辞書に変換したもの）。
-        species_global_info: 属する品目の global_info
+        species_global_info: 属する品目の global_info（科・属と食用部位を引き継ぐ）
     Returns:
         計算・抽出された global_info の辞書。
     """
@@ -25,8 +32,6 @@ def generate_global_info(profile, species_global_info):
         # full_notation があればそれを優先、なければ species_level を使う
         sci_name_data = profile.get("scientific_name", {})
         scientific_name = sci_name_data.get("variety_level") or sci_name_data.get("species_level")
-        classification = species_global_info.get("classification", {})
-        food_classification = species_global_info.get("foodClassification", {}) or {}
 
         # --- names の抽出 ---
         names_data = profile.get("names", {})
@@ -46,23 +51,16 @@ def generate_global_info(profile, species_global_info):
         en_names_list = names_data.get("international", {}).get("en", [])
 
         # --- 最終的な global_info 構造の組み立て ---
-        global_info = {
-            "url": url_id,
-            "kana_name": kana_name,
-            "scientificName": scientific_name,
-            "classification": classification,
-            "foodClassification": food_classification,
-            "names": {
-                "japanese": {
-                    "common": jp_common_list
-                },
-                "international": {
-                    "en": en_names_list
-                }
-            }
-        }
+        global_info = GlobalInfo(
+            url=url_id,
+            kana_name=kana_name,
+            scientific_name=scientific_name,
+            classification=species_global_info.classification,
+            food_classification=species_global_info.food_classification,
+            names=Names(tuple(jp_common_list or ()), {"en": tuple(en_names_list or ())}),
+        )
 
-        return global_info
+        return global_info.to_dict()
 
     except Exception as e:
         print(f"global_info の生成中にエラーが発生しました: {e}")
@@ -76,42 +74,48 @@ def generate_global_info(profile, species_global_info):
             "names": {}
         }
 
-def main():
-    response_files = sorted(IN_DIR.glob("*.json"))
+def process_file(file_path):
+    """1品種分の summary を global_info と content に組み立てて保存する。"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        gemini_variety_summary = json.load(f)
+    with open(IN_DETAIL_DIR / file_path.name, 'r', encoding='utf-8') as f:
+        varieties_detail = json.load(f)
+        variety_profile = varieties_detail.get("variety_profile", {})
+        parent_species_url = variety_profile.get("parent_species_url")
+    species_global_info = species_summaries.get_global_info(parent_species_url)
+    global_info = generate_global_info(variety_profile, species_global_info)
+    content = gemini_variety_summary.get("content", {})
+    relationships = varieties_detail.get("relationships", {})
+    ja = content["ja"]
+    ja["relationships"] = relationships
+    variety_summary = {
+        "global_info": global_info,
+        "content": content,
+    }
+    url = global_info.get("url")
+    output_path = OUT_DIR / f"{url}.json"
+    with open(output_path, "w") as f_out:
+        json.dump(variety_summary, f_out, ensure_ascii=False, indent=2)
+    return None
+
+
+@instrumentation.instrumented("variety_summary", outputs=[OUT_DIR])
+def main(files=None, workers=1, chunksize=None):
+    """
+    files を指定した場合は、そのファイルだけを処理する（pipeline.py からの差分実行用）。
+    処理に失敗したファイルのリストを返す。
+    """
+    response_files = sorted(files) if files is not None else sorted(IN_DIR.glob("*.json"))
     print(f"{len(response_files)}件の処理を開始します")
-    num = 0
-    error_count = 0
-    for file_path in response_files:
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                gemini_variety_summary = json.load(f)
-            with open(IN_DETAIL_DIR / file_path.name, 'r', encoding='utf-8') as f:
-                varieties_detail = json.load(f)
-                variety_profile = varieties_detail.get("variety_profile", {})
-                parent_species_url = variety_profile.get("parent_species_url")
-            with open(SPECIES_SUMMARY_DIR / f"{parent_species_url}.json", 'r', encoding='utf-8') as f:
-                species_summary = json.load(f)
-                species_global_info = species_summary.get("global_info", {})
-            global_info = generate_global_info(variety_profile, species_global_info)
-            content = gemini_variety_summary.get("content", {})
-            relationships = varieties_detail.get("relationships", {})
-            ja = content["ja"]
-            ja["relationships"] = relationships
-            variety_summary = {
-                "global_info": global_info,
-                "content": content,
-            }
-            url = global_info.get("url")
-            output_path = OUT_DIR / f"{url}.json"
-            with open(output_path, "w") as f_out:
-                json.dump(variety_summary, f_out, ensure_ascii=False, indent=2)
-            num += 1
-        except json.JSONDecodeError as e:
-            print(f"{file_path.name}: {e}")
-            error_count += 1
-            continue
-    print(f"{num}件の処理が完了")
+
+    results = parallel.process_files(process_file, response_files, workers, chunksize)
+    num, error_count = parallel.report(results)
+
+    print(f"{num}件の処理が完了、{error_count}件の失敗")
+    # pipeline.py は失敗したファイルを記録せず、次回また再処理する
+    return [file_path for file_path, error in results if error is not None]
 
 if __name__ == "__main__":
-    main()
+    args = parallel.parse_args("品種の summary を最終形式に組み立てる")
+    main(workers=args.workers, chunksize=args.chunksize)
 
@@ -0,0 +1,50 @@
+import argparse
+import json
+import time
+
+import config
+import instrumentation
+from facet_index import FACETS, FacetIndex
+
+FACET_INDEX_FILE = config.PROCESSING_DATA / "_dish_facet_index.json"
+
+
+@instrumentation.instrumented("dish_facets", outputs=[FACET_INDEX_FILE])
+def main():
+    """dish_data・dish_regional_data・vegetable_summary から料理の絞り込み用索引を作り、FACET_INDEX_FILE に保存する。"""
+    index = FacetIndex.from_app_data(config.APP_DATA)
+    metrics = instrumentation.current()
+    if metrics is not None:
+        metrics.count("records", len(index))
+
+    FACET_INDEX_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(FACET_INDEX_FILE, 'w', encoding='utf-8') as f:
+        json.dump(index.to_dict(), f, ensure_ascii=False, separators=(",", ":"))
+
+    terms = "、".join(f"{facet} {len(index.postings[facet])}語" for facet in FACETS)
+    print(f"✅ 料理 {len(index)}件（{terms}）の索引を {FACET_INDEX_FILE} に保存しました。")
+
+
+def query(filters, limit: int):
+    """保存済みの索引で絞り込み、結果と所要時間を表示する（索引の確認用）。"""
+    index = FacetIndex.load(FACET_INDEX_FILE)
+    started = time.perf_counter()
+    total, docs = index.search(limit=limit, **filters)
+    elapsed = (time.perf_counter() - started) * 1000
+    print(f"{total}件（{elapsed:.2f}ms）")
+    for doc in docs:
+        print(f"  {doc['id']}  {doc['name']} / {doc['name_en']}（{doc['region']}）")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="料理の地域・言語・別名・食材の絞り込み用索引を作成する")
+    for facet in FACETS:
+        parser.add_argument(f"--{facet}", help=f"作成せず、保存済みの索引を {facet} で絞り込んで表示する")
+    parser.add_argument("--limit", type=int, default=20, help="表示する件数")
+    args = parser.parse_args()
+
+    filters = {facet: getattr(args, facet) for facet in FACETS if getattr(args, facet)}
+    if filters:
+        query(filters, args.limit)
+    else:
+        main()
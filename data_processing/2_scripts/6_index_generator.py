@@ -1,48 +1,169 @@
+import argparse
 import json
-from typing import Dict, Any, List
+from pathlib import Path
+from typing import Dict, Any, List, Optional
 
 import config
+import instrumentation
+from corpus_model import GlobalInfo
+from search_index import DEFAULT_SHARD, SHARD_BY_CHAR, SearchIndex, normalize_key, shard_name, vegetable_search_terms
 
 VEGETABLE_SUMMARY_DIR = config.APP_DATA / "vegetable_summary"
 INDEX_JSON_FILE = config.PROCESSING_DATA / "_index.json"
+SEARCH_INDEX_JSON_FILE = config.PROCESSING_DATA / "_search_index.json"
+INDEX_SHARDS_DIR = config.PROCESSING_DATA / "_index_shards"
+
+
+def index_paths(lang: str = config.DEFAULT_LANG):
+    """
+    言語ごとの (_index.json, _search_index.json, シャードのディレクトリ)。
+    既定の言語は従来どおりの名前、ほかの言語は _index.en.json, _index_shards/en/ のようにする。
+    """
+    if lang == config.DEFAULT_LANG:
+        return INDEX_JSON_FILE, SEARCH_INDEX_JSON_FILE, INDEX_SHARDS_DIR
+    return (
+        INDEX_JSON_FILE.with_name(f"_index.{lang}.json"),
+        SEARCH_INDEX_JSON_FILE.with_name(f"_search_index.{lang}.json"),
+        INDEX_SHARDS_DIR / lang,
+    )
+
 
 class IndexGenerator:
     """
     野菜データから _index.json の内容を生成するためのクラス。
+
+    野菜ごとの項目と「検索キー → そのキーを持つ野菜」の対応を保持し、
+    転送(redirect)項目は get_sorted_index() の時点で導出する。
+    そのため、既存のインデックスを読み込んで一部の野菜だけを追加・更新・削除できる。
+
+    ID の衝突は読み込み順によらず次の規則で決まる。
+    - 野菜の ID は、他の野菜の検索キー（転送項目）より優先される。
+    - 複数の野菜が同じ検索キーを持つ場合、ID が辞書順で最小の野菜へ転送する。
+
+    表示名・一言説明は content.<lang> から取る。その言語の content がない野菜は載せない。
     """
 
-    def __init__(self):
-        self._index_items: List[Dict[str, Any]] = []
-        self._processed_ids: set[str] = set()
+    def __init__(self, lang: str = config.DEFAULT_LANG):
+        self.lang = lang
+        self._vegetables: Dict[str, Dict[str, Any]] = {}
+        self._key_owners: Dict[str, set[str]] = {}
+
+    def load_index(self, index_items: List[Dict[str, Any]]):
+        """
+        既存の _index.json の内容を読み込む。転送項目は野菜項目の search_keys から再計算する。
+        """
+        for item in index_items:
+            if item.get("type") == "vegetable":
+                self._put(item)
 
     def add_vegetable(self, veg_data: Dict[str, Any]):
         """
-        一つの野菜データを処理し、インデックス項目を追加して、成功したかどうかを返す。
+        一つの野菜データを処理し、インデックス項目を追加する。ID が既にあればスキップする。
+        """
+        index_item = self._create_index_item(veg_data)
+        if index_item is None:
+            return
+
+        # 重複チェック
+        if index_item["id"] in self._vegetables:
+            print(f"警告: ID '{index_item['id']}' が重複しています。スキップします。")
+            return
+        self._put(index_item)
+
+    def update_vegetable(self, veg_data: Dict[str, Any]):
+        """
+        一つの野菜データでインデックス項目を追加、または置き換える。
+        """
+        index_item = self._create_index_item(veg_data)
+        if index_item is None:
+            # その言語の content がなくなった野菜は、索引から外す
+            if not veg_data.get("content", {}).get(self.lang):
+                self.remove_vegetable(veg_data.get("global_info", {}).get("url"))
+            return
+        self.remove_vegetable(index_item["id"])
+        self._put(index_item)
+
+    def remove_vegetable(self, item_id: str) -> bool:
+        """
+        野菜項目と、その野菜への転送項目を削除する。削除したかどうかを返す。
+        同じ検索キーを持つ別の野菜があれば、そのキーの転送先は別の野菜に移る。
+        """
+        index_item = self._vegetables.pop(item_id, None)
+        if index_item is None:
+            return False
+        for key in index_item["search_keys"]:
+            owners = self._key_owners.get(key)
+            if owners is not None:
+                owners.discard(item_id)
+                if not owners:
+                    del self._key_owners[key]
+        return True
+
+    def get_sorted_index(self) -> List[Dict[str, Any]]:
+        """
+        蓄積されたインデックス項目と転送項目をIDでソートして返す。
+        """
+        index_items = list(self._vegetables.values())
+        for key, owners in self._key_owners.items():
+            if key in self._vegetables:
+                continue
+            redirect_item = {
+                "id": key,
+                "type": "redirect",
+                "redirect_to": min(owners)
+            }
+            index_items.append(redirect_item)
+
+        index_items.sort(key=lambda x: x["id"])
+        return index_items
+
+    def get_shards(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Webクライアントの遅延読み込み用に、検索キーの先頭文字（正規化後）でインデックスを分割する。
+        各項目は表示と照合に必要な最小限（id, display_name, kana_name, oneliner, redirects）だけを持つ。
+        検索キーが複数のシャードにまたがる野菜は、それぞれのシャードに入る。
         """
+        redirects: Dict[str, List[str]] = {}
+        for item in self.get_sorted_index():
+            if item["type"] == "redirect":
+                redirects.setdefault(item["redirect_to"], []).append(item["id"])
+
+        shards: Dict[str, List[Dict[str, Any]]] = {}
+        for item_id in sorted(self._vegetables):
+            index_item = self._vegetables[item_id]
+            shard_item = {
+                "id": item_id,
+                "display_name": index_item["display_name"],
+                "kana_name": index_item["kana_name"],
+                "oneliner": index_item["oneliner"],
+                "redirects": redirects.get(item_id, []),
+            }
+            keys = [item_id, index_item["kana_name"]] + shard_item["redirects"]
+            for name in sorted({shard_name(normalize_key(key)) for key in keys}):
+                shards.setdefault(name, []).append(shard_item)
+        return shards
+
+    def _create_index_item(self, veg_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         # --- 1. 必須情報を抽出 ---
-        global_info = veg_data.get("global_info", {})
-        content_ja = veg_data.get("content", {}).get("ja", {})
+        global_info = GlobalInfo.from_dict(veg_data.get("global_info"))
+        content = veg_data.get("content", {}).get(self.lang)
+        if not content:
+            return None
 
-        item_id = global_info.get("url")
-        display_name = content_ja.get("display_name")
-        oneliner = content_ja.get("oneliner")
-        kana_name = global_info.get("kana_name")
+        item_id = global_info.url
+        display_name = content.get("display_name")
+        oneliner = content.get("oneliner")
+        kana_name = global_info.kana_name
 
         if not all([item_id, display_name, oneliner, kana_name]):
             print(f"警告: 必須項目(url, display_name, oneliner, kana_name)が不足。スキップします。")
-            return
-
-        # 重複チェック
-        if item_id in self._processed_ids:
-            print(f"警告: ID '{item_id}' が重複しています。スキップします。")
-            return
-        self._processed_ids.add(item_id)
+            return None
 
         # --- 2. 検索キーを生成 ---
-        search_keys = self._create_search_keys(veg_data)
+        search_keys = self._create_search_keys(global_info, content)
 
         # --- 3. 本体ページのインデックス項目を作成 ---
-        index_item = {
+        return {
             "id": item_id,
             "type": "vegetable",
             "display_name": display_name,
@@ -50,88 +171,153 @@ class IndexGenerator:
             "kana_name": kana_name,
             "search_keys": search_keys
         }
-        self._index_items.append(index_item)
-
-        # --- 4. 転送ページのインデックス項目を生成 ---
-        for key in search_keys:
-            if key != item_id and key not in self._processed_ids:
-                redirect_item = {
-                    "id": key,
-                    "type": "redirect",
-                    "redirect_to": item_id
-                }
-                self._index_items.append(redirect_item)
-                self._processed_ids.add(key)
-        return
 
-    def get_sorted_index(self) -> List[Dict[str, Any]]:
+    def _put(self, index_item: Dict[str, Any]):
+        item_id = index_item["id"]
+        self._vegetables[item_id] = index_item
+        # --- 4. 転送ページ用に、検索キーの持ち主を記録 ---
+        for key in index_item["search_keys"]:
+            if key != item_id:
+                self._key_owners.setdefault(key, set()).add(item_id)
+
+    def build_search_index(self) -> SearchIndex:
         """
-        蓄積されたインデックス項目をIDでソートして返す。
+        検索キーを正規化した、二分探索用の検索インデックスを作成する。
         """
-        if not self._index_items:
-            return []
-
-        self._index_items.sort(key=lambda x: x["id"])
-        return self._index_items
+        return SearchIndex.build(
+            (item["id"], item["search_keys"])
+            for item in self._vegetables.values()
+        )
 
-    def _create_search_keys(self, veg_data: Dict[str, Any]) -> list[str]:
+    def _create_search_keys(self, global_info: GlobalInfo, content: Dict[str, Any]) -> list[str]:
         """
-        野菜データから、検索用のキー（漢字、ひらがな、カタカナ）を生成する。
-        (内部ヘルパーメソッド)
+        野菜の global_info と content.<lang> から、検索用のキー（ID、括弧を除いた表示名、カタカナ名、別名）を生成する。
+        (内部ヘルパーメソッド。/api/search と同じ search_index.vegetable_search_terms を使う)
         """
-        keys = set()
+        return sorted({key for key, _ in vegetable_search_terms(global_info, content, self.lang)})
 
-        global_info = veg_data.get("global_info", {})
-        content_ja = veg_data.get("content", {}).get("ja", {})
+def load_vegetable(file_path: Path) -> Optional[Dict[str, Any]]:
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
 
-        # 1. ID (url)
-        url = global_info.get("url")
-        if url:
-            keys.add(url)
 
-        # 2. 表示名 (display_name) から括弧を除いた部分
-        display_name = content_ja.get("display_name", "")
-        if "(" in display_name:
-            keys.add(display_name.split("(", 1)[0].strip())
-        else:
-            keys.add(display_name.strip())
-
-        # 3. カタカナ名 (kana_name)
-        kana_name = global_info.get("kana_name")
-        if kana_name:
-            keys.add(kana_name)
+def build_index(response_files: List[Path], lang: str = config.DEFAULT_LANG) -> IndexGenerator:
+    """全ファイルからインデックスを作り直す。"""
+    # 1. IndexGeneratorのインスタンスを作成
+    index_generator = IndexGenerator(lang)
 
-        # 4. names.japanese.common から全ての別名を取得
-        common_names = global_info.get("names", {}).get("japanese", {}).get("common", [])
-        for name in common_names:
-            keys.add(name)
+    for file_path in sorted(response_files):
+        veg_data = load_vegetable(file_path)
+        if veg_data:
+            # 2. 抽出したデータをジェネレーターに追加
+            index_generator.add_vegetable(veg_data)
+    return index_generator
 
-        return sorted(list(filter(None, keys)))
 
-def main():
-    # ... ファイル読み込みロジック ...
-    response_files = list(VEGETABLE_SUMMARY_DIR.glob("*.json"))
+def update_index(index_items: List[Dict[str, Any]], changed_files: List[Path], lang: str = config.DEFAULT_LANG) -> IndexGenerator:
+    """
+    既存のインデックスに、変更のあったファイルだけを反映する。
+    ファイル名は野菜の url と同じなので、消えたファイルは url = ファイル名として削除する。
+    """
+    index_generator = IndexGenerator(lang)
+    index_generator.load_index(index_items)
 
-    # 1. IndexGeneratorのインスタンスを作成
-    index_generator = IndexGenerator()
+    for file_path in sorted(changed_files):
+        if not file_path.exists():
+            if index_generator.remove_vegetable(file_path.stem):
+                print(f"削除: {file_path.stem}")
+            continue
+        veg_data = load_vegetable(file_path)
+        if not veg_data:
+            continue
+        # url が変わった場合に古い項目が残らないよう、ファイル名の ID を先に外す
+        new_id = veg_data.get("global_info", {}).get("url")
+        if new_id != file_path.stem:
+            index_generator.remove_vegetable(file_path.stem)
+        index_generator.update_vegetable(veg_data)
+        print(f"更新: {new_id}")
+    return index_generator
 
-    for file_path in response_files:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            veg_data = json.load(f)
-            if veg_data:
-                # 2. 抽出したデータをジェネレーターに追加
-                index_generator.add_vegetable(veg_data)
 
+@instrumentation.instrumented("index", outputs=[INDEX_JSON_FILE, SEARCH_INDEX_JSON_FILE, INDEX_SHARDS_DIR])
+def main(files=None, shards=False, lang=config.DEFAULT_LANG):
+    """
+    files を指定した場合、既存の _index.json を読み込み、そのファイルだけを反映する
+    （pipeline.py からの差分実行用）。_index.json がなければ全件から作成する。
+    shards=True の場合、Webクライアント用の分割インデックスも書き出す。
+    lang を指定した場合は content.<lang> から、その言語用の索引（index_paths を参照）を作る。
+    """
+    index_json_file, search_index_json_file, shards_dir = index_paths(lang)
+    incremental = files is not None and index_json_file.exists()
+    if incremental:
+        with open(index_json_file, 'r', encoding='utf-8') as f:
+            index_generator = update_index(json.load(f), [Path(p) for p in files], lang)
+    else:
+        response_files = list(VEGETABLE_SUMMARY_DIR.glob("*.json"))
+        index_generator = build_index(response_files, lang)
 
     # 3. 最終的なインデックスリストを取得
     final_index_list = index_generator.get_sorted_index()
+    metrics = instrumentation.current()
+    if metrics is not None:
+        # 差分更新では反映したファイルの数、全件作成では索引に載った野菜の数（リダイレクト項目は除く）
+        indexed = sum(1 for item in final_index_list if item.get("type") == "vegetable")
+        metrics.count("records", len(files) if incremental else indexed)
     # 4. _index.json を保存
-    with open(INDEX_JSON_FILE, 'w', encoding='utf-8') as f:
+    with open(index_json_file, 'w', encoding='utf-8') as f:
         json.dump(final_index_list, f, ensure_ascii=False, indent=2)
 
-    print(f"✅ {len(final_index_list)}件のインデックス項目を {INDEX_JSON_FILE} に保存しました。")
+    print(f"✅ {len(final_index_list)}件のインデックス項目を {index_json_file} に保存しました。")
+
+    # 5. 検索用インデックス（正規化キー → ID）を保存
+    search_index = index_generator.build_search_index()
+    with open(search_index_json_file, 'w', encoding='utf-8') as f:
+        json.dump(search_index.to_dict(), f, ensure_ascii=False, separators=(",", ":"))
+
+    print(f"✅ {len(search_index.keys)}件の検索キーを {search_index_json_file} に保存しました。")
+
+    # 6. Webクライアント用の分割インデックスを保存
+    if shards:
+        write_index_shards(index_generator, shards_dir)
+
+
+def write_index_shards(index_generator: IndexGenerator, shards_dir: Path = INDEX_SHARDS_DIR):
+    """
+    シャードごとのファイルと、小さなマニフェスト(manifest.json)を書き出す。
+    クライアントは検索語を正規化して先頭文字を char_map で引き、該当シャードだけを読み込む。
+    """
+    shards_dir.mkdir(parents=True, exist_ok=True)
+    for old_file in shards_dir.glob("*.json"):
+        old_file.unlink()
+
+    shard_entries = []
+    for name, items in sorted(index_generator.get_shards().items()):
+        body = json.dumps(items, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        shard_file = f"{name}.json"
+        (shards_dir / shard_file).write_bytes(body)
+        shard_entries.append({"name": name, "file": shard_file, "count": len(items), "bytes": len(body)})
+
+    manifest = {
+        "version": 1,
+        "normalization": "NFKC, casefold, katakana→hiragana, 空白・中黒を除去",
+        "char_map": SHARD_BY_CHAR,
+        "default_shard": DEFAULT_SHARD,
+        "shards": shard_entries,
+    }
+    with open(shards_dir / "manifest.json", 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, separators=(",", ":"))
+    print(f"✅ {len(shard_entries)}個のシャードを {shards_dir} に保存しました。")
+
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="vegetable_summary から _index.json を生成する")
+    parser.add_argument(
+        "--changed", nargs="+", type=Path, default=None,
+        help="変更・削除された vegetable_summary のファイル。指定すると既存の _index.json を差分更新する",
+    )
+    parser.add_argument("--shards", action="store_true", help="Webクライアント用の分割インデックスも出力する")
+    parser.add_argument("--lang", default=config.DEFAULT_LANG, help=f"索引を作る content の言語（既定: {config.DEFAULT_LANG}）")
+    args = parser.parse_args()
+    main(files=args.changed, shards=args.shards, lang=args.lang)
 
 
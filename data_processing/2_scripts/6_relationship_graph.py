@@ -0,0 +1,215 @@
+import argparse
+import json
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import config
+import instrumentation
+from ingredients import NameMatcher, split_names
+from search_engine import dish_entry, vegetable_entry
+from search_index import normalize_key
+
+VEGETABLE_SUMMARY_DIR = config.APP_DATA / "vegetable_summary"
+VARIETIES_SUMMARY_DIR = config.APP_DATA / "varieties_summary"
+VARIETIES_DETAIL_DIR = config.APP_DATA / "varieties_detail"
+DISH_DIR = config.APP_DATA / "dish_data"
+DISH_REGIONAL_DIR = config.APP_DATA / "dish_regional_data"
+GRAPH_DIR = config.PROCESSING_DATA / "graph"
+GRAPH_STATS_FILE = GRAPH_DIR / "_graph.json"
+
+# ノードの種類 → 隣接リストでの名前（links のキー）
+NODE_TYPES = {"vegetable": "vegetables", "variety": "varieties", "dish": "dishes", "region": "regions"}
+LINK_TYPES = {kind: node_type for node_type, kind in NODE_TYPES.items()}
+# ノードの種類 → 書き出し先のコレクション（5_app_data に置けば、そのまま API・パッケージ化の対象になる）
+LINK_COLLECTIONS = {node_type: f"{node_type}_links" for node_type in NODE_TYPES}
+
+# 照合できなかった食材を、多い順にこの件数だけ _graph.json に残す（名寄せの確認用）
+UNMATCHED_REPORT_SIZE = 100
+
+Node = Tuple[str, str]  # (種類, ID)
+
+
+class RelationshipGraph:
+    """
+    野菜・品種・料理・地域の無向グラフ。ノードごとに、種類別の隣接IDの集合を持つ。
+    書き出すときは1ノード1ファイルにし、隣接ノードの表示名も添えて、1回の読み込みで一覧を表示できるようにする。
+    """
+
+    def __init__(self):
+        self.names: Dict[Node, str] = {}
+        self.links: Dict[Node, Dict[str, Set[str]]] = {}
+
+    def add_node(self, node_type: str, node_id: str, name: str) -> Node:
+        node = (node_type, node_id)
+        self.names.setdefault(node, name or node_id)
+        self.links.setdefault(node, {})
+        return node
+
+    def add_region(self, name: str) -> Optional[Node]:
+        """地域名を正規化したキーのノードを返す。ファイル名にできない名前は None。"""
+        key = normalize_key(name)
+        if not key or key.startswith(".") or Path(key).name != key:
+            return None
+        return self.add_node("region", key, name)
+
+    def add_edge(self, a: Node, b: Node):
+        if a == b or a not in self.links or b not in self.links:
+            return
+        self.links[a].setdefault(NODE_TYPES[b[0]], set()).add(b[1])
+        self.links[b].setdefault(NODE_TYPES[a[0]], set()).add(a[1])
+
+    def edge_count(self) -> int:
+        return sum(len(ids) for kinds in self.links.values() for ids in kinds.values()) // 2
+
+    def node_data(self, node: Node) -> Dict[str, Any]:
+        node_type, node_id = node
+        links = {}
+        for kind, link_type in LINK_TYPES.items():
+            ids = self.links[node].get(kind)
+            if ids:
+                links[kind] = [[link_id, self.names[(link_type, link_id)]] for link_id in sorted(ids)]
+        return {"id": node_id, "type": node_type, "name": self.names[node], "links": links}
+
+    def write(self, graph_dir: Path) -> Dict[str, int]:
+        """graph_dir/{種類}_links/{ID}.json を書き出し、種類ごとのノード数を返す。"""
+        counts = {}
+        for node_type, collection in LINK_COLLECTIONS.items():
+            type_dir = graph_dir / collection
+            type_dir.mkdir(parents=True, exist_ok=True)
+            for old_file in type_dir.glob("*.json"):
+                old_file.unlink()
+            nodes = sorted(node for node in self.links if node[0] == node_type)
+            for node in nodes:
+                with open(type_dir / f"{node[1]}.json", 'w', encoding='utf-8') as f:
+                    json.dump(self.node_data(node), f, ensure_ascii=False, separators=(",", ":"))
+            counts[node_type] = len(nodes)
+        return counts
+
+
+def load_json(file_path: Path) -> Dict[str, Any]:
+    metrics = instrumentation.current()
+    if metrics is not None:
+        metrics.read_file(file_path)
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _names(keys: List[Tuple[str, str]]) -> List[str]:
+    return [name for name, _ in keys]
+
+
+def build_graph() -> Tuple[RelationshipGraph, Counter]:
+    """
+    5_app_data から関係グラフを作り、(グラフ, 照合できなかった食材の件数) を返す。
+
+    - 品種 → 親の野菜・類似品種: varieties_summary の content.ja.relationships
+    - 品種 → 地域・料理: varieties_detail の現地名の地域、伝統的な料理名
+    - 料理 → 野菜・品種: dish_data の core_plant_ingredients（名前で照合）
+    - 料理 → 地域: dish_data の region と、dish_regional_data の地域名
+    """
+    graph = RelationshipGraph()
+    vegetables = NameMatcher(affix=True)
+    varieties = NameMatcher()
+    dishes = NameMatcher()
+
+    for file_path in sorted(VEGETABLE_SUMMARY_DIR.glob("*.json")):
+        document, keys = vegetable_entry(file_path.stem, load_json(file_path))
+        graph.add_node("vegetable", file_path.stem, document.display_name)
+        vegetables.add(file_path.stem, _names(keys))
+
+    variety_data = {}
+    for file_path in sorted(VARIETIES_SUMMARY_DIR.glob("*.json")):
+        data = load_json(file_path)
+        document, keys = vegetable_entry(file_path.stem, data)
+        graph.add_node("variety", file_path.stem, document.display_name)
+        varieties.add(file_path.stem, _names(keys))
+        variety_data[file_path.stem] = data
+
+    dish_data = {}
+    for file_path in sorted(DISH_DIR.glob("*.json")):
+        data = load_json(file_path)
+        document, keys = dish_entry(file_path.stem, data)
+        graph.add_node("dish", file_path.stem, document.display_name)
+        dishes.add(file_path.stem, _names(keys))
+        dish_data[file_path.stem] = data
+
+    for variety_id, data in variety_data.items():
+        variety = ("variety", variety_id)
+        relationships = data.get("content", {}).get("ja", {}).get("relationships", {}) or {}
+        for name in relationships.get("parentSpecies", []):
+            for vegetable_id in vegetables.match(name):
+                graph.add_edge(variety, ("vegetable", vegetable_id))
+        for name in relationships.get("children", []) + relationships.get("similarVarieties", []):
+            for other_id in varieties.match(name):
+                graph.add_edge(variety, ("variety", other_id))
+
+        detail_file = VARIETIES_DETAIL_DIR / f"{variety_id}.json"
+        if not detail_file.exists():
+            continue
+        detail = load_json(detail_file)
+        profile = detail.get("variety_profile", {})
+        if profile.get("parent_species_url"):
+            graph.add_edge(variety, ("vegetable", profile["parent_species_url"]))
+        for local_name in profile.get("names", {}).get("local_and_indigenous", []):
+            for region_name in split_names(local_name.get("region", "")):
+                region = graph.add_region(region_name)
+                if region is not None:
+                    graph.add_edge(variety, region)
+        traditional_uses = detail.get("structured_data", {}).get("traditional_uses", {}) or {}
+        for dish_name in traditional_uses.get("dishes", []):
+            for dish_id in dishes.match(dish_name):
+                graph.add_edge(variety, ("dish", dish_id))
+
+    regional_names: Dict[str, List[str]] = {}
+    for file_path in sorted(DISH_REGIONAL_DIR.glob("*.json")):
+        data = load_json(file_path)
+        region_name = data.get("metadata", {}).get("region") or data.get("data", {}).get("region")
+        regional_names[file_path.stem] = split_names(region_name or "")
+
+    unmatched = Counter()
+    for dish_id, data in dish_data.items():
+        dish = ("dish", dish_id)
+        plant_perspective = data.get("detailed_research", {}).get("plant_centric_perspective", {}) or {}
+        for ingredient in plant_perspective.get("core_plant_ingredients", []):
+            vegetable_ids = vegetables.match(ingredient)
+            variety_ids = varieties.match(ingredient)
+            for vegetable_id in vegetable_ids:
+                graph.add_edge(dish, ("vegetable", vegetable_id))
+            for variety_id in variety_ids:
+                graph.add_edge(dish, ("variety", variety_id))
+            if not vegetable_ids and not variety_ids:
+                unmatched[ingredient] += 1
+
+        # 料理ID「01_cy_001」の地域別データは「01_cy」
+        region_names = split_names(data.get("entry_metadata", {}).get("region", ""))
+        region_names += regional_names.get(dish_id.rsplit("_", 1)[0], [])
+        for region_name in region_names:
+            region = graph.add_region(region_name)
+            if region is not None:
+                graph.add_edge(dish, region)
+    return graph, unmatched
+
+
+@instrumentation.instrumented("graph", outputs=[GRAPH_DIR])
+def main():
+    """野菜・品種・料理・地域の関係グラフを作り、ノードごとの隣接リストを GRAPH_DIR に書き出す。"""
+    graph, unmatched = build_graph()
+    counts = graph.write(GRAPH_DIR)
+
+    stats = {
+        "nodes": counts,
+        "edges": graph.edge_count(),
+        "unmatched_ingredients": unmatched.most_common(UNMATCHED_REPORT_SIZE),
+    }
+    with open(GRAPH_STATS_FILE, 'w', encoding='utf-8') as f:
+        json.dump(stats, f, ensure_ascii=False, indent=2)
+
+    summary = "、".join(f"{node_type} {count}件" for node_type, count in counts.items())
+    print(f"✅ {summary}、{stats['edges']}本の関係を {GRAPH_DIR} に保存しました。")
+    print(f"照合できなかった食材: {sum(unmatched.values())}件（{len(unmatched)}種類、{GRAPH_STATS_FILE}）")
+
+
+if __name__ == "__main__":
+    argparse.ArgumentParser(description="野菜・品種・料理・地域の関係グラフを作成する").parse_args()
+    main()
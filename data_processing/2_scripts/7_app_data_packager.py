@@ -0,0 +1,197 @@
+import argparse
+import gzip
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import config
+import instrumentation
+from app_bundle import write_bundle
+
+try:
+    import brotli
+except ImportError:  # brotli が無い環境では .br を作らない
+    brotli = None
+
+APP_DATA_DIR = config.APP_DATA
+PACKED_DATA_DIR = config.PACKED_DATA
+SIZE_REPORT_FILE = PACKED_DATA_DIR / "_size_report.json"
+
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+
+def minify(data: Any) -> bytes:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def minify_json(file_path: Path) -> bytes:
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return minify(json.load(f))
+
+
+def split_locales(data: Dict[str, Any]) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """
+    global_info + content.<言語> の形のレコードを、(言語に依らない部分, 言語 → content) に分ける。
+    言語に依らない部分には、用意されている言語の一覧を locales として付ける。ほかの形のレコードは None。
+    """
+    content = data.get("content")
+    if "global_info" not in data or not isinstance(content, dict):
+        return None
+    shared = {key: value for key, value in data.items() if key != "content"}
+    shared["locales"] = sorted(content)
+    return shared, content
+
+
+def write_compressed(file_path: Path, body: bytes) -> Dict[str, int]:
+    """
+    本体と、nginx の gzip_static / brotli_static 用の .gz / .br を並べて書き出し、各サイズを返す。
+    gzip の mtime を固定し、内容が同じなら毎回同じバイト列になるようにする。
+    各ファイルは一時ファイルから置き換え、本体を最後に書く（本体があれば .gz / .br も揃っている）。
+    """
+    variants = compressed_variants(file_path)
+    gz_body = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    _write_atomic(variants[0], gz_body)
+    sizes = {"minified": len(body), "gzip": len(gz_body)}
+    if brotli is not None:
+        br_body = brotli.compress(body, quality=BROTLI_QUALITY)
+        _write_atomic(variants[1], br_body)
+        sizes["brotli"] = len(br_body)
+    _write_atomic(file_path, body)
+    return sizes
+
+
+def compressed_variants(file_path: Path) -> Tuple[Path, ...]:
+    """write_compressed が本体の横に作る .gz と、brotli があれば .br。"""
+    variants = [file_path.with_name(file_path.name + ".gz")]
+    if brotli is not None:
+        variants.append(file_path.with_name(file_path.name + ".br"))
+    return tuple(variants)
+
+
+def _write_atomic(file_path: Path, body: bytes):
+    tmp_path = file_path.with_name(file_path.name + ".tmp")
+    tmp_path.write_bytes(body)
+    tmp_path.replace(file_path)
+
+
+def _clear_dir(directory: Path):
+    directory.mkdir(parents=True, exist_ok=True)
+    for old_file in directory.iterdir():
+        if old_file.is_file():
+            old_file.unlink()
+
+
+def _empty_report() -> Dict[str, int]:
+    report = {"files": 0, "raw": 0, "minified": 0, "gzip": 0}
+    if brotli is not None:
+        report["brotli"] = 0
+    return report
+
+
+def _write_bundle(bundle_file: Path, records: Dict[str, bytes], report: Dict[str, int]):
+    bundle_file.parent.mkdir(parents=True, exist_ok=True)
+    write_bundle(bundle_file, records)
+    bundle_sizes = write_compressed(bundle_file, bundle_file.read_bytes())
+    for name, size in bundle_sizes.items():
+        report[f"bundle_{name}"] = size
+
+
+def pack_collection(collection_dir: Path, packed_dir: Path) -> Dict[str, Dict[str, int]]:
+    """
+    1コレクション（5_app_data のサブディレクトリ）を処理し、出力ごとのサイズを返す。
+    - {コレクション}/{キー}.json : 最小化した個別レコード（.gz / .br 付き）
+    - {コレクション}.bundle      : 全レコードをオフセット表付きで連結したもの（.gz / .br 付き）
+    global_info + content.<言語> のレコードは言語ごとに分け、利用者が自分の言語の分だけを読めるようにする。
+    - {コレクション}/{キー}.json          : global_info と locales（言語に依らない部分）
+    - {言語}/{コレクション}/{キー}.json   : content.<言語> の中身
+    - {言語}/{コレクション}.bundle        : その言語の content の連結
+    """
+    out_dir = packed_dir / collection_dir.name
+    _clear_dir(out_dir)
+    # 前回の言語別出力も消す（content から消えた言語や、削除されたレコードを残さない）
+    for old_bundle in packed_dir.glob(f"*/{collection_dir.name}.bundle*"):
+        old_bundle.unlink()
+    for lang_dir in packed_dir.glob(f"*/{collection_dir.name}"):
+        _clear_dir(lang_dir)
+        lang_dir.rmdir()
+        if not any(lang_dir.parent.iterdir()):
+            lang_dir.parent.rmdir()
+
+    reports: Dict[str, Dict[str, int]] = {collection_dir.name: _empty_report()}
+    records: Dict[str, Dict[str, bytes]] = {collection_dir.name: {}}
+    for file_path in sorted(collection_dir.glob("*.json")):
+        with open(file_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        parts = {collection_dir.name: (out_dir, data)}
+        split = split_locales(data)
+        if split is not None:
+            shared, content = split
+            parts[collection_dir.name] = (out_dir, shared)
+            for lang, lang_content in content.items():
+                lang_dir = packed_dir / lang / collection_dir.name
+                name = f"{lang}/{collection_dir.name}"
+                if name not in reports:
+                    _clear_dir(lang_dir)
+                    reports[name] = _empty_report()
+                    records[name] = {}
+                parts[name] = (lang_dir, lang_content)
+        reports[collection_dir.name]["raw"] += file_path.stat().st_size
+
+        for name, (target_dir, part) in parts.items():
+            body = minify(part)
+            records[name][file_path.stem] = body
+            sizes = write_compressed(target_dir / file_path.name, body)
+            reports[name]["files"] += 1
+            for size_name, size in sizes.items():
+                reports[name][size_name] += size
+
+    for name, collection_records in records.items():
+        _write_bundle(packed_dir / f"{name}.bundle", collection_records, reports[name])
+    return reports
+
+
+def print_report(report: Dict[str, Dict[str, int]]):
+    print(f"{'コレクション':<20}{'件数':>6}{'元':>12}{'最小化':>12}{'gzip':>12}{'brotli':>12}")
+    for name, sizes in report.items():
+        brotli_size = f"{sizes['brotli']:,}" if "brotli" in sizes else "-"
+        print(
+            f"{name:<20}{sizes['files']:>6}{sizes['raw']:>12,}{sizes['minified']:>12,}"
+            f"{sizes['gzip']:>12,}{brotli_size:>12}"
+        )
+
+
+@instrumentation.instrumented("package", outputs=[PACKED_DATA_DIR])
+def main(collections: Optional[List[str]] = None):
+    """5_app_data の各コレクションを、配信用に最小化・圧縮・バンドル化する。"""
+    collection_dirs = sorted(d for d in APP_DATA_DIR.iterdir() if d.is_dir())
+    if collections:
+        collection_dirs = [d for d in collection_dirs if d.name in collections]
+    if brotli is None:
+        print("brotli がインストールされていないため、.br は作成しません。")
+
+    PACKED_DATA_DIR.mkdir(parents=True, exist_ok=True)
+    report: Dict[str, Dict[str, int]] = {}
+    for collection_dir in collection_dirs:
+        collection_report = pack_collection(collection_dir, PACKED_DATA_DIR)
+        report.update(collection_report)
+        locales = [name.split("/", 1)[0] for name in collection_report if "/" in name]
+        split = f"（言語別: {', '.join(locales)}）" if locales else ""
+        print(f"✅ {collection_dir.name}: {collection_report[collection_dir.name]['files']}件{split}")
+
+    # 検索用の _index.json（ほかの言語は _index.en.json など）もあわせて最小化しておく
+    for index_file in sorted(APP_DATA_DIR.glob("_index*.json")):
+        sizes = write_compressed(PACKED_DATA_DIR / index_file.name, minify_json(index_file))
+        report[index_file.name] = dict(sizes, files=1, raw=index_file.stat().st_size)
+
+    with open(SIZE_REPORT_FILE, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print_report(report)
+    print(f"サイズの比較を {SIZE_REPORT_FILE} に保存しました。")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="5_app_data を配信用に最小化・圧縮・バンドル化する")
+    parser.add_argument("collections", nargs="*", help="対象のコレクション名（省略時はすべて）")
+    args = parser.parse_args()
+    main(args.collections)
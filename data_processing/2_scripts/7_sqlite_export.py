@@ -0,0 +1,258 @@
+import argparse
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+import config
+import instrumentation
+from corpus_model import GlobalInfo
+
+APP_DATA_DIR = config.APP_DATA
+DB_FILE = config.PACKED_DATA / "vegitage.sqlite3"
+
+# 1トランザクションで書き込む行数
+BATCH_SIZE = 500
+
+# 概要（global_info + content）を持つコレクション: テーブル上の名前（API のリソース名） → (概要, 詳細)
+ENTRY_COLLECTIONS = {
+    "vegetables": ("vegetable_summary", "vegetable_detail"),
+    "species": ("species_summary", "species_detail"),
+    "varieties": ("varieties_summary", "varieties_detail"),
+}
+DISH_COLLECTION = "dish_data"
+
+# 全文検索の対象にする content.ja の項目
+ENTRY_TEXT_FIELDS = ("display_name", "oneliner", "description", "practical_tips")
+DISH_TEXT_FIELDS = ("name", "catch_copy", "abstract")
+
+# trigram トークナイザは3文字単位で索引を作るため、2文字以下の語は MATCH で引けない（LIKE で探す）
+MIN_MATCH_LENGTH = 3
+
+SCHEMA = f"""
+CREATE TABLE entries (
+    id INTEGER PRIMARY KEY,
+    collection TEXT NOT NULL,
+    key TEXT NOT NULL,
+    url TEXT,
+    kana_name TEXT,
+    display_name TEXT,
+    scientific_name TEXT,
+    family_ja TEXT,
+    genus_ja TEXT,
+    primary_part TEXT,
+    edible_parts TEXT,      -- JSON 配列
+    names_ja TEXT,          -- JSON 配列
+    names_en TEXT,          -- JSON 配列
+    summary TEXT NOT NULL,  -- レコード全体の JSON
+    detail TEXT,            -- 詳細データの JSON（ない場合は NULL）
+    UNIQUE (collection, key)
+);
+CREATE INDEX entries_kana_name ON entries (kana_name);
+CREATE INDEX entries_scientific_name ON entries (scientific_name);
+CREATE INDEX entries_family_ja ON entries (family_ja);
+
+CREATE TABLE dishes (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    name_ja TEXT,
+    name_local TEXT,
+    name_en TEXT,
+    local_language TEXT,
+    region TEXT,
+    data TEXT NOT NULL      -- レコード全体の JSON
+);
+CREATE INDEX dishes_region ON dishes (region);
+
+CREATE VIRTUAL TABLE entries_fts USING fts5({", ".join(ENTRY_TEXT_FIELDS)}, tokenize='trigram');
+CREATE VIRTUAL TABLE dishes_fts USING fts5({", ".join(DISH_TEXT_FIELDS)}, tokenize='trigram');
+"""
+
+
+def load_json(file_path: Path) -> Dict[str, Any]:
+    metrics = instrumentation.current()
+    if metrics is not None:
+        metrics.read_file(file_path)
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _dump(data: Any) -> str:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+def entry_rows(collection: str, summary_dir: Path, detail_dir: Path) -> Iterator[Tuple[tuple, tuple]]:
+    """1コレクションの (entries の行, entries_fts の行) を順に返す。"""
+    for file_path in sorted(summary_dir.glob("*.json")):
+        data = load_json(file_path)
+        global_info = GlobalInfo.from_dict(data.get("global_info"))
+        ja = (data.get("content") or {}).get("ja") or {}
+        detail_file = detail_dir / file_path.name
+        detail = _dump(load_json(detail_file)) if detail_file.exists() else None
+        yield (
+            collection,
+            file_path.stem,
+            global_info.url,
+            global_info.kana_name,
+            ja.get("display_name"),
+            global_info.scientific_name,
+            global_info.classification.family_ja,
+            global_info.classification.genus_ja,
+            global_info.food_classification.primary_part,
+            _dump(list(global_info.food_classification.edible_parts or ())),
+            _dump(list(global_info.names.common("ja"))),
+            _dump(list(global_info.names.common("en"))),
+            _dump(data),
+            detail,
+        ), tuple(ja.get(field) or "" for field in ENTRY_TEXT_FIELDS)
+
+
+def dish_rows(dish_dir: Path) -> Iterator[Tuple[tuple, tuple]]:
+    """料理の (dishes の行, dishes_fts の行) を順に返す。"""
+    for file_path in sorted(dish_dir.glob("*.json")):
+        data = load_json(file_path)
+        metadata = data.get("entry_metadata", {})
+        summary = data.get("detailed_research", {}).get("summary", {}) or {}
+        yield (
+            file_path.stem,
+            metadata.get("concept_name_ja"),
+            metadata.get("concept_name_local"),
+            metadata.get("concept_name_en"),
+            metadata.get("local_language"),
+            metadata.get("region"),
+            _dump(data),
+        ), (metadata.get("concept_name_ja") or "", summary.get("catch_copy") or "", summary.get("abstract") or "")
+
+
+def bulk_insert(conn: sqlite3.Connection, table: str, columns: List[str], rows: Iterable[Tuple[tuple, tuple]], text_columns: Iterable[str]) -> int:
+    """
+    rows を BATCH_SIZE 行ずつ1トランザクションで書き込み、件数を返す。
+    本体と全文検索の行は同じ rowid で対応づける（同じ SQL 文を使い回すため、準備済みの文が再利用される）。
+    """
+    text_columns = list(text_columns)
+    insert = f"INSERT INTO {table} (id, {', '.join(columns)}) VALUES (?, {', '.join('?' * len(columns))})"
+    insert_text = f"INSERT INTO {table}_fts (rowid, {', '.join(text_columns)}) VALUES (?, {', '.join('?' * len(text_columns))})"
+    row_id = conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}").fetchone()[0]
+    count = 0
+    batch, text_batch = [], []
+
+    def flush():
+        with conn:
+            conn.executemany(insert, batch)
+            conn.executemany(insert_text, text_batch)
+        batch.clear()
+        text_batch.clear()
+
+    for row, text_row in rows:
+        row_id += 1
+        batch.append((row_id, *row))
+        text_batch.append((row_id, *text_row))
+        count += 1
+        if len(batch) >= BATCH_SIZE:
+            flush()
+    if batch:
+        flush()
+    return count
+
+
+ENTRY_COLUMNS = [
+    "collection", "key", "url", "kana_name", "display_name", "scientific_name", "family_ja", "genus_ja",
+    "primary_part", "edible_parts", "names_ja", "names_en", "summary", "detail",
+]
+DISH_COLUMNS = ["key", "name_ja", "name_local", "name_en", "local_language", "region", "data"]
+
+
+@instrumentation.instrumented("sqlite_export", outputs=[DB_FILE])
+def main(db_file: Path = DB_FILE):
+    """5_app_data の野菜・品目・品種・料理を1つの SQLite データベースに書き出す（全文検索の索引付き）。"""
+    db_file.parent.mkdir(parents=True, exist_ok=True)
+    # 一時ファイルに作ってから置き換え、読み手が作成途中のデータベースを開かないようにする
+    tmp_file = db_file.with_name(db_file.name + ".tmp")
+    tmp_file.unlink(missing_ok=True)
+    conn = sqlite3.connect(tmp_file)
+    try:
+        # 作り直せるファイルなので、ジャーナルと同期を省いて書き込みを速くする
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.executescript(SCHEMA)
+
+        counts = {}
+        for collection, (summary_name, detail_name) in ENTRY_COLLECTIONS.items():
+            rows = entry_rows(collection, APP_DATA_DIR / summary_name, APP_DATA_DIR / detail_name)
+            counts[collection] = bulk_insert(conn, "entries", ENTRY_COLUMNS, rows, ENTRY_TEXT_FIELDS)
+        counts["dishes"] = bulk_insert(conn, "dishes", DISH_COLUMNS, dish_rows(APP_DATA_DIR / DISH_COLLECTION), DISH_TEXT_FIELDS)
+
+        with conn:
+            conn.execute("INSERT INTO entries_fts (entries_fts) VALUES ('optimize')")
+            conn.execute("INSERT INTO dishes_fts (dishes_fts) VALUES ('optimize')")
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+    tmp_file.replace(db_file)
+
+    metrics = instrumentation.current()
+    if metrics is not None:
+        metrics.count("records", sum(counts.values()))
+    summary = "、".join(f"{name} {count}件" for name, count in counts.items())
+    print(f"✅ {summary}を {db_file} に保存しました（{db_file.stat().st_size:,} bytes）。")
+
+
+def search(conn: sqlite3.Connection, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+    """
+    概要と料理を全文検索し、{type, collection, key, name, snippet} を一致度の高い順に返す。
+    3文字以上は FTS5 の MATCH（フレーズ一致）、2文字以下は trigram 索引が使えないため LIKE で探す。
+    """
+    query = query.strip()
+    if not query:
+        return []
+    targets = [
+        ("entry", "entries", "entries.collection, entries.key, entries.display_name", ENTRY_TEXT_FIELDS),
+        ("dish", "dishes", "'dishes', dishes.key, dishes.name_ja", DISH_TEXT_FIELDS),
+    ]
+    results = []
+    for kind, table, columns, text_fields in targets:
+        if len(query) >= MIN_MATCH_LENGTH:
+            phrase = '"' + query.replace('"', '""') + '"'
+            sql = (
+                f"SELECT {columns}, snippet({table}_fts, -1, '[', ']', '…', 12), rank FROM {table}_fts "
+                f"JOIN {table} ON {table}.id = {table}_fts.rowid WHERE {table}_fts MATCH ? ORDER BY rank LIMIT ?"
+            )
+            params = (phrase, limit)
+        else:
+            condition = " OR ".join(f"{table}_fts.{field} LIKE ?" for field in text_fields)
+            sql = (
+                f"SELECT {columns}, '', 0 FROM {table}_fts "
+                f"JOIN {table} ON {table}.id = {table}_fts.rowid WHERE {condition} LIMIT ?"
+            )
+            params = (*[f"%{query}%"] * len(text_fields), limit)
+        for collection, key, name, snippet, rank in conn.execute(sql, params):
+            results.append({
+                "type": kind, "collection": collection, "key": key, "name": name, "snippet": snippet, "rank": rank,
+            })
+    results.sort(key=lambda result: result["rank"])
+    return results[:limit]
+
+
+def query(text: str, limit: int, db_file: Path = DB_FILE):
+    """保存済みのデータベースを全文検索し、結果と所要時間を表示する（確認用）。"""
+    conn = sqlite3.connect(f"file:{db_file}?mode=ro", uri=True)
+    started = time.perf_counter()
+    results = search(conn, text, limit)
+    elapsed = (time.perf_counter() - started) * 1000
+    conn.close()
+    print(f"{len(results)}件（{elapsed:.2f}ms）")
+    for result in results:
+        print(f"  [{result['collection']}] {result['key']}  {result['name']}  {result['snippet']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="5_app_data を全文検索付きの SQLite データベースに書き出す")
+    parser.add_argument("--query", help="作成せず、保存済みのデータベースを全文検索して表示する")
+    parser.add_argument("--limit", type=int, default=20, help="表示する件数")
+    args = parser.parse_args()
+
+    if args.query:
+        query(args.query, args.limit)
+    else:
+        main()
@@ -0,0 +1,172 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import config
+import instrumentation
+from pipeline import load_stage_module
+
+APP_DATA_DIR = config.APP_DATA
+# 公開するディレクトリと、マニフェストのキーに付ける接頭辞
+PUBLISH_ROOTS = [
+    ("", APP_DATA_DIR),
+    ("assets/", config.FRONTEND_ASSET_DATA),  # アプリ同梱データの更新分もサーバーから配る
+]
+PUBLISH_DIR = config.DATA_DIR / "7_published"
+FILES_DIR = PUBLISH_DIR / "files"      # 内容ハッシュ付きのファイル（公開済みの全版）
+DELTA_DIR = PUBLISH_DIR / "delta"      # 今回アップロードするものだけ
+MANIFEST_FILE = PUBLISH_DIR / "manifest.json"
+DELTA_FILE_NAME = "_delta.json"
+
+# ファイル名に入れるハッシュ（sha256 の16進）の長さ
+HASH_LENGTH = 16
+
+# 最小化と .gz / .br の作成はパッケージ化と同じものを使う
+packager = load_stage_module("7_app_data_packager.py")
+
+
+def content_hash(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()[:HASH_LENGTH]
+
+
+def iter_records(app_data_dir: Path, prefix: str = "") -> Iterator[Tuple[str, Path]]:
+    """
+    公開するファイルを (マニフェストのキー, パス) で返す。
+    キーはコレクションのレコードなら「コレクション/キー」、直下の _index.json などは「_index」。
+    prefix を指定すると、キーの先頭に付ける（「assets/vegetable_summary/hyssop」）。
+    """
+    for file_path in sorted(app_data_dir.glob("*.json")):
+        yield f"{prefix}{file_path.stem}", file_path
+    for collection_dir in sorted(d for d in app_data_dir.iterdir() if d.is_dir()):
+        for file_path in sorted(collection_dir.glob("*.json")):
+            yield f"{prefix}{collection_dir.name}/{file_path.stem}", file_path
+
+
+def iter_published(roots=PUBLISH_ROOTS) -> Iterator[Tuple[str, Path]]:
+    """PUBLISH_ROOTS のうち存在するディレクトリのファイルを、接頭辞付きのキーで順に返す。"""
+    for prefix, root in roots:
+        if root.is_dir():
+            yield from iter_records(root, prefix)
+
+
+def hashed_path(record_key: str, digest: str) -> str:
+    """「vegetable_summary/hyssop」→「vegetable_summary/hyssop.{ハッシュ}.json」（FILES_DIR からの相対パス）"""
+    return f"{record_key}.{digest}.json"
+
+
+def _link_or_copy(source: Path, target: Path):
+    """FILES_DIR のファイルは書き換えないので、差分にはハードリンクを置く（別のファイルシステムならコピー）。"""
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+
+
+def load_manifest(manifest_file: Path) -> Optional[Dict[str, Any]]:
+    if not manifest_file.exists():
+        return None
+    with open(manifest_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def diff_manifests(previous: Optional[Dict[str, Any]], current: Dict[str, Any]) -> Dict[str, Any]:
+    """前回のマニフェストからの追加・変更・削除（レコードのキーのリスト）。"""
+    before = previous["files"] if previous else {}
+    after = current["files"]
+    return {
+        "from": previous["id"] if previous else None,
+        "to": current["id"],
+        "added": sorted(key for key in after if key not in before),
+        "changed": sorted(key for key in after if key in before and before[key]["hash"] != after[key]["hash"]),
+        "removed": sorted(key for key in before if key not in after),
+    }
+
+
+def prune(files_dir: Path, manifests) -> int:
+    """どのマニフェストからも参照されていないハッシュ付きファイル（と .gz / .br）を消し、件数を返す。"""
+    referenced = {entry["path"] for manifest in manifests if manifest for entry in manifest["files"].values()}
+    removed = 0
+    for file_path in files_dir.rglob("*.json"):
+        if file_path.relative_to(files_dir).as_posix() not in referenced:
+            for variant in (file_path, file_path.with_name(file_path.name + ".gz"), file_path.with_name(file_path.name + ".br")):
+                variant.unlink(missing_ok=True)
+            removed += 1
+    return removed
+
+
+@instrumentation.instrumented("publish", outputs=[PUBLISH_DIR])
+def main(previous_manifest: Optional[Path] = None, prune_old: bool = False):
+    """
+    5_app_data とアプリ同梱データ（キーは assets/ 付き）のレコードごとに内容ハッシュ付きのファイルを作り、マニフェストを書き出す。
+    前回のマニフェストと比べて追加・変更されたファイルだけを DELTA_DIR にまとめる（サーバーへはこれだけを送ればよい）。
+    """
+    previous = load_manifest(previous_manifest or MANIFEST_FILE)
+    metrics = instrumentation.current()
+
+    shutil.rmtree(DELTA_DIR, ignore_errors=True)
+    DELTA_DIR.mkdir(parents=True, exist_ok=True)
+    FILES_DIR.mkdir(parents=True, exist_ok=True)
+
+    files: Dict[str, Dict[str, Any]] = {}
+    written = 0
+    for record_key, file_path in iter_published():
+        if metrics is not None:
+            metrics.read_file(file_path)
+        body = packager.minify_json(file_path)
+        digest = content_hash(body)
+        relative_path = hashed_path(record_key, digest)
+        files[record_key] = {"hash": digest, "path": relative_path, "bytes": len(body)}
+
+        # 同じ内容のファイルは作成済みなので、最小化・圧縮を省く（中断で .gz / .br が欠けていれば作り直す）
+        target = FILES_DIR / relative_path
+        if not all(p.exists() for p in (target, *packager.compressed_variants(target))):
+            target.parent.mkdir(parents=True, exist_ok=True)
+            packager.write_compressed(target, body)
+            written += 1
+
+    manifest_body = json.dumps(files, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    manifest = {
+        "version": 1,
+        "id": content_hash(manifest_body),
+        "published_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "files": files,
+    }
+    delta = diff_manifests(previous, manifest)
+
+    for record_key in delta["added"] + delta["changed"]:
+        source = FILES_DIR / files[record_key]["path"]
+        for variant in (source, source.with_name(source.name + ".gz"), source.with_name(source.name + ".br")):
+            if variant.exists():
+                target = DELTA_DIR / "files" / variant.relative_to(FILES_DIR)
+                target.parent.mkdir(parents=True, exist_ok=True)
+                _link_or_copy(variant, target)
+
+    manifest_text = json.dumps(manifest, ensure_ascii=False, separators=(",", ":"))
+    for manifest_file in (MANIFEST_FILE, DELTA_DIR / MANIFEST_FILE.name):
+        manifest_file.write_text(manifest_text, encoding="utf-8")
+    with open(DELTA_DIR / DELTA_FILE_NAME, 'w', encoding='utf-8') as f:
+        json.dump(delta, f, ensure_ascii=False, indent=2)
+
+    if metrics is not None:
+        metrics.count("records", len(files))
+    print(f"{len(files)}件（新規作成 {written}件）のマニフェスト {manifest['id']} を {MANIFEST_FILE} に保存しました。")
+    print(f"前回 {delta['from'] or 'なし'} からの差分: 追加 {len(delta['added'])}件、変更 {len(delta['changed'])}件、削除 {len(delta['removed'])}件")
+    print(f"✅ アップロードするファイルを {DELTA_DIR} にまとめました。")
+
+    if prune_old:
+        removed = prune(FILES_DIR, [previous, manifest])
+        print(f"前回・今回のマニフェストにない {removed}件のファイルを削除しました。")
+    return delta
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="5_app_data とアプリ同梱データを内容ハッシュ付きのファイル名で公開し、前回からの差分だけをまとめる")
+    parser.add_argument("--previous", type=Path, default=None, help=f"比較する公開済みのマニフェスト（既定: {MANIFEST_FILE}）")
+    parser.add_argument("--prune", action="store_true", help="前回・今回のマニフェストから参照されない古いファイルを削除する")
+    args = parser.parse_args()
+    main(previous_manifest=args.previous, prune_old=args.prune)
@@ -0,0 +1,104 @@
+import mmap
+import struct
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# バンドルファイルの形式（数値はすべてリトルエンディアン）
+#
+#   ヘッダ (16 bytes)   : MAGIC(8) + バージョン(uint32) + レコード数(uint32)
+#   オフセット表        : レコード数 × 24 bytes（キーのバイト列順）
+#                         キー位置(uint64) + キー長(uint32) + データ位置(uint64) + データ長(uint32)
+#   キー領域            : UTF-8 のキーを連結したもの
+#   データ領域          : 最小化した JSON（UTF-8）を連結したもの
+#
+# オフセット表は固定長なので、mmap したまま二分探索でキーを引き、該当レコードだけを切り出せる。
+MAGIC = b"VGBUNDLE"
+VERSION = 1
+HEADER = struct.Struct("<8sII")
+ENTRY = struct.Struct("<QIQI")
+
+
+def write_bundle(bundle_file: Path, records: Dict[str, bytes]):
+    """{キー: 最小化済み JSON のバイト列} をバンドルファイルに書き出す。"""
+    items = sorted((key.encode("utf-8"), data) for key, data in records.items())
+    keys_start = HEADER.size + ENTRY.size * len(items)
+    data_start = keys_start + sum(len(key) for key, _ in items)
+
+    table = bytearray()
+    key_offset, data_offset = keys_start, data_start
+    for key, data in items:
+        table += ENTRY.pack(key_offset, len(key), data_offset, len(data))
+        key_offset += len(key)
+        data_offset += len(data)
+
+    tmp_path = bundle_file.with_suffix(".tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(items)))
+        f.write(table)
+        for key, _ in items:
+            f.write(key)
+        for _, data in items:
+            f.write(data)
+    tmp_path.replace(bundle_file)
+
+
+class BundleReader:
+    """
+    バンドルファイルを mmap して、キーでレコードを引く。
+    読み込み時に全体を解析しないので、レコード数によらず開くのは一瞬で済む。
+    """
+
+    def __init__(self, bundle_file: Path):
+        self.bundle_file = bundle_file
+        self._file = open(bundle_file, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"バンドルファイルの形式が不正です: {bundle_file}")
+
+    def _entry(self, i: int) -> Tuple[int, int, int, int]:
+        return ENTRY.unpack_from(self._mmap, HEADER.size + ENTRY.size * i)
+
+    def _key(self, i: int) -> bytes:
+        key_offset, key_length, _, _ = self._entry(i)
+        return self._mmap[key_offset:key_offset + key_length]
+
+    def get(self, key: str) -> Optional[bytes]:
+        """キーのレコード（最小化済み JSON のバイト列）を返す。なければ None。"""
+        target = key.encode("utf-8")
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count and self._key(lo) == target:
+            _, _, data_offset, data_length = self._entry(lo)
+            return self._mmap[data_offset:data_offset + data_length]
+        return None
+
+    def keys(self) -> List[str]:
+        return [self._key(i).decode("utf-8") for i in range(self.count)]
+
+    def items(self) -> Iterator[Tuple[str, bytes]]:
+        for i in range(self.count):
+            key_offset, key_length, data_offset, data_length = self._entry(i)
+            yield (
+                self._mmap[key_offset:key_offset + key_length].decode("utf-8"),
+                self._mmap[data_offset:data_offset + data_length],
+            )
+
+    def __len__(self) -> int:
+        return self.count
+
+    def close(self):
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self) -> "BundleReader":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
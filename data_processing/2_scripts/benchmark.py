@@ -0,0 +1,253 @@
+import argparse
+import inspect
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import benchmark_corpus
+import config
+from fake_gemini import FakeGeminiClient
+from pipeline import STAGES, load_stage_module
+
+# 合成データは10万件規模になるので、リポジトリの外（一時ディレクトリ）に置く。
+# 前回の結果と比べるため、固定の名前にして実行をまたいで残す
+BENCH_DIR = Path(tempfile.gettempdir()) / "vegitage_benchmark"
+RESULTS_FILE = BENCH_DIR / "results.jsonl"
+
+# (計測名 = instrumentation のステージ名, スクリプト)。合成データの依存順に並べる
+BENCH_STAGES = [
+    ("wikitext_extract", "extract_vegetables_from_wikitext.py"),
+    ("variety_details_jsonl", "1_variety_details_jsonl_create.py"),
+    ("species_processing", "5_species_processing.py"),
+    ("variety_detail", "5_variety_detail.py"),
+    ("variety_summary_jsonl", "1_variety_summary_jsonl_create.py"),
+    ("gemini_batch", "2_gemini_batch_create.py"),
+    ("batch_to_files", "3_gemini_batch_to_files.py"),
+    ("variety_summary", "5_variety_summary.py"),
+    ("index", "6_index_generator.py"),
+]
+
+# 実行のたびに消す、ステージの出力先（合成した入力は残す）
+RUN_OUTPUTS = [
+    "2_raw_responses",
+    "3_raw_data/varieties_summary",
+    "3_raw_data/varieties_summary_error",
+    "4_processing_data",
+    "response_cache",
+    "metrics",
+    "logs",
+]
+
+# 前回より wall_seconds / peak_rss_bytes がこの割合以上増えたら劣化とみなす
+REGRESSION_THRESHOLD = 0.2
+
+
+def summary_responder():
+    """実データの品種 summary から、キーごとに決まった応答を返す関数を作る（偽 Gemini 用）。"""
+    texts = []
+    for _, record in benchmark_corpus.load_samples(benchmark_corpus.SOURCE_APP_DATA / "varieties_summary"):
+        ja = {k: v for k, v in record["content"]["ja"].items() if k != "relationships"}
+        texts.append(json.dumps({"content": {"ja": ja}}, ensure_ascii=False, indent=2))
+
+    def respond(key: str, prompt: str) -> str:
+        return texts[zlib.crc32(key.encode("utf-8")) % len(texts)]
+    return respond
+
+
+def run_stage(name: str, workers: int = 1, failure_rate: float = 0.0):
+    """
+    子プロセス側: 1ステージの main() を実行する。
+    config.DATA_DIR は親が環境変数で合成データに差し替えている。
+    """
+    script = dict(BENCH_STAGES)[name]
+    main = load_stage_module(script).main
+    params = inspect.signature(main).parameters
+    kwargs: Dict[str, Any] = {}
+    if "workers" in params:
+        kwargs["workers"] = workers
+    if name == "gemini_batch":
+        kwargs.update(client=FakeGeminiClient(summary_responder(), failure_rate=failure_rate), poll_interval=0)
+    if name == "index":
+        kwargs["shards"] = True
+    main(**kwargs)
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=config.SCRIPT_DIR, capture_output=True, text=True,
+        )
+    except OSError:
+        return None
+    return result.stdout.strip() or None
+
+
+def _clean_outputs(corpus_dir: Path):
+    """前回の出力を消し、各ステージの出力先ディレクトリを作り直す（スクリプトは作成済みを前提にしている）。"""
+    for name in RUN_OUTPUTS:
+        shutil.rmtree(corpus_dir / name, ignore_errors=True)
+    for path in (corpus_dir / "1_input_lists").glob("*.jsonl"):
+        path.unlink()
+    for stage in STAGES:
+        for output in stage.outputs:
+            target = corpus_dir / output.relative_to(config.DATA_DIR)
+            (target.parent if target.suffix else target).mkdir(parents=True, exist_ok=True)
+
+
+def measure(name: str, corpus_dir: Path, workers: int, failure_rate: float) -> Dict[str, Any]:
+    """1ステージを別プロセスで実行し（最大RSSをステージごとに分けるため）、計測結果を返す。"""
+    log_dir = corpus_dir / "logs"
+    log_dir.mkdir(parents=True, exist_ok=True)
+    env = dict(os.environ, VEGITAGE_PIPELINE_DATA_DIR=str(corpus_dir))
+    command = [
+        sys.executable, str(Path(__file__).resolve()),
+        "--run-stage", name, "--workers", str(workers), "--failure-rate", str(failure_rate),
+    ]
+    with open(log_dir / f"{name}.log", 'w', encoding='utf-8') as log:
+        returncode = subprocess.run(command, env=env, cwd=config.SCRIPT_DIR, stdout=log, stderr=subprocess.STDOUT).returncode
+
+    metrics_file = corpus_dir / "metrics" / f"{name}.json"
+    if returncode != 0 or not metrics_file.exists():
+        return {"stage": name, "status": "error", "log": str(log_dir / f"{name}.log")}
+    with open(metrics_file, 'r', encoding='utf-8') as f:
+        report = json.load(f)
+    counters = report["counters"]
+    # 1件ずつの処理時間を記録しないステージは、読んだ・書いたファイル数で数える
+    items = counters["records"] or counters["files_read"] or counters["files_written"]
+    wall = report["wall_seconds"]
+    return {
+        "stage": name,
+        "status": report["status"],
+        "wall_seconds": wall,
+        "cpu_seconds": report["cpu_seconds"],
+        "peak_rss_bytes": report["peak_rss_bytes"],
+        "items": items,
+        "items_per_second": round(items / wall, 1) if wall else None,
+        "bytes_in": counters["bytes_in"],
+        "bytes_out": counters["bytes_out"],
+        "errors": counters["errors"],
+    }
+
+
+def load_previous(results_file: Path = RESULTS_FILE) -> Dict[tuple, Dict[str, Any]]:
+    """(ステージ, 件数, ワーカー数) ごとの直近の結果。"""
+    previous = {}
+    if results_file.exists():
+        with open(results_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    previous[(row["stage"], row["scale"], row["workers"])] = row
+    return previous
+
+
+def regressions(row: Dict[str, Any], before: Optional[Dict[str, Any]], threshold: float) -> List[str]:
+    if not before or row["status"] != "ok" or before.get("status") != "ok":
+        return []
+    found = []
+    for key in ("wall_seconds", "peak_rss_bytes"):
+        if before[key] and row[key] > before[key] * (1 + threshold):
+            found.append(f"{key} {before[key]} → {row[key]} (+{row[key] / before[key] - 1:.0%})")
+    return found
+
+
+def print_table(rows: List[Dict[str, Any]]):
+    print(f"{'stage':<24}{'scale':>8}{'wall(s)':>10}{'cpu(s)':>10}{'RSS(MB)':>10}{'items':>9}{'items/s':>11}")
+    for row in rows:
+        if row["status"] != "ok":
+            print(f"{row['stage']:<24}{row['scale']:>8}  ❌ 失敗（{row.get('log')}）")
+            continue
+        print(
+            f"{row['stage']:<24}{row['scale']:>8}{row['wall_seconds']:>10.2f}{row['cpu_seconds']:>10.2f}"
+            f"{row['peak_rss_bytes'] / 1024 / 1024:>10.1f}{row['items']:>9}{row['items_per_second'] or 0:>11.1f}"
+        )
+
+
+def main(
+    scales: List[int],
+    stages: Optional[List[str]] = None,
+    workers: int = 1,
+    bench_dir: Path = BENCH_DIR,
+    regenerate: bool = False,
+    failure_rate: float = 0.0,
+    threshold: float = REGRESSION_THRESHOLD,
+) -> int:
+    """
+    件数ごとに合成データを用意し、各ステージを別プロセスで実行して計測する。
+    結果は results.jsonl に追記し、前回の同条件の結果から劣化した項目の数を返す。
+    """
+    selected = [name for name, _ in BENCH_STAGES if not stages or name in stages]
+    results_file = bench_dir / RESULTS_FILE.name
+    previous = load_previous(results_file)
+    run_at = time.strftime("%Y-%m-%dT%H:%M:%S")
+    revision = _git_revision()
+
+    rows = []
+    warnings = []
+    for scale in scales:
+        corpus_dir = bench_dir / f"corpus_{scale}"
+        if regenerate or not corpus_dir.exists():
+            shutil.rmtree(corpus_dir, ignore_errors=True)
+            started = time.perf_counter()
+            benchmark_corpus.generate(corpus_dir, scale)
+            print(f"{scale}件の合成データを作成しました（{time.perf_counter() - started:.1f}秒）")
+        _clean_outputs(corpus_dir)
+
+        for name in selected:
+            print(f"[{scale}] {name} ...", flush=True)
+            row = {"run_at": run_at, "revision": revision, "scale": scale, "workers": workers}
+            row.update(measure(name, corpus_dir, workers, failure_rate))
+            for message in regressions(row, previous.get((name, scale, workers)), threshold):
+                warnings.append(f"{name} ({scale}件): {message}")
+            rows.append(row)
+
+    bench_dir.mkdir(parents=True, exist_ok=True)
+    with open(results_file, 'a', encoding='utf-8') as f:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+    print("--------------------------------------")
+    print_table(rows)
+    print(f"結果を {results_file} に追記しました")
+    for warning in warnings:
+        print(f"⚠️ 劣化: {warning}")
+    return len(warnings)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="合成データで各ステージのスループットとメモリを計測する")
+    parser.add_argument(
+        "--scale", type=int, action="append", dest="scales",
+        help=f"件数（複数指定可、既定: {benchmark_corpus.SCALES[0]}）。100000件は数GBのディスクを使う",
+    )
+    parser.add_argument("--stage", action="append", dest="stages", choices=[name for name, _ in BENCH_STAGES], help="計測するステージ（複数指定可、既定: すべて）")
+    parser.add_argument("--workers", type=int, default=1, help="並列対応ステージのワーカープロセス数")
+    parser.add_argument("--dir", type=Path, default=BENCH_DIR, help=f"合成データと結果の保存先（既定: {BENCH_DIR}）")
+    parser.add_argument("--regenerate", action="store_true", help="合成データを作り直す")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="偽 Gemini が壊れた応答を返す割合")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD, help="劣化とみなす増加率")
+    parser.add_argument("--check", action="store_true", help="劣化があれば終了コード1で終わる")
+    parser.add_argument("--run-stage", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_stage:
+        run_stage(args.run_stage, workers=args.workers, failure_rate=args.failure_rate)
+    else:
+        regressed = main(
+            args.scales or [benchmark_corpus.SCALES[0]],
+            stages=args.stages,
+            workers=args.workers,
+            bench_dir=args.dir,
+            regenerate=args.regenerate,
+            failure_rate=args.failure_rate,
+            threshold=args.threshold,
+        )
+        if args.check and regressed:
+            sys.exit(1)
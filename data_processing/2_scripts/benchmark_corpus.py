@@ -0,0 +1,187 @@
+import argparse
+import json
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import config
+
+# 合成データの元にする実データ（VEGITAGE_PIPELINE_DATA_DIR で差し替えた先ではなく、リポジトリの data）
+SOURCE_DATA_DIR = config.PROJECT_ROOT / "data"
+SOURCE_APP_DATA = SOURCE_DATA_DIR / config.APP_DATA.name
+SOURCE_INPUT_LISTS = SOURCE_DATA_DIR / config.INPUT_LISTS.name
+SOURCE_VARIETY_LIST = SOURCE_INPUT_LISTS / "varieties_list_0.json"
+SOURCE_WIKITEXT_DIR = SOURCE_INPUT_LISTS / "vegitable_list_wikitext"
+
+SCALES = (1_000, 10_000, 100_000)
+
+_TABLE = re.compile(r"^\{\|.*?^\|\}", re.M | re.S)
+_ROW_SEPARATOR = re.compile(r"^\|-.*\n", re.M)
+_LINK = re.compile(r"\[\[([^\]|:]+)(\|[^\]]*)?\]\]")
+
+
+def load_samples(directory: Path) -> List[Tuple[str, Dict[str, Any]]]:
+    """実データの JSON を (ファイル名の stem, 辞書) のリストとして名前順に読み込む。"""
+    samples = []
+    for file_path in sorted(directory.glob("*.json")):
+        with open(file_path, 'r', encoding='utf-8') as f:
+            samples.append((file_path.stem, json.load(f)))
+    if not samples:
+        raise FileNotFoundError(f"サンプルがありません: {directory}")
+    return samples
+
+
+def _save(data: Any, file_path: Path):
+    with open(file_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def _renamed_summary(record: Dict[str, Any], i: int) -> Dict[str, Any]:
+    """summary（global_info + content）の url・かな名・表示名に通し番号を付けたコピー。"""
+    global_info = record.get("global_info", {})
+    content = record.get("content", {})
+    ja = content.get("ja", {})
+    return {
+        **record,
+        "global_info": {
+            **global_info,
+            "url": f"{global_info.get('url')}_{i}",
+            "kana_name": f"{global_info.get('kana_name', '')}{i}",
+        },
+        "content": {**content, "ja": {**ja, "display_name": f"{ja.get('display_name', '')} {i}"}},
+    }
+
+
+def generate_species(output_dir: Path, scale: int) -> List[str]:
+    """
+    品目の summary / detail を scale 件作り、3_raw_data に置く（5_species_processing.py の入力）。
+    detail は中身を変えずに複製する（ファイル名で summary と対応づけられる）。
+    """
+    summaries = load_samples(SOURCE_APP_DATA / "species_summary")
+    details = {stem: json.dumps(data, ensure_ascii=False, indent=2)
+               for stem, data in load_samples(SOURCE_APP_DATA / "species_detail")}
+    summary_dir = output_dir / "3_raw_data" / "species_summary"
+    detail_dir = output_dir / "3_raw_data" / "species_detail"
+    summary_dir.mkdir(parents=True, exist_ok=True)
+    detail_dir.mkdir(parents=True, exist_ok=True)
+
+    urls = []
+    for i in range(scale):
+        stem, summary = summaries[i % len(summaries)]
+        record = _renamed_summary(summary, i)
+        url = record["global_info"]["url"]
+        _save(record, summary_dir / f"{url}.json")
+        (detail_dir / f"{url}.json").write_text(details.get(stem, "{}"), encoding="utf-8")
+        urls.append(url)
+    return urls
+
+
+def generate_varieties(output_dir: Path, scale: int, species_urls: List[str]):
+    """
+    品種リスト（1_variety_details_jsonl_create.py の入力）と、
+    品種の詳細データ rec_{i}.json（5_variety_detail.py / 1_variety_summary_jsonl_create.py の入力）を作る。
+    親品目は species_urls から順に割り当てる。
+    """
+    with open(SOURCE_VARIETY_LIST, 'r', encoding='utf-8') as f:
+        variety_list = json.load(f)
+    input_lists = output_dir / "1_input_lists"
+    input_lists.mkdir(parents=True, exist_ok=True)
+    _save(
+        [
+            {**item, "variety_name": f"{item['variety_name']}{i}"}
+            for i, item in ((i, variety_list[i % len(variety_list)]) for i in range(scale))
+        ],
+        input_lists / "varieties_list_ja_0.json",
+    )
+
+    details = load_samples(SOURCE_APP_DATA / "varieties_detail")
+    detail_dir = output_dir / "3_raw_data" / "varieties_detail"
+    detail_dir.mkdir(parents=True, exist_ok=True)
+    for i in range(scale):
+        _, detail = details[i % len(details)]
+        profile = detail.get("variety_profile", {})
+        _save(
+            {
+                **detail,
+                "variety_profile": {
+                    **profile,
+                    "url": f"{profile.get('url')}_{i}",
+                    "kana_name": f"{profile.get('kana_name', '')}{i}",
+                    "display_name": f"{profile.get('display_name', '')} {i}",
+                    "parent_species_url": species_urls[i % len(species_urls)],
+                },
+            },
+            detail_dir / f"rec_{i}.json",
+        )
+
+
+def generate_vegetables(output_dir: Path, scale: int):
+    """5_app_data/vegetable_summary を scale 件作る（6_index_generator.py の入力）。"""
+    samples = load_samples(SOURCE_APP_DATA / "vegetable_summary")
+    summary_dir = output_dir / "5_app_data" / "vegetable_summary"
+    summary_dir.mkdir(parents=True, exist_ok=True)
+    for i in range(scale):
+        record = _renamed_summary(samples[i % len(samples)][1], i)
+        _save(record, summary_dir / f"{record['global_info']['url']}.json")
+
+
+def _renamed_row(row: str, copy: int) -> str:
+    """表の1行の名称列（2列目）のリンクに通し番号を付ける。英名リンク（[[:en:...]]）はそのまま。"""
+    cells = row.split("||")
+    if len(cells) < 2:
+        return row
+    cells[1] = _LINK.sub(
+        lambda m: f"[[{m.group(1)}{copy}{m.group(2) + str(copy) if m.group(2) else ''}]]", cells[1],
+    )
+    return "||".join(cells)
+
+
+def scale_table(table: str, rows_per_table: int) -> str:
+    """wikitext の表の行を rows_per_table 行になるまで繰り返す（2周目以降は名称を変える）。"""
+    header, *rows = _ROW_SEPARATOR.split(table.rsplit("|}", 1)[0])
+    rows = [row for row in rows if row.strip()]
+    if not rows:
+        return table
+    scaled = []
+    for j in range(rows_per_table):
+        copy = j // len(rows)
+        row = rows[j % len(rows)]
+        scaled.append(_renamed_row(row, copy) if copy else row)
+    return header + "".join(f"|-\n{row}" for row in scaled) + "|}"
+
+
+def generate_wikitext(output_dir: Path, scale: int):
+    """Wikipedia の野菜一覧ページを、表の行の合計がおよそ scale 行になるよう拡大する。"""
+    pages = {path.name: path.read_text(encoding="utf-8") for path in sorted(SOURCE_WIKITEXT_DIR.glob("*.txt"))}
+    tables = {name: _TABLE.findall(text) for name, text in pages.items()}
+    table_count = sum(len(found) for found in tables.values()) or 1
+    rows_per_table = max(1, scale // table_count)
+
+    wikitext_dir = output_dir / "1_input_lists" / SOURCE_WIKITEXT_DIR.name
+    wikitext_dir.mkdir(parents=True, exist_ok=True)
+    for name, found in tables.items():
+        text = "\n\n".join(scale_table(table, rows_per_table) for table in found)
+        (wikitext_dir / name).write_text(text + "\n", encoding="utf-8")
+
+
+def generate(output_dir: Path, scale: int):
+    """scale 件規模の合成データツリー（config.DATA_DIR と同じ構成）を output_dir に作る。"""
+    species_urls = generate_species(output_dir, scale)
+    generate_varieties(output_dir, scale, species_urls)
+    generate_vegetables(output_dir, scale)
+    generate_wikitext(output_dir, scale)
+
+
+def main(scale: int, output_dir: Path):
+    print(f"{scale}件規模の合成データを {output_dir} に作成します")
+    generate(output_dir, scale)
+    files = [p for p in output_dir.rglob("*") if p.is_file()]
+    print(f"✅ {len(files)}ファイル / {sum(p.stat().st_size for p in files):,} bytes")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="実データのサンプルから、ベンチマーク用の合成データを作成する")
+    parser.add_argument("scale", type=int, help=f"品目・品種・野菜それぞれの件数（例: {', '.join(map(str, SCALES))}）")
+    parser.add_argument("output_dir", type=Path, help="出力先（data ディレクトリと同じ構成で作る）")
+    args = parser.parse_args()
+    main(args.scale, args.output_dir)
@@ -1,31 +1,63 @@
 # scripts/config.py
 import os
 from pathlib import Path
-from dotenv import load_dotenv
 
 # -----------------------------
 # パス設定
 # -----------------------------
 SCRIPT_DIR = Path(__file__).resolve().parent
 PROJECT_ROOT = SCRIPT_DIR.parent
-DATA_DIR = PROJECT_ROOT / "data"
+# ベンチマークなどで別のデータツリーを使う場合は VEGITAGE_PIPELINE_DATA_DIR で差し替える
+DATA_DIR = Path(os.environ.get("VEGITAGE_PIPELINE_DATA_DIR", PROJECT_ROOT / "data"))
 INPUT_LISTS = DATA_DIR / "1_input_lists"
 RAW_RESPONSES = DATA_DIR / "2_raw_responses"
 RAW_DATA = DATA_DIR / "3_raw_data"
 PROCESSING_DATA = DATA_DIR / "4_processing_data"
 APP_DATA = DATA_DIR / "5_app_data"
+PACKED_DATA = DATA_DIR / "6_packed_data"
 PROMPTS_DIR = PROJECT_ROOT / "1_prompts"
+RESPONSE_CACHE = DATA_DIR / "response_cache"
+# Flutter アプリに同梱しているデータ（_index.json, vegetable_summary/, vegetable_detail/）
+FRONTEND_ASSET_DATA = PROJECT_ROOT.parent / "frontend" / "vegitage" / "assets" / "data"
+
+# -----------------------------
+# モデル設定
+# -----------------------------
+GEMINI_MODEL = "gemini-2.5-pro"
+
+# -----------------------------
+# 言語設定
+# -----------------------------
+# content.<言語> のうち、既定の言語。ほかの言語の索引・パッケージは言語コード付きの名前で出力する
+DEFAULT_LANG = "ja"
 
 # -----------------------------
 # 環境変数のロードとAPI設定
 # -----------------------------
-load_dotenv()
-API_KEY = os.getenv("GOOGLE_API_KEY")
-if not API_KEY:
-    raise ValueError("エラー: .envファイルに GOOGLE_API_KEY を設定してください。")
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    raise ValueError("エラー: .envファイルに OPENAI_API_KEY を設定してください。")
+# API キーは読み込み時には確認せず、API を呼び出すステージが require_api_key() で取得する
+# （オフラインのステージは .env も dotenv も不要で、すぐに起動できる）
+_API_KEY_NAMES = {"API_KEY": "GOOGLE_API_KEY", "OPENAI_API_KEY": "OPENAI_API_KEY"}
+_dotenv_loaded = False
+
+
+def require_api_key(name: str) -> str:
+    """環境変数（なければ .env）から API キーを取得する。未設定ならエラー。"""
+    global _dotenv_loaded
+    if not os.getenv(name) and not _dotenv_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _dotenv_loaded = True
+    value = os.getenv(name)
+    if not value:
+        raise ValueError(f"エラー: .envファイルに {name} を設定してください。")
+    return value
+
+
+def __getattr__(name: str) -> str:
+    # 以前の config.API_KEY / config.OPENAI_API_KEY は、参照されたときに取得する
+    if name in _API_KEY_NAMES:
+        return require_api_key(_API_KEY_NAMES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # -----------------------------
 # プロンプトテンプレートの読み込み
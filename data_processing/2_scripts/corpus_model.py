@@ -0,0 +1,212 @@
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# global_info の中で、大量の野菜が同じ値を持つ項目（科・属・食用部位）は intern して1つの文字列を共有する
+_intern = sys.intern
+
+
+def _strings(values: Optional[Iterable[str]]) -> Tuple[str, ...]:
+    return tuple(values or ())
+
+
+class Names:
+    """global_info.names。別名は tuple で持つ（list より小さく、共有しても書き換えられない）。"""
+    __slots__ = ("japanese_common", "international")
+
+    def __init__(self, japanese_common: Tuple[str, ...] = (), international: Optional[Dict[str, Tuple[str, ...]]] = None):
+        self.japanese_common = japanese_common
+        self.international = international or {}
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "Names":
+        data = data or {}
+        international = {
+            _intern(lang): _strings(names) for lang, names in (data.get("international") or {}).items()
+        }
+        return cls(_strings((data.get("japanese") or {}).get("common")), international)
+
+    def common(self, lang: str = "ja") -> Tuple[str, ...]:
+        """その言語での別名。日本語は names.japanese.common、ほかは names.international.<言語>。"""
+        if lang == "ja":
+            return self.japanese_common
+        return self.international.get(lang, ())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "japanese": {"common": list(self.japanese_common)},
+            "international": {lang: list(names) for lang, names in self.international.items()},
+        }
+
+
+class Classification:
+    """global_info.classification（日本語の科・属）。"""
+    __slots__ = ("family_ja", "genus_ja")
+
+    def __init__(self, family_ja: Optional[str] = None, genus_ja: Optional[str] = None):
+        self.family_ja = family_ja
+        self.genus_ja = genus_ja
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "Classification":
+        data = data or {}
+        family_ja, genus_ja = data.get("family_ja"), data.get("genus_ja")
+        return cls(_intern(family_ja) if family_ja else family_ja, _intern(genus_ja) if genus_ja else genus_ja)
+
+    def to_dict(self) -> Dict[str, Any]:
+        # 元のデータにない項目は出力しない（空の classification は {} のまま）
+        data = {}
+        if self.family_ja is not None:
+            data["family_ja"] = self.family_ja
+        if self.genus_ja is not None:
+            data["genus_ja"] = self.genus_ja
+        return data
+
+
+class FoodClassification:
+    """global_info.foodClassification（主な食用部位と、食用になる部位）。"""
+    __slots__ = ("primary_part", "edible_parts")
+
+    def __init__(self, primary_part: Optional[str] = None, edible_parts: Optional[Tuple[str, ...]] = None):
+        self.primary_part = primary_part
+        self.edible_parts = edible_parts
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "FoodClassification":
+        data = data or {}
+        primary_part = data.get("primaryPart")
+        edible_parts = data.get("edibleParts")
+        return cls(
+            _intern(primary_part) if primary_part else primary_part,
+            tuple(_intern(part) for part in edible_parts) if edible_parts is not None else None,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {}
+        if self.primary_part is not None:
+            data["primaryPart"] = self.primary_part
+        if self.edible_parts is not None:
+            data["edibleParts"] = list(self.edible_parts)
+        return data
+
+
+class GlobalInfo:
+    """
+    言語に依らない global_info。to_dict() は元の JSON と同じ構造・項目順の辞書を返す。
+    """
+    __slots__ = ("url", "kana_name", "scientific_name", "classification", "food_classification", "names")
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        kana_name: Optional[str] = None,
+        scientific_name: Optional[str] = None,
+        classification: Optional[Classification] = None,
+        food_classification: Optional[FoodClassification] = None,
+        names: Optional[Names] = None,
+    ):
+        self.url = url
+        self.kana_name = kana_name
+        self.scientific_name = scientific_name
+        self.classification = classification or Classification()
+        self.food_classification = food_classification or FoodClassification()
+        self.names = names or Names()
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "GlobalInfo":
+        data = data or {}
+        return cls(
+            url=data.get("url"),
+            kana_name=data.get("kana_name"),
+            scientific_name=data.get("scientificName"),
+            classification=Classification.from_dict(data.get("classification")),
+            food_classification=FoodClassification.from_dict(data.get("foodClassification")),
+            names=Names.from_dict(data.get("names")),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "kana_name": self.kana_name,
+            "scientificName": self.scientific_name,
+            "classification": self.classification.to_dict(),
+            "foodClassification": self.food_classification.to_dict(),
+            "names": self.names.to_dict(),
+        }
+
+
+# ファイルに無い節も「読み込み済み」として覚えておくための印
+_MISSING = object()
+
+
+class Record:
+    """
+    1ファイル分のレコード。global_info だけを GlobalInfo として保持し、
+    content や詳細データの大きな節は、最初にアクセスされたときにファイルから読み、以降はその節だけを保持する。
+    """
+    __slots__ = ("key", "path", "global_info", "_sections")
+
+    def __init__(self, key: str, path: Path, global_info: Optional[GlobalInfo], sections: Optional[Dict[str, Any]] = None):
+        self.key = key
+        self.path = path
+        self.global_info = global_info
+        self._sections = sections  # 読み込み時に指定された節と、アクセス済みの節（なければ None）
+
+    def section(self, name: str, default: Any = None) -> Any:
+        """トップレベルの節（content, variety_profile など）。未読み込みの節は初回だけファイルを読む。"""
+        if self._sections is None:
+            self._sections = {}
+        if name not in self._sections:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._sections[name] = json.load(f).get(name, _MISSING)
+        value = self._sections[name]
+        return default if value is _MISSING else value
+
+    @property
+    def content(self) -> Dict[str, Any]:
+        return self.section("content", {}) or {}
+
+    def localized(self, lang: str = "ja") -> Dict[str, Any]:
+        """content.<言語>。"""
+        return self.content.get(lang, {}) or {}
+
+
+def read_record(file_path: Path, sections: Iterable[str] = ()) -> Record:
+    """
+    ファイルを読み、global_info と、sections に指定した節だけを残した Record を返す。
+    ほかの節（数KB〜数MBの content や詳細データ）はパース後すぐに捨てる。
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    kept = {name: data[name] for name in sections if name in data} or None
+    global_info = GlobalInfo.from_dict(data["global_info"]) if "global_info" in data else None
+    return Record(file_path.stem, file_path, global_info, kept)
+
+
+class CorpusReader:
+    """
+    ディレクトリ内の JSON レコードを、ステージが必要とする節だけを残して読み込む。
+
+        reader = CorpusReader(config.APP_DATA / "vegetable_summary")
+        for record in reader:                      # global_info だけを保持
+            record.global_info.names.common("ja")
+        reader.load_all()                          # {キー: Record}（10万件でも global_info 分のメモリだけ）
+    """
+
+    def __init__(self, directory: Path, sections: Iterable[str] = ()):
+        self.directory = directory
+        self.sections = tuple(sections)
+
+    def paths(self) -> List[Path]:
+        return sorted(self.directory.glob("*.json"))
+
+    def read(self, key: str) -> Record:
+        return read_record(self.directory / f"{key}.json", self.sections)
+
+    def __iter__(self) -> Iterator[Record]:
+        for file_path in self.paths():
+            yield read_record(file_path, self.sections)
+
+    def load_all(self) -> Dict[str, Record]:
+        return {record.key: record for record in self}
@@ -1,85 +1,114 @@
-import re
+import argparse
 import json
-from typing import List, Dict, Optional
-import config
-
-WIKITEXT_DIR = config.INPUT_DIR / "wikitext"
-VEGETABLES_JSON_DIR = config.RAW_DATA_DIR / "wikipedia_vegetables"
-WIKITEXT_FILE_NAME = "root_vegetables"
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 
-def extract_vegetables_from_wikitext(wikitext: str) -> List[Dict]:
+import config
+import instrumentation
+import parallel
+
+WIKITEXT_DIR = config.INPUT_LISTS / "vegitable_list_wikitext"
+OUTPUT_DIR = config.INPUT_LISTS
+MERGED_JSON_FILE = OUTPUT_DIR / "list_of_wikipedia_vegetables.json"
+
+# -----------------------------
+# 正規表現（モジュール読み込み時に1回だけコンパイルする）
+# -----------------------------
+_TABLE = re.compile(r"^\{\|.*?^\|\}", re.M | re.S)
+_ROW_SEPARATOR = re.compile(r"^\|-.*$", re.M)
+_TABLE_MARKUP = re.compile(r"^(?:\{\||\|\}|\|\+).*$", re.M)
+_LINK = re.compile(r"\[\[([^\]]+?)\]\]")
+_ENGLISH_LINK = re.compile(r"\[\[:en:[^\]]*?\|([^\]]+)\]\]")
+_ALT_NAMES = re.compile(r"\{\{Fontsize\|small\|（([^）]+)）\}\}")
+_SCIENTIFIC_NAME = re.compile(r"\{\{Snamei\|\|([^}]+)\}\}")
+_TAG_OR_LINK = re.compile(r"<[^>]+>|\[\[([^\]]+)\]\]")
+_LINK_OR_TAG = re.compile(r"\[\[([^\]]+)\]\]|<[^>]+>")
+_TEMPLATE_BRACE = re.compile(r"\{\{|\}\}")
+_REF = re.compile(r"<ref[^>]*?/>|<ref[^>]*>.*?</ref>", re.S)
+_FAMILY = re.compile(r"([^。、\s]*科)")
+_GENUS = re.compile(r"([^。、\s]*属)")
+
+# 見出し行の文字列 → 列の種類（見出しが無い表は 画像・名称・分類群・食用部位 の順とみなす）
+HEADER_COLUMNS = {"名称": "name", "分類": "classification", "食用部位": "edible_parts", "画像": "image"}
+DEFAULT_COLUMNS = {"image": 0, "name": 1, "classification": 2, "edible_parts": 3}
+
+
+def split_cells(row: str) -> List[str]:
     """
-    Wikipedia野菜一覧のWikitextを解析してJSON形式に変換
-    希少野菜を優先度高で設定
+    表の1行を列に分ける。
+    行頭の「|」「!」と「!!」を「||」にそろえてから一度に分割し、
+    {{テンプレート}} や [[リンク]] の内側で切れた部分（{{Snamei||...}} など）だけをつなぎ直す。
     """
-    vegetables = []
-
-    # テーブル行を分割（|-で始まる行区切り）
-    rows = wikitext.split('|-')[1:]  # 最初の要素はヘッダーなので除外
-
-    for row in rows:
-        if not row.strip() in row:
-            continue
-
-        # 各列を抽出（||で区切り）
-        columns = split_excluding_templates(row)
-
-        if len(columns) < 4:  # 画像、名称、分類群、食用部位の最低4列必要
-            print(columns)
+    cells = []
+    pending = None
+    for piece in row.replace("\n|", "||").replace("\n!", "||").replace("!!", "||").split("||"):
+        pending = piece if pending is None else pending + "||" + piece
+        # 開き括弧と閉じ括弧の数が合わなければ、入れ子の内側で切れている
+        if pending.count("{{") != pending.count("}}") or pending.count("[[") != pending.count("]]"):
             continue
+        cells.append(pending.strip())
+        pending = None
+    if pending is not None:
+        cells.append(pending.strip())
+    # 行頭の「|」「!」より前は空なので除く
+    return cells[1:] if cells and not cells[0] else cells
 
-        try:
-            # 画像列（スキップ）
-            image_col = columns[0] if columns[0].startswith('[') else None
-
-            # 名称列（2列目）の解析
-            name_col = columns[1]
-            names_info = parse_name_column(name_col)
 
-            # 分類群列（3列目）の解析
-            classification_col = columns[2]
-            classification_info = parse_classification_column(classification_col)
+def iter_tables(wikitext: str) -> List[str]:
+    """ページ内のすべての表 ({| ... |}) を返す。表の記法が無ければ全体を1つの表とみなす。"""
+    tables = _TABLE.findall(wikitext)
+    return tables or [wikitext]
 
-            # 食用部位列（4列目）の解析
-            edible_parts_col = columns[3]
-            edible_parts = parse_edible_parts(edible_parts_col)
 
-            # 優先度の決定（希少野菜を高優先度に）
-            priority = determine_priority(names_info.get('popularity_markers', []))
+def column_positions(header_row: str) -> Optional[Dict[str, int]]:
+    """見出し行から列の位置を求める。名称列が無い表（野菜の一覧でない表）は None。"""
+    positions = {}
+    for i, cell in enumerate(split_cells(header_row)):
+        for label, column in HEADER_COLUMNS.items():
+            if label in cell and column not in positions:
+                positions[column] = i
+    return positions if "name" in positions else None
 
-            vegetable_entry = {
-                "names": names_info,
-                "classification": classification_info,
-                "edible_parts": edible_parts,
-            }
-
-            vegetables.append(vegetable_entry)
-
-        except Exception as e:
-            print(f"Error parsing row: {e}")
-            continue
 
+def extract_vegetables_from_wikitext(wikitext: str) -> List[Dict]:
+    """
+    Wikipedia野菜一覧のWikitextを解析してJSON形式に変換
+    ページ内に複数の表があればすべて解析する
+    """
+    vegetables = []
+    for table in iter_tables(wikitext):
+        positions = DEFAULT_COLUMNS
+        for row in _ROW_SEPARATOR.split(table):
+            # 表の開始・終了行とキャプションを除く
+            row = _TABLE_MARKUP.sub("", row).strip()
+            if not row:
+                continue
+            if row.startswith("!"):
+                positions = column_positions("\n" + row)
+                continue
+            if positions is None:
+                continue
+            entry = parse_row(split_cells("\n" + row), positions)
+            if entry is not None:
+                vegetables.append(entry)
     return vegetables
 
 
-def split_excluding_templates(row):
-    """{{...}}内の||を除外して分割"""
+def parse_row(columns: List[str], positions: Dict[str, int]) -> Optional[Dict]:
+    """列のリストから野菜1件を作る。名称が取れない行は None。"""
+    def column(name: str) -> str:
+        i = positions.get(name)
+        return columns[i] if i is not None and i < len(columns) else ""
 
-    # 一時的な置換文字
-    temp_marker = "__TEMP_PIPE__"
-
-    # {{...}}内の||を一時的に置換
-    def replace_pipes_in_templates(match):
-        return match.group(0).replace('||', temp_marker)
-
-    # {{...}}パターンにマッチする部分の||を置換
-    temp_row = re.sub(r'\{\{[^}]*\}\}', replace_pipes_in_templates, row)
-
-    # ||で分割
-    columns = [col.strip() for col in temp_row.split('||') if col.strip()]
-
-    # 各列で一時置換文字を||に戻す
-    return [col.replace(temp_marker, '||') for col in columns]
+    names_info = parse_name_column(column("name"))
+    if not names_info["japanese_primary"]:
+        return None
+    return {
+        "names": names_info,
+        "classification": parse_classification_column(column("classification")),
+        "edible_parts": parse_edible_parts(column("edible_parts")),
+    }
 
 
 def parse_name_column(name_col: str) -> Dict:
@@ -97,23 +126,15 @@ def parse_name_column(name_col: str) -> Dict:
         popularity_markers.append('★')
 
     # 日本語名の抽出（[[リンク]]形式）
-    japanese_names = re.findall(r'\[\[([^\]]+?)\]\]', name_col)
-    main_japanese_name = japanese_names[0] if japanese_names else None
-
+    japanese_name = _LINK.search(name_col)
     # 英語名の抽出（[[:en:English|english]]形式）
-    english_pattern = r'\[\[:en:[^\]]*?\|([^\]]+)\]\]'
-    english_names = re.findall(english_pattern, name_col)
-    main_english_name = english_names[0] if english_names else None
-
-    # 別名・サブタイプの抽出
-    # {{Fontsize|small|（別名）}}形式
-    alt_names_pattern = r'\{\{Fontsize\|small\|\（([^）]+)\）\}\}'
-    alt_names = re.findall(alt_names_pattern, name_col)
+    english_name = _ENGLISH_LINK.search(name_col)
 
     return {
-        "japanese_primary": main_japanese_name,
-        "japanese_alternatives": alt_names,
-        "english_primary": main_english_name,
+        "japanese_primary": japanese_name.group(1) if japanese_name else None,
+        # {{Fontsize|small|（別名）}}形式
+        "japanese_alternatives": _ALT_NAMES.findall(name_col),
+        "english_primary": english_name.group(1) if english_name else None,
         "popularity": determine_priority(popularity_markers)
     }
 
@@ -121,33 +142,20 @@ def parse_name_column(name_col: str) -> Dict:
 def parse_classification_column(classification_col: str) -> Dict:
     """分類群列を解析して科、属、学名を抽出"""
 
-    # HTMLタグとリンクを除去してクリーンなテキストにする
-    clean_text = re.sub(r'<[^>]+>', '', classification_col)  # HTMLタグ除去
-    clean_text = re.sub(r'\[\[([^\]]+)\]\]', r'\1', clean_text)  # [[リンク]]を中身だけに
+    # HTMLタグを除去し、[[リンク]]を中身だけにする（1回の置換で行う）
+    clean_text = _TAG_OR_LINK.sub(lambda m: m.group(1) or "", classification_col)
 
     # 科名の抽出
-    family = None
-    family_match = re.search(r'([^。、\s]*科)', clean_text)
-    if family_match:
-        family = family_match.group(1)
+    family_match = _FAMILY.search(clean_text)
+    family = family_match.group(1) if family_match else None
 
     # 属名の抽出（科名を除去した残りの部分から）
-    genus = None
-    if family:
-        # 科名部分を除去
-        remaining_text = clean_text.replace(family, '', 1)
-        genus_match = re.search(r'([^。、\s]*属)', remaining_text)
-        if genus_match:
-            genus = genus_match.group(1)
-    else:
-        # 科名がない場合は全体から属名を抽出
-        genus_match = re.search(r'([^。、\s]*属)', clean_text)
-        if genus_match:
-            genus = genus_match.group(1)
+    remaining_text = clean_text.replace(family, '', 1) if family else clean_text
+    genus_match = _GENUS.search(remaining_text)
+    genus = genus_match.group(1) if genus_match else None
 
     # 学名の抽出（{{Snamei||学名}}形式）
-    scientific_name_pattern = r'\{\{Snamei\|\|([^}]+)\}\}'
-    scientific_name_match = re.search(scientific_name_pattern, classification_col)
+    scientific_name_match = _SCIENTIFIC_NAME.search(classification_col)
     scientific_name = scientific_name_match.group(1).strip() if scientific_name_match else None
 
     return {
@@ -156,25 +164,42 @@ def parse_classification_column(classification_col: str) -> Dict:
         "scientific_name": scientific_name
     }
 
+
+def strip_templates(text: str) -> str:
+    """入れ子の {{テンプレート}} を外側ごと除去する（注釈の中のリンクを部位と誤認しないため）。"""
+    pieces = []
+    depth = 0
+    start = 0
+    for match in _TEMPLATE_BRACE.finditer(text):
+        if match.group(0) == "{{":
+            if depth == 0:
+                pieces.append(text[start:match.start()])
+            depth += 1
+        elif depth > 0:
+            depth -= 1
+            if depth == 0:
+                start = match.end()
+    if depth == 0:
+        pieces.append(text[start:])
+    return "".join(pieces)
+
+
 def parse_edible_parts(edible_parts_col: str) -> List[str]:
     """食用部位を解析"""
-    # 基本的な食用部位
+    # 出典・注釈を除いてから、リンク形式の部位を集めつつリンクとHTMLタグを1回の置換で除去する
     parts = []
 
-    # リンク形式の部位を抽出
-    linked_parts = re.findall(r'\[\[([^\]]+)\]\]', edible_parts_col)
-    parts.extend(linked_parts)
+    def strip_markup(match):
+        if match.group(1):
+            parts.append(match.group(1))
+        return ""
 
-    # 通常テキストの部位（、で区切られている）
-    clean_text = re.sub(r'\[\[([^\]]+)\]\]', '', edible_parts_col)
-    clean_text = re.sub(r'<[^>]+>', '', clean_text)  # HTMLタグ除去
-    clean_text = re.sub(r'\{\{[^}]+\}\}', '', clean_text)  # テンプレート除去
+    clean_text = _LINK_OR_TAG.sub(strip_markup, strip_templates(_REF.sub("", edible_parts_col)))
 
-    if clean_text.strip():
-        additional_parts = [part.strip() for part in clean_text.split('、') if part.strip()]
-        parts.extend(additional_parts)
+    # 通常テキストの部位（、で区切られている）
+    parts.extend(part.strip() for part in clean_text.split('、') if part.strip())
 
-    return list(set(parts))  # 重複除去
+    return list(dict.fromkeys(parts))  # 出現順を保ったまま重複除去
 
 
 def determine_priority(popularity_markers: List[str]) -> int:
@@ -196,38 +221,72 @@ def determine_priority(popularity_markers: List[str]) -> int:
 
     return 0
 
-def save_vegetables_json(vegetables: List[Dict], filename: str = "vegetables_database.json"):
-    """JSONファイルとして保存"""
 
-    output_data = {
-        "metadata": {
-            "total_vegetables": len(vegetables),
-            "processing_strategy": "野菜リスト作成",
-            "generated_at": "2025-01-01T00:00:00Z"
-        },
-        "vegetables": vegetables
-    }
+def extract_file(wikitext_file: Path) -> Tuple[str, List[Dict]]:
+    """1ファイルを解析する（プロセスプールのワーカーで実行）。"""
+    return wikitext_file.stem, extract_vegetables_from_wikitext(wikitext_file.read_text(encoding="utf-8"))
+
 
+def merge_vegetables(results: List[Tuple[str, List[Dict]]]) -> List[Dict]:
+    """
+    全ファイルの結果を日本語名で重複除去して1つにまとめる。
+    同じ野菜が複数の一覧に載っている場合は、別名・食用部位を合わせ、優先度は高い方を採る。
+    """
+    merged: Dict[str, Dict] = {}
+    for source, vegetables in results:
+        for vegetable in vegetables:
+            name = vegetable["names"]["japanese_primary"]
+            if name not in merged:
+                merged[name] = dict(vegetable, sources=[source])
+                continue
+            existing = merged[name]
+            names = existing["names"]
+            names["japanese_alternatives"] = list(dict.fromkeys(
+                names["japanese_alternatives"] + vegetable["names"]["japanese_alternatives"]
+            ))
+            names["english_primary"] = names["english_primary"] or vegetable["names"]["english_primary"]
+            names["popularity"] = max(names["popularity"], vegetable["names"]["popularity"])
+            for key, value in vegetable["classification"].items():
+                existing["classification"][key] = existing["classification"][key] or value
+            existing["edible_parts"] = list(dict.fromkeys(existing["edible_parts"] + vegetable["edible_parts"]))
+            if source not in existing["sources"]:
+                existing["sources"].append(source)
+    return list(merged.values())
+
+
+def save_json(data, filename: Path):
+    """JSONファイルとして保存"""
     with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(output_data, f, ensure_ascii=False, indent=2)
+        json.dump(data, f, ensure_ascii=False, indent=2)
 
-    print(f"野菜データベース保存完了: {filename}")
-    print(f"総数: {len(vegetables)}")
 
-# メイン実行部分
-if __name__ == "__main__":
-    try:
-        # Wikitextファイルを読み込み
-        wikitext_filepath = WIKITEXT_DIR / f"{WIKITEXT_FILE_NAME}.txt"
-        wikitext_sample = wikitext_filepath.read_text(encoding="utf-8")
+@instrumentation.instrumented("wikitext_extract", outputs=[OUTPUT_DIR])
+def main(files: Optional[List[Path]] = None, workers: int = 1):
+    """wikitext ディレクトリの全ファイルを（ファイル単位で並列に）解析し、ファイルごとの一覧と統合一覧を保存する。"""
+    files = sorted(files if files is not None else WIKITEXT_DIR.glob("*.txt"))
+    print(f"{len(files)}個の wikitext を解析します")
 
+    metrics = instrumentation.current()
+    if metrics is not None:
+        for file_path in files:
+            metrics.read_file(file_path)
 
-        # Wikitextを解析
-        vegetables = extract_vegetables_from_wikitext(wikitext_sample)
+    results = list(parallel.imap_bounded(extract_file, files, workers))
+    for stem, vegetables in results:
+        output_file = OUTPUT_DIR / f"list_of_wikipedia_{stem}.json"
+        save_json(vegetables, output_file)
+        print(f"{stem}: {len(vegetables)}件 → {output_file}")
 
-        # JSONファイルとして保存
-        save_vegetables_json(vegetables, VEGETABLES_JSON_DIR / f"{WIKITEXT_FILE_NAME}.json")
+    merged = merge_vegetables(results)
+    save_json(merged, MERGED_JSON_FILE)
+    total = sum(len(vegetables) for _, vegetables in results)
+    print(f"野菜データベース保存完了: {MERGED_JSON_FILE}")
+    print(f"総数: {len(merged)}（重複除去前 {total}）")
 
 
-    except Exception as e:
-        print(f"処理エラー: {e}")
\ No newline at end of file
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Wikipedia 野菜一覧の wikitext から野菜リストを作成する")
+    parser.add_argument("files", nargs="*", type=Path, help="解析する wikitext（省略時はディレクトリ内のすべて）")
+    parallel.add_arguments(parser)
+    args = parser.parse_args()
+    main(args.files or None, workers=args.workers)
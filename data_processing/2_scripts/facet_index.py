@@ -0,0 +1,219 @@
+import json
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from ingredients import NameMatcher, split_names
+from search_engine import vegetable_entry
+from search_index import normalize_key
+
+FACETS = ("region", "language", "alias", "ingredient")
+
+# 英名・現地名を語に分ける（normalize_key は空白を消すので、その前に分ける）
+_WORD_SEPARATORS = re.compile(r"[\s\-‐]+")
+
+
+def _bitmap(doc_numbers: Iterable[int]) -> int:
+    """文書番号の集合を、番号のビットを立てた int にする。"""
+    bits = bytearray()
+    for doc_no in doc_numbers:
+        byte = doc_no >> 3
+        if byte >= len(bits):
+            bits.extend(b"\0" * (byte + 1 - len(bits)))
+        bits[byte] |= 1 << (doc_no & 7)
+    return int.from_bytes(bits, "little")
+
+
+def _doc_numbers(bitmap: int) -> Iterable[int]:
+    """立っているビットの番号を小さい順に返す。"""
+    while bitmap:
+        low = bitmap & -bitmap
+        yield low.bit_length() - 1
+        bitmap ^= low
+
+
+def alias_terms(names: Iterable[str]) -> Set[str]:
+    """
+    料理名・別名の照合用の語。名前全体、括弧・読点で区切った部分、英名などの各語、
+    「キプロスのパン」の「パン」のような「の」の後ろを、正規化して返す。
+    """
+    terms = set()
+    for name in names:
+        for part in split_names(name):
+            terms.add(normalize_key(part))
+            terms.update(normalize_key(word) for word in _WORD_SEPARATORS.split(part))
+            if "の" in part:
+                terms.add(normalize_key(part.rsplit("の", 1)[1]))
+    terms.discard("")
+    return terms
+
+
+class FacetIndex:
+    """
+    料理の絞り込み用の転置索引。ファセット（地域・言語・別名・食材）ごとに「正規化した語 → 料理の集合」を持つ。
+
+    集合は料理の番号のビットを立てた int（ビットマップ）で持つため、
+    複数条件の AND は int の & だけで済み、件数は bit_count() で数えられる。
+    数万件の料理でも1つの集合は数KBで、絞り込みはミリ秒以下で終わる。
+    JSON には番号の昇順配列で保存し、読み込み時にビットマップに戻す。
+    """
+
+    def __init__(
+        self,
+        docs: List[Dict[str, Any]],
+        postings: Dict[str, Dict[str, List[int]]],
+        labels: Dict[str, Dict[str, str]],
+    ):
+        self.docs = docs
+        self.postings = postings
+        self.labels = labels  # ファセットの件数表示に使う語 → 表示名
+        self.bitmaps = {
+            facet: {term: _bitmap(doc_numbers) for term, doc_numbers in terms.items()}
+            for facet, terms in postings.items()
+        }
+        self.all_docs = (1 << len(docs)) - 1
+
+    @classmethod
+    def build(
+        cls,
+        dishes: Iterable[Tuple[str, Dict[str, Any], List[str]]],
+        vegetables: Dict[str, List[str]],
+    ) -> "FacetIndex":
+        """
+        dishes: (料理ID, dish_data の内容, 追加の地域名) を ID 順に。
+        vegetables: 野菜ID → 名前の一覧。食材の記述を野菜に対応づけ、その野菜のどの名前でも引けるようにする。
+        """
+        matcher = NameMatcher(affix=True)
+        for vegetable_id, names in vegetables.items():
+            matcher.add(vegetable_id, names)
+        vegetable_terms = {
+            vegetable_id: {normalize_key(part) for name in names for part in split_names(name)} | {normalize_key(vegetable_id)}
+            for vegetable_id, names in vegetables.items()
+        }
+
+        docs: List[Dict[str, Any]] = []
+        postings: Dict[str, Dict[str, List[int]]] = {facet: {} for facet in FACETS}
+        labels: Dict[str, Dict[str, str]] = {facet: {} for facet in FACETS}
+
+        def add(facet: str, term: str, doc_no: int, label: Optional[str] = None):
+            if not term:
+                return
+            doc_numbers = postings[facet].setdefault(term, [])
+            if not doc_numbers or doc_numbers[-1] != doc_no:
+                doc_numbers.append(doc_no)
+            if label is not None:
+                labels[facet].setdefault(term, label)
+
+        for doc_no, (dish_id, dish_data, extra_regions) in enumerate(dishes):
+            metadata = dish_data.get("entry_metadata", {})
+            docs.append({
+                "id": dish_id,
+                "name": metadata.get("concept_name_ja", "") or dish_id,
+                "name_en": metadata.get("concept_name_en", ""),
+                "region": metadata.get("region", ""),
+                "language": metadata.get("local_language", ""),
+            })
+
+            for region in split_names(metadata.get("region", "")) + extra_regions:
+                add("region", normalize_key(region), doc_no, region)
+
+            language = metadata.get("local_language", "")
+            add("language", normalize_key(language), doc_no, language)
+            for part in split_names(language):
+                add("language", normalize_key(part), doc_no)
+
+            aliases = metadata.get("aliases", {})
+            names = [metadata.get(key, "") for key in ("concept_name_ja", "concept_name_local", "concept_name_en")]
+            names += aliases.get("ja", []) + aliases.get("local", []) + aliases.get("en", [])
+            for term in alias_terms(names):
+                add("alias", term, doc_no)
+
+            plant_perspective = dish_data.get("detailed_research", {}).get("plant_centric_perspective", {}) or {}
+            for ingredient in plant_perspective.get("core_plant_ingredients", []):
+                for part in split_names(ingredient):
+                    add("ingredient", normalize_key(part), doc_no)
+                for vegetable_id in matcher.match(ingredient):
+                    add("ingredient", normalize_key(vegetable_id), doc_no, vegetable_id)
+                    for term in vegetable_terms[vegetable_id]:
+                        add("ingredient", term, doc_no)
+        return cls(docs, postings, labels)
+
+    @classmethod
+    def from_app_data(cls, data_dir: Path) -> "FacetIndex":
+        """5_app_data と同じ構成のディレクトリ（dish_data, dish_regional_data, vegetable_summary）から作る。"""
+        vegetables = {}
+        for file_path in sorted((data_dir / "vegetable_summary").glob("*.json")):
+            with open(file_path, 'r', encoding='utf-8') as f:
+                _, keys = vegetable_entry(file_path.stem, json.load(f))
+            vegetables[file_path.stem] = [name for name, _ in keys]
+
+        # 料理ID「01_cy_001」の地域別データは「01_cy」
+        regional_names = {}
+        for file_path in sorted((data_dir / "dish_regional_data").glob("*.json")):
+            with open(file_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            region = data.get("metadata", {}).get("region") or data.get("data", {}).get("region") or ""
+            regional_names[file_path.stem] = split_names(region)
+
+        def dishes():
+            for file_path in sorted((data_dir / "dish_data").glob("*.json")):
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                yield file_path.stem, data, regional_names.get(file_path.stem.rsplit("_", 1)[0], [])
+        return cls.build(dishes(), vegetables)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"version": 1, "docs": self.docs, "postings": self.postings, "labels": self.labels}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "FacetIndex":
+        return cls(data["docs"], data["postings"], data["labels"])
+
+    @classmethod
+    def load(cls, index_file: Path) -> "FacetIndex":
+        with open(index_file, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def match(self, **filters: Optional[str]) -> int:
+        """
+        ファセットごとの条件（region="キプロス", alias="bread" など）をすべて満たす料理のビットマップ。
+        1つの条件に「、」やカンマで複数の語を書いた場合も、すべてを満たすものに絞る。
+        """
+        result = self.all_docs
+        for facet, value in filters.items():
+            if facet not in self.bitmaps:
+                raise ValueError(f"不明なファセット: {facet}（指定可能: {', '.join(FACETS)}）")
+            for part in split_names(value or ""):
+                result &= self.bitmaps[facet].get(normalize_key(part), 0)
+                if not result:
+                    return 0
+        return result
+
+    def page(self, result: int, limit: int = 20, offset: int = 0) -> List[Dict[str, Any]]:
+        """ビットマップの料理のうち、ID 順で offset から limit 件。"""
+        docs = []
+        for i, doc_no in enumerate(_doc_numbers(result)):
+            if i >= offset + limit:
+                break
+            if i >= offset:
+                docs.append(self.docs[doc_no])
+        return docs
+
+    def search(self, limit: int = 20, offset: int = 0, **filters: Optional[str]) -> Tuple[int, List[Dict[str, Any]]]:
+        """条件に合う料理の (総数, offset から limit 件の料理) を返す。"""
+        result = self.match(**filters)
+        return result.bit_count(), self.page(result, limit, offset)
+
+    def facet_counts(self, result: int, facet: str, limit: int = 10) -> List[Tuple[str, int]]:
+        """絞り込み結果の中での、ファセットの値ごとの件数（多い順）。"""
+        bitmaps = self.bitmaps[facet]
+        counts = []
+        for term, label in self.labels[facet].items():
+            count = (bitmaps[term] & result).bit_count()
+            if count:
+                counts.append((label, count))
+        counts.sort(key=lambda item: (-item[1], item[0]))
+        return counts[:limit]
@@ -0,0 +1,60 @@
+import json
+import random
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, Dict, Optional
+
+import response_cache
+
+
+class FakeGeminiClient:
+    """
+    google.genai.Client のバッチ API（files.upload / files.download / batches.create / batches.get）を
+    ローカルで真似るクライアント。2_gemini_batch_create.main(client=...) に渡して使う。
+
+    respond(key, prompt) が返した文字列を応答本文にする。
+    failure_rate の割合で、壊れた JSON を返す（分割・検証・再送の経路を通すため）。
+    ジョブは作成直後から成功状態になるので、ポーリングで待たない。
+    """
+
+    def __init__(self, respond: Callable[[str, str], str], failure_rate: float = 0.0, seed: int = 0):
+        self.respond = respond
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self._uploads: Dict[str, Path] = {}
+        self._jobs: Dict[str, str] = {}
+        self.files = SimpleNamespace(upload=self._upload, download=self._download)
+        self.batches = SimpleNamespace(create=self._create, get=self._get)
+
+    def _upload(self, file, config: Optional[dict] = None):
+        name = f"files/{Path(file).stem}"
+        self._uploads[name] = Path(file)
+        return SimpleNamespace(name=name)
+
+    def _create(self, model: str, src: str, config: Optional[dict] = None):
+        name = f"batches/{src.split('/', 1)[1]}"
+        self._jobs[name] = src
+        return SimpleNamespace(name=name)
+
+    def _get(self, name: str):
+        return SimpleNamespace(
+            name=name,
+            state=SimpleNamespace(name="JOB_STATE_SUCCEEDED"),
+            error=None,
+            dest=SimpleNamespace(file_name=f"{self._jobs[name]}_result"),
+        )
+
+    def _download(self, file: str):
+        """アップロードされたリクエストを1行ずつ読み、結果 JSONL をチャンクで返す。"""
+        with open(self._uploads[file[:-len("_result")]], 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                request = json.loads(line)
+                key = request["key"]
+                if self._random.random() < self.failure_rate:
+                    text = '{"content": {"ja": '
+                else:
+                    text = self.respond(key, response_cache.request_prompt(request))
+                result = response_cache.batch_result_line(key, text)
+                yield (json.dumps(result, ensure_ascii=False) + "\n").encode("utf-8")
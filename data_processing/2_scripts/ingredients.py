@@ -0,0 +1,61 @@
+import re
+from typing import Dict, Iterable, List, Optional
+
+from search_index import normalize_key
+
+# 「デュラム小麦（ブルグル）」「インド、アッサム州」「Santan (ココナッツミルク)」などを名前ごとに分ける
+_NAME_SEPARATORS = re.compile(r"[（）()［］\[\]、,，/／;；]")
+
+# 部分一致に使う名前の最短文字数（「ねぎ」は可、1文字の名前は完全一致のみ）
+MIN_AFFIX_LENGTH = 2
+
+
+def split_names(text: str) -> List[str]:
+    """括弧や読点で区切られた表記を、空でない名前のリストにする。"""
+    return [part.strip() for part in _NAME_SEPARATORS.split(text or "") if part.strip()]
+
+
+class NameMatcher:
+    """
+    正規化した名前 → ID の辞書で、自由記述の名前（料理の食材、親品目名など）をIDに対応づける。
+
+    - 括弧・読点で区切った各部分を search_index.normalize_key で正規化して完全一致を探す
+    - affix=True なら、一致しない部分は、既知の名前で始まる・終わる最長のものを探す
+      （「新玉ねぎ」→「玉ねぎ」、「トマトソース」→「トマト」）。途中の一致は誤りが多いので使わない
+    同じ名前が複数のIDにある場合は、先に登録した方を使う。
+    """
+
+    def __init__(self, affix: bool = False):
+        self.affix = affix
+        self._ids: Dict[str, str] = {}
+        self._max_length = 0
+
+    def add(self, item_id: str, names: Iterable[str]):
+        for name in names:
+            for part in split_names(name):
+                key = normalize_key(part)
+                if key and key not in self._ids:
+                    self._ids[key] = item_id
+                    self._max_length = max(self._max_length, len(key))
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def match(self, text: str) -> List[str]:
+        """text に含まれる名前のIDを、重複なしで出現順に返す。"""
+        found: List[str] = []
+        for part in split_names(text):
+            item_id = self._match_part(normalize_key(part))
+            if item_id is not None and item_id not in found:
+                found.append(item_id)
+        return found
+
+    def _match_part(self, key: str) -> Optional[str]:
+        item_id = self._ids.get(key)
+        if item_id is not None or not self.affix:
+            return item_id
+        for length in range(min(len(key) - 1, self._max_length), MIN_AFFIX_LENGTH - 1, -1):
+            item_id = self._ids.get(key[:length]) or self._ids.get(key[-length:])
+            if item_id is not None:
+                return item_id
+        return None
@@ -0,0 +1,201 @@
+import functools
+import json
+import os
+import time
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import config
+
+try:
+    import resource
+except ImportError:  # Windows では RSS・子プロセスの CPU 時間を記録しない
+    resource = None
+
+METRICS_DIR = config.DATA_DIR / "metrics"
+HISTORY_FILE = METRICS_DIR / "runs.jsonl"
+
+# 1件あたりの処理時間のヒストグラムの境界（秒）
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 実行中の計測（入れ子で呼ばれた main() は内側が優先）
+_active: List["StageMetrics"] = []
+
+
+def current() -> Optional["StageMetrics"]:
+    """実行中の計測を返す。計測していなければ None。"""
+    return _active[-1] if _active else None
+
+
+def _rusage():
+    """(自プロセスの CPU 秒, 子プロセスの CPU 秒, 自プロセスの最大RSS, 子プロセスの最大RSS) を返す。"""
+    if resource is None:
+        return time.process_time(), 0.0, 0, 0
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    # Linux の ru_maxrss は KB 単位
+    return own.ru_utime + own.ru_stime, children.ru_utime + children.ru_stime, own.ru_maxrss * 1024, children.ru_maxrss * 1024
+
+
+class LatencyHistogram:
+    """1件あたりの処理時間を、Prometheus と同じ累積バケットで数える。"""
+
+    def __init__(self, buckets: Iterable[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # 最後は +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def cumulative(self) -> List[int]:
+        total = 0
+        result = []
+        for count in self.counts:
+            total += count
+            result.append(total)
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        labels = [str(b) for b in self.buckets] + ["+Inf"]
+        return {"buckets": dict(zip(labels, self.cumulative())), "sum": round(self.sum, 6), "count": self.count}
+
+
+class StageMetrics:
+    """
+    1回のスクリプト実行の計測値。
+
+    - 壁時計時間、CPU 時間（ワーカープロセス分を含む）、最大RSS
+    - 読み書きしたファイル数とバイト数（書き込みは outputs の下で実行中に更新されたファイルを数える）
+    - 任意のカウンタ（プロンプトの概算トークン数、エラー件数など）
+    - 1件あたりの処理時間のヒストグラム（parallel.process_files / imap_bounded が自動で記録）
+    """
+
+    def __init__(self, stage: str, outputs: Iterable[Path] = ()):
+        self.stage = stage
+        self.outputs = list(outputs)
+        self.counters: Dict[str, float] = {
+            "files_read": 0, "bytes_in": 0, "files_written": 0, "bytes_out": 0, "records": 0, "errors": 0,
+        }
+        self.latency = LatencyHistogram()
+        self.report: Dict[str, Any] = {}
+
+    def count(self, name: str, value: float = 1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def read_file(self, file_path: Path):
+        self.counters["files_read"] += 1
+        try:
+            self.counters["bytes_in"] += os.path.getsize(file_path)
+        except OSError:
+            pass
+
+    def observe(self, seconds: float, error: bool = False):
+        self.latency.observe(seconds)
+        self.counters["records"] += 1
+        if error:
+            self.counters["errors"] += 1
+
+    def __enter__(self) -> "StageMetrics":
+        self._started_at = time.time()
+        self._wall = time.perf_counter()
+        self._cpu_self, self._cpu_children, _, _ = _rusage()
+        _active.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _active.remove(self)
+        cpu_self, cpu_children, rss_self, rss_children = _rusage()
+        self._count_outputs()
+        self.report = {
+            "stage": self.stage,
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self._started_at)),
+            "status": "error" if exc_type else "ok",
+            "wall_seconds": round(time.perf_counter() - self._wall, 6),
+            "cpu_seconds": round((cpu_self - self._cpu_self) + (cpu_children - self._cpu_children), 6),
+            "peak_rss_bytes": max(rss_self, rss_children),
+            "counters": self.counters,
+            "latency_seconds": self.latency.to_dict(),
+        }
+        try:
+            write_report(self.report, self.latency)
+        except OSError as e:
+            print(f"計測結果を保存できませんでした: {e}")
+        return False
+
+    def _count_outputs(self):
+        """outputs の下で、この実行中に更新されたファイルを書き込みとして数える。"""
+        for output in self.outputs:
+            paths = [output] if output.is_file() else (output.rglob("*") if output.is_dir() else [])
+            for path in paths:
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                if path.is_file() and stat.st_mtime >= self._started_at - 1:
+                    self.counters["files_written"] += 1
+                    self.counters["bytes_out"] += stat.st_size
+
+
+def _prom_name(name: str) -> str:
+    return "vegitage_stage_" + "".join(c if c.isalnum() else "_" for c in name)
+
+
+def prometheus_text(report: Dict[str, Any], latency: LatencyHistogram) -> str:
+    """node_exporter の textfile collector 用の書式にする。"""
+    label = f'stage="{report["stage"]}"'
+    gauges = {
+        "wall_seconds": report["wall_seconds"],
+        "cpu_seconds": report["cpu_seconds"],
+        "peak_rss_bytes": report["peak_rss_bytes"],
+        "last_run_timestamp_seconds": int(time.time()),
+        "last_run_success": 1 if report["status"] == "ok" else 0,
+    }
+    gauges.update(report["counters"])
+    lines = []
+    for name, value in gauges.items():
+        metric = _prom_name(name)
+        lines.append(f"# TYPE {metric} gauge")
+        lines.append(f"{metric}{{{label}}} {value}")
+
+    metric = _prom_name("record_latency_seconds")
+    lines.append(f"# TYPE {metric} histogram")
+    labels = [str(b) for b in latency.buckets] + ["+Inf"]
+    for le, count in zip(labels, latency.cumulative()):
+        lines.append(f'{metric}_bucket{{{label},le="{le}"}} {count}')
+    lines.append(f"{metric}_sum{{{label}}} {latency.sum}")
+    lines.append(f"{metric}_count{{{label}}} {latency.count}")
+    return "\n".join(lines) + "\n"
+
+
+def write_report(report: Dict[str, Any], latency: LatencyHistogram, metrics_dir: Path = METRICS_DIR):
+    """
+    {ステージ}.json（最新の実行）と {ステージ}.prom を書き出し、runs.jsonl に履歴を追記する。
+    .prom は収集中に読まれても壊れないよう、一時ファイルからの置き換えで書く。
+    """
+    metrics_dir.mkdir(parents=True, exist_ok=True)
+    with open(metrics_dir / f"{report['stage']}.json", 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    with open(metrics_dir / HISTORY_FILE.name, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(report, ensure_ascii=False) + "\n")
+    prom_file = metrics_dir / f"{report['stage']}.prom"
+    tmp_path = prom_file.with_suffix(".prom.tmp")
+    tmp_path.write_text(prometheus_text(report, latency), encoding="utf-8")
+    tmp_path.replace(prom_file)
+
+
+def instrumented(stage: str, outputs: Iterable[Path] = ()) -> Callable:
+    """main() を計測付きで実行するデコレーター。"""
+    outputs = list(outputs)
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with StageMetrics(stage, outputs):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
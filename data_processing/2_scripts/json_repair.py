@@ -0,0 +1,90 @@
+import json
+import re
+from typing import Any, List, Tuple
+
+# 応答全体を囲むフェンスだけを対象にする（文字列値の中の ``` には触れない）
+OPENING_FENCE_PATTERN = re.compile(r"\A\s*```(?:json)?[ \t]*(?:\n|\Z)")
+CLOSING_FENCE_PATTERN = re.compile(r"\n\s*```\s*\Z")
+
+# Gemini の応答が最後まで生成されたことを示す finishReason
+COMPLETE_FINISH_REASONS = {"STOP"}
+
+
+def strip_code_fence(text: str) -> str:
+    """
+    先頭の ```json と末尾の ``` を取り除く。閉じていないフェンスは先頭だけを除去する。
+    フェンスで始まらない場合は、前後の空白を除いたテキストをそのまま返す。
+    """
+    match = OPENING_FENCE_PATTERN.match(text)
+    if not match:
+        return text.strip()
+    body = text[match.end():]
+    return CLOSING_FENCE_PATTERN.sub("", body).strip()
+
+
+def is_complete(candidate: dict) -> bool:
+    """
+    応答の candidate が最後まで生成されたか。finishReason が無い（古い形式の）応答は完了とみなす。
+    MAX_TOKENS などで打ち切られた応答は、JSON として読めても中身が欠けているので受け付けない。
+    """
+    reason = candidate.get("finishReason")
+    return reason is None or reason in COMPLETE_FINISH_REASONS
+
+
+def loads_with_repair(text: str) -> Tuple[Any, bool]:
+    """
+    Gemini の応答テキストを JSON として読み込む。
+
+    そのまま読めない場合は、データを失わない修復（コードフェンスと末尾カンマの除去）だけを試す。
+    途中で切れた応答や、最上位の値の後ろに余分なテキストがある応答は補完せず、
+    json.JSONDecodeError を送出する（再送リストに回すため）。
+    (データ, 修復したかどうか) を返す。
+    """
+    try:
+        return json.loads(text), False
+    except json.JSONDecodeError as e:
+        first_error = e
+
+    cleaned = strip_code_fence(text)
+    try:
+        return json.loads(cleaned), False
+    except json.JSONDecodeError:
+        pass
+
+    without_commas = drop_trailing_commas(cleaned)
+    if without_commas == cleaned:
+        raise first_error
+    try:
+        return json.loads(without_commas), True
+    except json.JSONDecodeError:
+        raise first_error
+
+
+def drop_trailing_commas(text: str) -> str:
+    """文字列リテラルの内外を追跡しながら走査し、} や ] の直前のカンマだけを取り除く。"""
+    out: List[str] = []
+    in_string = False
+    escaped = False
+    for ch in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "}]":
+            _drop_trailing_comma(out)
+        out.append(ch)
+    return "".join(out)
+
+
+def _drop_trailing_comma(chars: List[str]):
+    """末尾の空白を除き、最後の文字がカンマなら取り除く。"""
+    i = len(chars) - 1
+    while i >= 0 and chars[i] in " \t\r\n":
+        i -= 1
+    if i >= 0 and chars[i] == ",":
+        del chars[i]
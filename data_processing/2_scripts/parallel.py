@@ -0,0 +1,158 @@
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import instrumentation
+
+
+class _CatchErrors:
+    """
+    ワーカー側で例外を捕まえて文字列に変換するラッパー。
+    例外でプール全体が止まらないようにし、エラーを入力順で報告できるようにする。
+    計測用に、1件の処理時間もあわせて返す。
+    """
+
+    def __init__(self, func: Callable[[Path], Optional[str]]):
+        self.func = func
+
+    def __call__(self, file_path: Path) -> Tuple[Path, Optional[str], float]:
+        start = time.perf_counter()
+        try:
+            error = self.func(file_path)
+        except Exception as e:
+            error = str(e)
+        return file_path, error, time.perf_counter() - start
+
+
+class _Timed:
+    """ワーカー側で1件の処理時間を測るラッパー（imap_bounded 用）。"""
+
+    def __init__(self, func: Callable[[Any], Any]):
+        self.func = func
+
+    def __call__(self, item: Any) -> Tuple[Any, float]:
+        start = time.perf_counter()
+        result = self.func(item)
+        return result, time.perf_counter() - start
+
+
+def resolve_workers(workers: int) -> int:
+    """--workers の値を実際のプロセス数にする（0 は CPU数）。"""
+    if workers == 0:
+        return os.cpu_count() or 1
+    return workers
+
+
+def _record(results: List[Tuple[Path, Optional[str], float]]) -> List[Tuple[Path, Optional[str]]]:
+    """実行中の計測があれば、読んだファイルと1件ごとの処理時間を記録する。"""
+    metrics = instrumentation.current()
+    if metrics is not None:
+        for file_path, error, elapsed in results:
+            metrics.read_file(file_path)
+            metrics.observe(elapsed, error=error is not None)
+    return [(file_path, error) for file_path, error, _ in results]
+
+
+def process_files(
+    func: Callable[[Path], Optional[str]],
+    files: Sequence[Path],
+    workers: int = 1,
+    chunksize: Optional[int] = None,
+) -> List[Tuple[Path, Optional[str]]]:
+    """
+    files の各ファイルに func を適用し、(ファイル, エラー or None) のリストを入力順で返す。
+
+    func は成功時に None、スキップ・失敗時にメッセージを返す。
+    workers が1以下なら直列に処理する（0 は CPU数）。並列時もワーカーごとに同じ func を同じ入力で
+    呼ぶだけなので、出力ファイルは直列実行とバイト単位で一致する。
+    """
+    wrapped = _CatchErrors(func)
+    workers = resolve_workers(workers)
+    if workers <= 1 or len(files) <= 1:
+        return _record([wrapped(file_path) for file_path in files])
+
+    if not chunksize:
+        # 1ワーカーあたり4チャンク程度に分け、偏りとプロセス間通信のバランスを取る
+        chunksize = max(1, len(files) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return _record(list(executor.map(wrapped, files, chunksize=chunksize)))
+
+
+def imap_bounded(
+    func: Callable[[Any], Any],
+    items: Iterable[Any],
+    workers: int = 1,
+    max_pending: Optional[int] = None,
+    initializer: Optional[Callable[..., None]] = None,
+    initargs: Tuple = (),
+) -> Iterator[Any]:
+    """
+    items を遅延で読みながら func を適用し、結果を入力順に返すジェネレーター。
+
+    Executor.map は入力を全て先読みするため、巨大なファイルの行を渡すと
+    メモリを使い切る。ここでは処理中の件数を max_pending までに抑え、
+    入力の大きさによらずメモリ使用量を一定に保つ。
+    initializer は各ワーカーの起動時（直列なら最初に1回）に呼ばれる。
+    """
+    metrics = instrumentation.current()
+    timed = _Timed(func)
+    workers = resolve_workers(workers)
+    if workers <= 1:
+        if initializer is not None:
+            initializer(*initargs)
+        for item in items:
+            result, elapsed = timed(item)
+            if metrics is not None:
+                metrics.observe(elapsed)
+            yield result
+        return
+
+    max_pending = max_pending or workers * 4
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs) as executor:
+        pending = deque()
+        for item in items:
+            pending.append(executor.submit(timed, item))
+            if len(pending) >= max_pending:
+                result, elapsed = pending.popleft().result()
+                if metrics is not None:
+                    metrics.observe(elapsed)
+                yield result
+        while pending:
+            result, elapsed = pending.popleft().result()
+            if metrics is not None:
+                metrics.observe(elapsed)
+            yield result
+
+
+def report(results: List[Tuple[Path, Optional[str]]]) -> Tuple[int, int]:
+    """エラーを入力順に表示し、(成功件数, 失敗件数) を返す。"""
+    error_count = 0
+    for file_path, error in results:
+        if error is not None:
+            print(f"{file_path.name}: {error}")
+            error_count += 1
+    return len(results) - error_count, error_count
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """並列実行用の共通オプションを追加する。"""
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help=f"ワーカープロセス数（既定: 1 = 直列、0 でCPU数 {os.cpu_count()}）",
+    )
+    parser.add_argument(
+        "--chunksize", type=int, default=None,
+        help="1回にワーカーへ渡すファイル数（既定: 自動）",
+    )
+
+
+def parse_args(description: str) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=description)
+    add_arguments(parser)
+    args = parser.parse_args()
+    args.workers = resolve_workers(args.workers)
+    return args
@@ -0,0 +1,426 @@
+import argparse
+import hashlib
+import importlib.util
+import inspect
+import json
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import config
+
+STATE_FILE = config.DATA_DIR / ".pipeline_state.json"
+
+
+@dataclass
+class Stage:
+    """
+    パイプラインの1ステージ（2_scripts 内の番号付きスクリプト1本）。
+
+    primary_input: 1ファイル→1ファイルで処理される主入力。ここだけが変わった場合は
+                   変更ファイルのみを main(files=...) に渡して再処理する。
+    dependencies:  参照されるだけの入力（プロンプト、親品目データなど）。
+                   ここが変わった場合はステージ全体を再実行する。
+    outputs:       出力もファイルごとのハッシュを記録し、消えた・書き換えられた場合は全体を再実行する。
+
+    main() が処理に失敗した入力ファイルのリストを返した場合、それらは記録せず、次回また再処理する。
+    """
+    name: str
+    script: str
+    outputs: List[Path]
+    primary_input: Optional[Path] = None
+    dependencies: List[Path] = field(default_factory=list)
+    online: bool = False  # Gemini API を呼び出すステージ
+
+    @property
+    def inputs(self) -> List[Path]:
+        paths = list(self.dependencies)
+        if self.primary_input is not None:
+            paths.insert(0, self.primary_input)
+        return paths
+
+
+STAGES = [
+    Stage(
+        name="variety_details_jsonl",
+        script="1_variety_details_jsonl_create.py",
+        dependencies=[
+            config.INPUT_LISTS / "varieties_list_ja_0.json",
+            config.PROMPTS_DIR / "2_varieties_details",
+        ],
+        outputs=[config.INPUT_LISTS / "varieties_detail_ja_0.jsonl"],
+    ),
+    Stage(
+        name="variety_summary_jsonl",
+        script="1_variety_summary_jsonl_create.py",
+        dependencies=[
+            config.RAW_DATA / "varieties_detail",
+            config.PROCESSING_DATA / "species_detail",
+            config.PROMPTS_DIR / "5_varieties_summary",
+        ],
+        outputs=[config.INPUT_LISTS / "varieties_summary_0.jsonl"],
+    ),
+    Stage(
+        name="gemini_batch",
+        script="2_gemini_batch_create.py",
+        dependencies=[config.INPUT_LISTS / "varieties_summary_0.jsonl"],
+        outputs=[config.RAW_RESPONSES / "varieties_summary_0.jsonl"],
+        online=True,
+    ),
+    Stage(
+        name="batch_to_files",
+        script="3_gemini_batch_to_files.py",
+        dependencies=[
+            config.RAW_RESPONSES / "varieties_summary_0.jsonl",
+            config.PROMPTS_DIR / "5_varieties_summary" / "2_schema.json",
+        ],
+        outputs=[config.RAW_DATA / "varieties_summary"],
+    ),
+    Stage(
+        name="gemini_retry",
+        script="3_gemini_batch_retry.py",
+        dependencies=[
+            config.RAW_RESPONSES / "varieties_summary_0.jsonl",
+            config.RAW_DATA / "varieties_summary",
+        ],
+        outputs=[config.RAW_DATA / "varieties_summary"],
+        online=True,
+    ),
+    Stage(
+        name="species_processing",
+        script="5_species_processing.py",
+        primary_input=config.RAW_DATA / "species_summary",
+        dependencies=[config.RAW_DATA / "species_detail"],
+        outputs=[
+            config.PROCESSING_DATA / "species_summary",
+            config.PROCESSING_DATA / "species_detail",
+        ],
+    ),
+    Stage(
+        name="variety_detail",
+        script="5_variety_detail.py",
+        primary_input=config.RAW_DATA / "varieties_detail",
+        outputs=[config.PROCESSING_DATA / "varieties_detail"],
+    ),
+    Stage(
+        name="variety_summary",
+        script="5_variety_summary.py",
+        primary_input=config.RAW_DATA / "varieties_summary",
+        dependencies=[
+            config.RAW_DATA / "varieties_detail",
+            config.PROCESSING_DATA / "species_summary",
+        ],
+        outputs=[config.PROCESSING_DATA / "varieties_summary"],
+    ),
+    Stage(
+        name="index",
+        script="6_index_generator.py",
+        primary_input=config.APP_DATA / "vegetable_summary",
+        outputs=[config.PROCESSING_DATA / "_index.json"],
+    ),
+    Stage(
+        name="graph",
+        script="6_relationship_graph.py",
+        dependencies=[
+            config.APP_DATA / "vegetable_summary",
+            config.APP_DATA / "varieties_summary",
+            config.APP_DATA / "varieties_detail",
+            config.APP_DATA / "dish_data",
+            config.APP_DATA / "dish_regional_data",
+        ],
+        outputs=[config.PROCESSING_DATA / "graph"],
+    ),
+    Stage(
+        name="dish_facets",
+        script="6_dish_facet_index.py",
+        dependencies=[
+            config.APP_DATA / "vegetable_summary",
+            config.APP_DATA / "dish_data",
+            config.APP_DATA / "dish_regional_data",
+        ],
+        outputs=[config.PROCESSING_DATA / "_dish_facet_index.json"],
+    ),
+    Stage(
+        name="package",
+        script="7_app_data_packager.py",
+        dependencies=[config.APP_DATA],
+        outputs=[config.PACKED_DATA],
+    ),
+    Stage(
+        name="sqlite_export",
+        script="7_sqlite_export.py",
+        dependencies=[
+            config.APP_DATA / "vegetable_summary",
+            config.APP_DATA / "vegetable_detail",
+            config.APP_DATA / "species_summary",
+            config.APP_DATA / "species_detail",
+            config.APP_DATA / "varieties_summary",
+            config.APP_DATA / "varieties_detail",
+            config.APP_DATA / "dish_data",
+        ],
+        outputs=[config.PACKED_DATA / "vegitage.sqlite3"],
+    ),
+    Stage(
+        name="publish",
+        script="8_delta_publish.py",
+        dependencies=[config.APP_DATA, config.FRONTEND_ASSET_DATA],
+        outputs=[config.DATA_DIR / "7_published"],
+    ),
+]
+
+
+def load_stage_module(script: str):
+    """番号付きスクリプト（通常の import ができない名前）をモジュールとして読み込む。"""
+    path = config.SCRIPT_DIR / script
+    module_name = "stage_" + path.stem
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    # プロセスプールのワーカーが関数を名前で解決できるよう登録しておく
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def _is_under(path: Path, root: Path) -> bool:
+    return path == root or root in path.parents
+
+
+def sort_stages(stages: List[Stage]) -> List[Stage]:
+    """
+    出力→入力の重なりから依存グラフを作り、トポロジカル順に並べる。
+    依存関係のないステージ同士は STAGES の定義順を保つ。
+    """
+    upstream: Dict[str, set] = {stage.name: set() for stage in stages}
+    for stage in stages:
+        for other in stages:
+            if other is stage:
+                continue
+            if any(_is_under(i, o) or _is_under(o, i) for i in stage.inputs for o in other.outputs):
+                upstream[stage.name].add(other.name)
+
+    ordered: List[Stage] = []
+    done: set = set()
+    while len(ordered) < len(stages):
+        ready = [s for s in stages if s.name not in done and upstream[s.name] <= done]
+        if not ready:
+            cycle = [s.name for s in stages if s.name not in done]
+            raise ValueError(f"ステージの依存関係が循環しています: {cycle}")
+        for stage in ready:
+            ordered.append(stage)
+            done.add(stage.name)
+    return ordered
+
+
+class HashStore:
+    """
+    ファイルごとの内容ハッシュ(sha256)を記録する。
+    サイズと mtime が前回と同じファイルはハッシュを再計算しない。
+    """
+
+    def __init__(self, state_file: Path = STATE_FILE):
+        self.state_file = state_file
+        self._state: Dict[str, Dict[str, Dict]] = {}
+        if state_file.exists():
+            with open(state_file, 'r', encoding='utf-8') as f:
+                self._state = json.load(f)
+
+    def save(self):
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.state_file, 'w', encoding='utf-8') as f:
+            json.dump(self._state, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+    def snapshot(self, stage_name: str, paths: List[Path], exclude: List[Path] = ()) -> Dict[str, Dict]:
+        """paths 以下の全ファイル（exclude 以下を除く）について {パス: {size, mtime_ns, sha256}} を返す。"""
+        previous = self._state.get(stage_name, {})
+        current = {}
+        for file_path in _iter_files(paths):
+            if any(_is_under(file_path, excluded) for excluded in exclude):
+                continue
+            stat = file_path.stat()
+            key = str(file_path)
+            entry = previous.get(key)
+            if not (entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns):
+                entry = {
+                    "size": stat.st_size,
+                    "mtime_ns": stat.st_mtime_ns,
+                    "sha256": _sha256(file_path),
+                }
+            current[key] = entry
+        return current
+
+    def missing_or_modified(self, stage_name: str, snapshot: Dict[str, Dict]) -> List[Path]:
+        """前回記録したファイルのうち、消えた・内容が変わったもの（追加されたファイルは含めない）。"""
+        previous = self._state.get(stage_name, {})
+        return sorted(
+            Path(key) for key, entry in previous.items()
+            if snapshot.get(key, {}).get("sha256") != entry["sha256"]
+        )
+
+    def previous(self, stage_name: str) -> Dict[str, Dict]:
+        return self._state.get(stage_name, {})
+
+    def changed(self, stage_name: str, snapshot: Dict[str, Dict]) -> List[Path]:
+        """前回記録時から内容が変わった（または追加・削除された）ファイルを返す。"""
+        previous = self._state.get(stage_name, {})
+        changed = [
+            Path(key) for key, entry in snapshot.items()
+            if previous.get(key, {}).get("sha256") != entry["sha256"]
+        ]
+        changed.extend(Path(key) for key in previous if key not in snapshot)
+        return sorted(changed)
+
+    def record(self, stage_name: str, snapshot: Dict[str, Dict]):
+        self._state[stage_name] = snapshot
+
+
+def _iter_files(paths: List[Path]):
+    for path in paths:
+        if path.is_dir():
+            yield from sorted(p for p in path.rglob("*") if p.is_file())
+        elif path.is_file():
+            yield path
+
+
+def _sha256(file_path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _outputs_key(stage: Stage) -> str:
+    return f"{stage.name}#outputs"
+
+
+def _nested_outputs(stage: Stage, stages: List[Stage]) -> List[Path]:
+    """stage の出力ディレクトリの中にある、ほかのステージの出力（package の中の SQLite など）。"""
+    return [
+        o for other in stages if other is not stage for o in other.outputs
+        if any(o != own and _is_under(o, own) for own in stage.outputs)
+    ]
+
+
+def remove_stale_outputs(previous_outputs: Dict[str, Dict], started_ns: int) -> List[Path]:
+    """
+    全体の再実行で書き直されなかった前回の出力を削除する。
+    出力名（url）は入力のファイル名から決まらないため、削除された入力の出力は「書き直されなかったもの」として見分ける。
+    """
+    removed = []
+    for key in previous_outputs:
+        path = Path(key)
+        if path.exists() and path.stat().st_mtime_ns < started_ns:
+            path.unlink()
+            removed.append(path)
+    return removed
+
+
+def run_stage(
+    stage: Stage,
+    store: HashStore,
+    force: bool = False,
+    dry_run: bool = False,
+    workers: int = 1,
+) -> str:
+    """
+    1ステージを必要な範囲だけ実行し、結果（skip / partial / full）を返す。
+    """
+    exclude = _nested_outputs(stage, STAGES)
+    snapshot = store.snapshot(stage.name, stage.inputs)
+    changed = store.changed(stage.name, snapshot)
+    damaged = store.missing_or_modified(_outputs_key(stage), store.snapshot(_outputs_key(stage), stage.outputs, exclude))
+    if not changed and not damaged and not force and all(o.exists() for o in stage.outputs):
+        print(f"[{stage.name}] 変更なし。スキップします。")
+        return "skip"
+    if damaged:
+        print(f"[{stage.name}] 前回の出力 {len(damaged)}件が削除・変更されています（例: {damaged[0]}）")
+
+    changed_primary = []
+    if stage.primary_input is not None and not force:
+        changed_primary = [p for p in changed if _is_under(p, stage.primary_input)]
+    partial = bool(changed_primary) and len(changed_primary) == len(changed) \
+        and not damaged and all(o.exists() for o in stage.outputs)
+    # 削除されたファイルは再処理できないので、全体を再実行し、その出力を消す
+    deleted_primary = [p for p in changed_primary if not p.exists()]
+    if deleted_primary:
+        partial = False
+
+    if dry_run:
+        mode = f"{len(changed_primary)}件のみ" if partial else "全体"
+        print(f"[{stage.name}] 再実行予定 ({mode})")
+        return "partial" if partial else "full"
+
+    previous_outputs = store.previous(_outputs_key(stage))
+    started_ns = time.time_ns()
+    failed: List[Path] = []
+    module = load_stage_module(stage.script)
+    main = getattr(module, "main", None)
+    if main is not None:
+        params = inspect.signature(main).parameters
+        kwargs = {"workers": workers} if "workers" in params else {}
+        if partial and "files" in params:
+            print(f"[{stage.name}] {len(changed_primary)}件の変更ファイルを再処理します")
+            result = main(files=changed_primary, **kwargs)
+        else:
+            partial = False
+            print(f"[{stage.name}] 全体を再実行します")
+            result = main(**kwargs)
+        if isinstance(result, list):
+            failed = [Path(p) for p in result]
+
+    # 実行後に入力を再スナップショットして記録する（実行中の上流の書き換えも反映）
+    # 失敗した入力は記録しないので、内容が変わらなくても次回また再処理される
+    recorded = store.snapshot(stage.name, stage.inputs)
+    for file_path in failed:
+        recorded.pop(str(file_path), None)
+    if failed:
+        print(f"[{stage.name}] 失敗した {len(failed)}件は次回も再処理します")
+
+    if deleted_primary and not partial:
+        # 今回失敗した入力の古い出力も消える（入力が直って再処理されれば作り直される）
+        removed = remove_stale_outputs(previous_outputs, started_ns)
+        print(f"[{stage.name}] 削除された入力 {len(deleted_primary)}件に対応する古い出力 {len(removed)}件を削除しました")
+
+    store.record(stage.name, recorded)
+    store.record(_outputs_key(stage), store.snapshot(_outputs_key(stage), stage.outputs, exclude))
+    store.save()
+    return "partial" if partial else "full"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="2_scripts の各ステージを差分実行する")
+    parser.add_argument("stages", nargs="*", help="実行するステージ名（省略時は全ステージ）")
+    parser.add_argument("--force", action="store_true", help="変更の有無にかかわらず再実行する")
+    parser.add_argument("--online", action="store_true", help="Gemini API を呼び出すステージも実行する")
+    parser.add_argument("--dry-run", action="store_true", help="再実行対象を表示するだけで実行しない")
+    parser.add_argument("--workers", type=int, default=1, help="並列対応ステージのワーカープロセス数")
+    args = parser.parse_args()
+
+    known = {stage.name for stage in STAGES}
+    unknown = [name for name in args.stages if name not in known]
+    if unknown:
+        parser.error(f"不明なステージ: {', '.join(unknown)}（指定可能: {', '.join(sorted(known))}）")
+
+    store = HashStore()
+    results = {}
+    for stage in sort_stages(STAGES):
+        if args.stages and stage.name not in args.stages:
+            continue
+        if stage.online and not args.online:
+            print(f"[{stage.name}] API呼び出しステージのため省略（--online で実行）")
+            continue
+        results[stage.name] = run_stage(
+            stage, store, force=args.force, dry_run=args.dry_run, workers=args.workers,
+        )
+
+    print("--------------------------------------")
+    for name, result in results.items():
+        print(f"{name}: {result}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# 出力スキーマ (5_varieties_summary/2_schema.json) の各項目を書くために、
+# 親品目データ (species_detail) のどのセクションを参照するか。
+# スキーマから消えた項目の参照元は、プロンプトからも自動的に外れる。
+SPECIES_SECTIONS_BY_FIELD = {
+    "display_name": ["basic_info"],
+    "oneliner": ["basic_info", "global_cultural_value"],
+    "description": ["basic_info", "culinary_applications"],
+    "practical_oneliner": ["culinary_applications"],
+    "practical_tips": ["culinary_applications", "cultivation_characteristics"],
+    "nutrition_oneliner": ["nutritional_functional"],
+    "nutrition_benefits": ["nutritional_functional"],
+    "safety_oneliner": ["nutritional_functional"],
+    "safety_notes": ["nutritional_functional"],
+    "honest_oneliner": ["culinary_applications"],
+    "honest_assessment": ["culinary_applications", "cultivation_characteristics"],
+    "cultural_background": ["global_cultural_value", "global_names"],
+    "notes": ["conservation_priority"],
+}
+
+# 品種データ (varieties_detail) のうち記事の執筆に使うセクション。
+# relationships は 5_variety_summary.py で後から結合するため送らない。
+VARIETY_SECTIONS = ["variety_profile", "narrative", "structured_data"]
+
+# どのセクションでも執筆には使わない、調査過程の記録用のキー
+PRUNED_KEYS = {
+    "metadata",
+    "sources",
+    "primary_sources",
+    "primary_sources_consulted",
+    "source_comment",
+    "confidence",
+    "confidence_level",
+    "data_confidence_level",
+}
+
+# トークン予算を超えたときに、文字列を切り詰める最短の長さ
+MIN_STRING_LENGTH = 40
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    ローカルでの概算トークン数。
+    英数字は約4文字で1トークン、日本語などの非ASCII文字は1文字1トークンとして数える（多めの見積もり）。
+    """
+    ascii_count = sum(1 for ch in text if ord(ch) < 128)
+    return (ascii_count + 3) // 4 + (len(text) - ascii_count)
+
+
+def minify(data: Any) -> str:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+def schema_fields(schema_file: Path) -> List[str]:
+    """出力スキーマの content.ja に並ぶ項目名を返す。"""
+    with open(schema_file, 'r', encoding='utf-8') as f:
+        schema = json.load(f)
+    return list(schema.get("content", {}).get("ja", {}).keys())
+
+
+def species_sections_for(fields: List[str]) -> List[str]:
+    """スキーマ項目から、参照される品目セクションを参照回数の多い順に返す。"""
+    counts: Dict[str, int] = {}
+    for name in fields:
+        for section in SPECIES_SECTIONS_BY_FIELD.get(name, []):
+            counts[section] = counts.get(section, 0) + 1
+    return sorted(counts, key=lambda section: -counts[section])
+
+
+def prune(data: Any) -> Any:
+    """PRUNED_KEYS と、空の値を再帰的に取り除く。"""
+    if isinstance(data, dict):
+        pruned = {}
+        for key, value in data.items():
+            if key in PRUNED_KEYS:
+                continue
+            value = prune(value)
+            if value not in (None, "", [], {}):
+                pruned[key] = value
+        return pruned
+    if isinstance(data, list):
+        return [v for v in (prune(item) for item in data) if v not in (None, "", [], {})]
+    return data
+
+
+def truncate_strings(data: Any, max_length: int) -> Any:
+    if isinstance(data, dict):
+        return {key: truncate_strings(value, max_length) for key, value in data.items()}
+    if isinstance(data, list):
+        return [truncate_strings(item, max_length) for item in data]
+    if isinstance(data, str) and len(data) > max_length:
+        return data[:max_length] + "…"
+    return data
+
+
+@dataclass
+class CompactedData:
+    """圧縮後のプロンプト埋め込み用テキストと、圧縮の記録。"""
+    variety_text: str
+    species_text: str
+    dropped_sections: List[str] = field(default_factory=list)
+    truncated_to: Optional[int] = None
+    over_budget: bool = False  # 切り詰めても token_budget に収まらなかった
+
+
+class PromptCompactor:
+    """
+    品種の summary 用プロンプトに埋め込む JSON を小さくする。
+
+    1. スキーマで使わないセクションと調査記録用のキーを削除し、JSON を最小化する。
+    2. token_budget を超える場合、参照の少ない品目セクションから順に削る。
+    3. それでも超える場合、長い文字列を段階的に切り詰める。
+    4. MIN_STRING_LENGTH まで切り詰めても超える場合は over_budget を立てて返す（呼び出し側で除外する）。
+    """
+
+    def __init__(self, schema_file: Path, token_budget: Optional[int] = None, overhead_tokens: int = 0):
+        self.species_sections = species_sections_for(schema_fields(schema_file))
+        self.token_budget = token_budget
+        # テンプレート本文とスキーマのトークン数（予算から差し引く）
+        self.overhead_tokens = overhead_tokens
+
+    def compact(self, variety_detail: Dict[str, Any], species_detail: Dict[str, Any]) -> CompactedData:
+        variety = prune({k: variety_detail[k] for k in VARIETY_SECTIONS if k in variety_detail})
+        sections = [s for s in self.species_sections if s in species_detail]
+        species = prune({s: species_detail[s] for s in sections})
+        result = CompactedData(minify(variety), minify(species))
+        if self.token_budget is None:
+            return result
+
+        # 参照の少ないセクションから削る（最低1セクションは残す）
+        while self._over_budget(result) and len(sections) > 1:
+            dropped = sections.pop()
+            result.dropped_sections.append(dropped)
+            species.pop(dropped, None)
+            result.species_text = minify(species)
+
+        max_length = max(
+            [len(v) for v in _iter_strings(variety)] + [len(v) for v in _iter_strings(species)] + [0]
+        )
+        while self._over_budget(result) and max_length > MIN_STRING_LENGTH:
+            max_length = max(MIN_STRING_LENGTH, max_length // 2)
+            result.variety_text = minify(truncate_strings(variety, max_length))
+            result.species_text = minify(truncate_strings(species, max_length))
+            result.truncated_to = max_length
+        result.over_budget = self._over_budget(result)
+        return result
+
+    def _over_budget(self, result: CompactedData) -> bool:
+        tokens = estimate_tokens(result.variety_text) + estimate_tokens(result.species_text)
+        return tokens + self.overhead_tokens > self.token_budget
+
+
+def _iter_strings(data: Any):
+    if isinstance(data, dict):
+        for value in data.values():
+            yield from _iter_strings(value)
+    elif isinstance(data, list):
+        for item in data:
+            yield from _iter_strings(item)
+    elif isinstance(data, str):
+        yield data
+
+
+class CompactionReport:
+    """リクエストごとの圧縮前後のバイト数・概算トークン数を記録する。"""
+
+    def __init__(self):
+        self.rows: List[Dict[str, Any]] = []
+
+    def add(self, key: str, before: str, after: str, compacted: CompactedData):
+        self.rows.append({
+            "key": key,
+            "bytes_before": len(before.encode("utf-8")),
+            "bytes_after": len(after.encode("utf-8")),
+            "tokens_before": estimate_tokens(before),
+            "tokens_after": estimate_tokens(after),
+            "dropped_sections": compacted.dropped_sections,
+            "truncated_to": compacted.truncated_to,
+            "over_budget": compacted.over_budget,
+        })
+
+    def over_budget_keys(self) -> List[str]:
+        return [row["key"] for row in self.rows if row["over_budget"]]
+
+    def totals(self) -> Dict[str, Any]:
+        totals = {
+            name: sum(row[name] for row in self.rows)
+            for name in ("bytes_before", "bytes_after", "tokens_before", "tokens_after")
+        }
+        totals["requests"] = len(self.rows)
+        totals["over_budget"] = len(self.over_budget_keys())
+        if totals["tokens_before"]:
+            totals["token_reduction"] = round(1 - totals["tokens_after"] / totals["tokens_before"], 4)
+        return totals
+
+    def save(self, report_file: Path):
+        with open(report_file, 'w', encoding='utf-8') as f:
+            json.dump({"totals": self.totals(), "requests": self.rows}, f, ensure_ascii=False, indent=2)
+
+    def print_summary(self):
+        totals = self.totals()
+        if not self.rows:
+            return
+        print(
+            f"圧縮: {totals['bytes_before']:,} → {totals['bytes_after']:,} bytes、"
+            f"概算 {totals['tokens_before']:,} → {totals['tokens_after']:,} tokens "
+            f"({totals.get('token_reduction', 0):.1%} 削減)"
+        )
@@ -0,0 +1,216 @@
+import argparse
+import hashlib
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import config
+import instrumentation
+
+CACHE_DIR = config.RESPONSE_CACHE
+STATS_FILE = CACHE_DIR / "_stats.json"
+COUNTERS = ("hits", "misses", "stored", "evicted")
+
+
+def prompt_key(model: str, prompt: str) -> str:
+    """(モデル名, 展開済みプロンプト) から キャッシュキーを作る。"""
+    return hashlib.sha256(f"{model}\0{prompt}".encode("utf-8")).hexdigest()
+
+
+def request_prompt(request: Dict[str, Any]) -> str:
+    """バッチリクエスト1件 ({"key", "request"}) からプロンプト本文を取り出す。"""
+    contents = request.get("request", {}).get("contents", [])
+    return "".join(
+        part.get("text", "")
+        for content in contents
+        for part in content.get("parts", [])
+    )
+
+
+def batch_result_line(key: str, text: str) -> Dict[str, Any]:
+    """キャッシュ済みの応答を、Gemini のバッチ結果と同じ形式の1行にする。"""
+    return {
+        "key": key,
+        "response": {"candidates": [{"content": {"parts": [{"text": text}]}}]},
+    }
+
+
+class ResponseCache:
+    """
+    Gemini の応答をプロンプトのハッシュで保存するキャッシュ。
+
+    1エントリ1ファイル（{キー先頭2文字}/{キー}.json）で保存し、
+    max_age_days より古いものと、合計サイズが max_bytes を超えた分の古いものから削除する。
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path = CACHE_DIR,
+        max_bytes: Optional[int] = None,
+        max_age_days: Optional[float] = None,
+    ):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        self.stats = dict.fromkeys(COUNTERS, 0)
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def _expired(self, mtime: float) -> bool:
+        return self.max_age_days is not None and time.time() - mtime > self.max_age_days * 86400
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            if self._expired(path.stat().st_mtime):
+                raise FileNotFoundError(path)
+            with open(path, 'r', encoding='utf-8') as f:
+                text = json.load(f)["text"]
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return text
+
+    def put(self, key: str, text: str, model: str = config.GEMINI_MODEL):
+        """応答を保存する。同じキーがあれば置き換える（壊れた応答を後から正しいものにできるように）。"""
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"model": model, "created_at": time.time(), "text": text}, f, ensure_ascii=False)
+        tmp_path.replace(path)
+        self.stats["stored"] += 1
+
+    def discard(self, key: str):
+        """検証に失敗した応答を消し、次回のリクエスト作成でキャッシュミスとして再送させる。"""
+        self._path(key).unlink(missing_ok=True)
+
+    def _entries(self) -> List[Tuple[float, int, Path]]:
+        entries = []
+        for path in self.cache_dir.glob("??/*.json"):
+            stat = path.stat()
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return sorted(entries)
+
+    def evict(self) -> int:
+        """期限切れのエントリと、容量を超えた分の古いエントリを削除し、削除件数を返す。"""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for mtime, size, path in entries:
+            over_size = self.max_bytes is not None and total > self.max_bytes
+            if not (over_size or self._expired(mtime)):
+                continue
+            path.unlink()
+            total -= size
+            removed += 1
+        self.stats["evicted"] += removed
+        return removed
+
+    def export_stats(self, stats_file: Path = STATS_FILE) -> Dict[str, Any]:
+        """
+        このプロセスのヒット・ミス数などを、既存の統計ファイルの累計に加えて書き出す。
+        今回の分は last_run に残し、書き出した後はカウンターを0に戻す（二重に加算しない）。
+        """
+        previous: Dict[str, Any] = {}
+        if stats_file.exists():
+            try:
+                with open(stats_file, 'r', encoding='utf-8') as f:
+                    previous = json.load(f)
+            except json.JSONDecodeError:
+                previous = {}
+        stats = {name: previous.get(name, 0) + self.stats[name] for name in COUNTERS}
+        lookups = stats["hits"] + stats["misses"]
+        entries = self._entries()
+        stats.update({
+            "hit_rate": round(stats["hits"] / lookups, 4) if lookups else None,
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+            "last_run": dict(self.stats),
+            "exported_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        })
+        stats_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = stats_file.with_suffix(".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(stats, f, ensure_ascii=False, indent=2)
+        tmp_path.replace(stats_file)
+        self.stats = dict.fromkeys(COUNTERS, 0)
+        return stats
+
+
+def partition_requests(
+    request_list: List[Dict[str, Any]],
+    cache: ResponseCache,
+    model: str = config.GEMINI_MODEL,
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    リクエストをキャッシュ未登録のもの（送信が必要）と、
+    キャッシュ済みの応答をバッチ結果形式にしたものに分ける。
+    """
+    misses = []
+    cached_results = []
+    for request in request_list:
+        text = cache.get(prompt_key(model, request_prompt(request)))
+        if text is None:
+            misses.append(request)
+        else:
+            cached_results.append(batch_result_line(request["key"], text))
+    return misses, cached_results
+
+
+def cached_results_file(request_file: Path) -> Path:
+    """キャッシュから復元した結果の保存先。3_gemini_batch_to_files.py --input で分割できる。"""
+    return config.RAW_RESPONSES / f"{request_file.stem}_cached.jsonl"
+
+
+def drop_cached_requests(
+    request_list: List[Dict[str, Any]],
+    request_file: Path,
+    cache: Optional[ResponseCache] = None,
+) -> List[Dict[str, Any]]:
+    """
+    リクエスト作成スクリプトの「未キャッシュ分のみ」モード用。
+    キャッシュ済みの応答は cached_results_file() に書き出し、送信が必要なリクエストだけを返す。
+    """
+    cache = cache or ResponseCache()
+    misses, cached_results = partition_requests(request_list, cache)
+    cached_file = cached_results_file(request_file)
+    cached_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(cached_file, 'w', encoding='utf-8') as f:
+        for result in cached_results:
+            f.write(json.dumps(result, ensure_ascii=False) + "\n")
+    cache.export_stats()
+    print(f"キャッシュ済み {len(cached_results)}件を {cached_file} に書き出しました")
+    return misses
+
+
+def load_prompt_keys(request_file: Path, model: str = config.GEMINI_MODEL) -> Dict[str, str]:
+    """リクエスト JSONL を1行ずつ読み、{リクエストのkey: キャッシュキー} を返す。"""
+    prompt_keys = {}
+    with open(request_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                request = json.loads(line)
+                prompt_keys[request["key"]] = prompt_key(model, request_prompt(request))
+    return prompt_keys
+
+
+@instrumentation.instrumented("response_cache", outputs=[STATS_FILE])
+def main():
+    parser = argparse.ArgumentParser(description="Gemini 応答キャッシュの整理と統計の出力")
+    parser.add_argument("--max-mb", type=float, default=None, help="キャッシュの最大容量(MB)")
+    parser.add_argument("--max-age-days", type=float, default=None, help="この日数より古い応答を削除")
+    args = parser.parse_args()
+
+    max_bytes = int(args.max_mb * 1024 * 1024) if args.max_mb is not None else None
+    cache = ResponseCache(max_bytes=max_bytes, max_age_days=args.max_age_days)
+    removed = cache.evict()
+    stats = cache.export_stats()
+    print(f"{removed}件を削除しました。残り {stats['entries']}件 / {stats['bytes']:,} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+import argparse
+import json
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import config
+import instrumentation
+import parallel
+
+# プロンプトに添付している出力スキーマ（値が説明文になっている「記入例」形式）
+SCHEMA_FILES = {
+    "varieties_detail": config.PROMPTS_DIR / "2_varieties_details" / "2_schema.json",
+    "varieties_summary": config.PROMPTS_DIR / "5_varieties_summary" / "2_schema.json",
+    "final_variety": config.PROMPTS_DIR / "5_varieties_summary" / "final_variety_schema.json",
+}
+
+# 後段のスクリプトが参照する必須項目（それ以外は、あれば型だけを検査する）
+REQUIRED_PATHS = {
+    "varieties_detail": [
+        "variety_profile.url",
+        "variety_profile.display_name",
+        "variety_profile.kana_name",
+        "variety_profile.parent_species_url",
+    ],
+    "varieties_summary": [
+        "content.ja.display_name",
+        "content.ja.oneliner",
+        "content.ja.description",
+    ],
+    "final_variety": [
+        "global_info.url",
+        "global_info.kana_name",
+        "content.ja.display_name",
+        "content.ja.oneliner",
+    ],
+}
+
+# 検証エラーの記録先（3_gemini_batch_retry.py が再送するキーの一覧）
+RETRY_DIR = config.RAW_RESPONSES
+
+
+# 検査の種類
+DICT = "dict"
+LIST = "list"
+VALUE = "value"
+
+
+class CompiledSchema:
+    """
+    記入例形式のスキーマを、(パス, 検査の種類, 必須か) の平らな検査リストに一度だけ変換したもの。
+
+    - 記入例が dict の項目は dict、list の項目は list、文字列の項目は dict 以外の値であること
+    - required のパスとその親は、値があること（None・空文字は欠落とみなす）
+    - list の記入例の先頭が dict の場合は、各要素に同じ検査を行う
+    """
+
+    def __init__(self, name: str, checks: List[Tuple[Tuple[str, ...], str, bool, Optional["CompiledSchema"]]]):
+        self.name = name
+        self.checks = checks
+
+    @classmethod
+    def compile(cls, name: str, example: Dict[str, Any], required: Iterable[str] = ()) -> "CompiledSchema":
+        required_paths = set()
+        for dotted in required:
+            path = tuple(dotted.split("."))
+            required_paths.update(path[:i] for i in range(1, len(path) + 1))
+        checks = []
+        cls._compile_into(name, example, (), required_paths, checks)
+        missing = {".".join(path) for path in required_paths} - {".".join(c[0]) for c in checks}
+        if missing:
+            raise ValueError(f"{name}: スキーマにない必須項目があります: {sorted(missing)}")
+        return cls(name, checks)
+
+    @classmethod
+    def _compile_into(cls, name: str, example: Dict[str, Any], prefix: Tuple[str, ...], required_paths: set, checks: list):
+        for key, value in example.items():
+            path = prefix + (key,)
+            required = path in required_paths
+            if isinstance(value, dict):
+                checks.append((path, DICT, required, None))
+                cls._compile_into(name, value, path, required_paths, checks)
+            elif isinstance(value, list):
+                item_schema = None
+                if value and isinstance(value[0], dict):
+                    item_schema = cls.compile(name, value[0])
+                checks.append((path, LIST, required, item_schema))
+            else:
+                checks.append((path, VALUE, required, None))
+
+    def validate(self, data: Any, prefix: str = "") -> List[str]:
+        """エラーを「パス: 内容」の形で返す。問題がなければ空のリスト。"""
+        if not isinstance(data, dict):
+            return [f"{prefix.rstrip('.') or '$'}: オブジェクトではありません ({type(data).__name__})"]
+        errors = []
+        broken = set()  # 親が欠落・型違いのパスは、子の検査を省く
+        for path, kind, required, item_schema in self.checks:
+            if any(path[:i] in broken for i in range(1, len(path))):
+                broken.add(path)
+                continue
+            parent = data
+            for key in path[:-1]:
+                parent = parent[key]
+            dotted = prefix + ".".join(path)
+            value = parent.get(path[-1])
+
+            if value is None or value == "":
+                if required:
+                    errors.append(f"{dotted}: 必須項目がありません")
+                broken.add(path)
+            elif kind == DICT and not isinstance(value, dict):
+                errors.append(f"{dotted}: オブジェクトが必要です ({type(value).__name__})")
+                broken.add(path)
+            elif kind == LIST and not isinstance(value, list):
+                errors.append(f"{dotted}: 配列が必要です ({type(value).__name__})")
+            elif kind == LIST and item_schema is not None:
+                for i, item in enumerate(value):
+                    errors.extend(item_schema.validate(item, f"{dotted}[{i}]."))
+            elif kind == VALUE and isinstance(value, dict):
+                errors.append(f"{dotted}: 値が必要です (dict)")
+        return errors
+
+
+@lru_cache(maxsize=None)
+def load_schema(name: str) -> CompiledSchema:
+    """SCHEMA_FILES の名前でスキーマを読み込み、コンパイル済みのものを返す（プロセスごとに1回）。"""
+    with open(SCHEMA_FILES[name], 'r', encoding='utf-8') as f:
+        return CompiledSchema.compile(name, json.load(f), REQUIRED_PATHS.get(name, ()))
+
+
+def retry_list_file(source: Path) -> Path:
+    """検証に失敗したキーの一覧の保存先（バッチ結果やディレクトリの名前から決める）。"""
+    return RETRY_DIR / f"{source.stem}_retry.jsonl"
+
+
+def write_retry_list(retry_file: Path, failures: List[Dict[str, Any]]):
+    """{"key", "schema", "errors"} を1行ずつ書き出す。失敗が無ければ空のファイルになる。"""
+    retry_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(retry_file, 'w', encoding='utf-8') as f:
+        for failure in failures:
+            f.write(json.dumps(failure, ensure_ascii=False) + "\n")
+
+
+# ワーカーごとに init_worker() で設定する
+_schema: Optional[CompiledSchema] = None
+
+
+def init_worker(schema_name: str):
+    global _schema
+    _schema = load_schema(schema_name)
+
+
+def validate_file(file_path: Path) -> Tuple[str, List[str]]:
+    """1ファイルを検証し、(ファイル名, エラー) を返す。"""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except json.JSONDecodeError as e:
+        return file_path.name, [f"$: JSON として読めません: {e}"]
+    return file_path.name, _schema.validate(data)
+
+
+@instrumentation.instrumented("schema_validation", outputs=[RETRY_DIR])
+def main(schema_name: str, input_dir: Path, workers: int = 1):
+    """ディレクトリ内の JSON をワーカーで並列に検証し、失敗したものを再送リストに書き出す。"""
+    files = sorted(input_dir.glob("*.json"))
+    print(f"{len(files)}件を {schema_name} のスキーマで検証します")
+
+    failures = []
+    results = parallel.imap_bounded(
+        validate_file, files, workers, initializer=init_worker, initargs=(schema_name,),
+    )
+    for key, errors in results:
+        if errors:
+            failures.append({"key": key, "schema": schema_name, "errors": errors})
+            print(f"❌ {key}")
+            for error in errors:
+                print(f"    {error}")
+
+    retry_file = retry_list_file(input_dir)
+    write_retry_list(retry_file, failures)
+    print(f"{len(files) - len(failures)}件が正常、{len(failures)}件が不正（{retry_file}）")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="生成データを出力スキーマで検証する")
+    parser.add_argument("schema", choices=sorted(SCHEMA_FILES), help="スキーマ名")
+    parser.add_argument("input_dir", type=Path, help="検証する JSON のディレクトリ")
+    parallel.add_arguments(parser)
+    args = parser.parse_args()
+    main(args.schema, args.input_dir, workers=args.workers)
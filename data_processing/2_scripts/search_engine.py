@@ -0,0 +1,240 @@
+import bisect
+import json
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from corpus_model import GlobalInfo
+from search_index import normalize_key, vegetable_search_terms
+
+# 検索キーの種類ごとの重み（表示名・ID に一致するほど上位にする）
+FIELD_WEIGHTS = {
+    "name": 1.0,        # ID、表示名、カナ名
+    "alias": 0.9,       # 和名の別名、料理の別名
+    "english": 0.8,     # 英名
+    "scientific": 0.7,  # 学名
+}
+# 一致の種類ごとの基本点
+EXACT_SCORE = 3.0
+PREFIX_SCORE = 2.0
+FUZZY_SCORE = 1.0
+
+NGRAM = 2
+
+
+def ngrams(term: str, n: int = NGRAM) -> List[str]:
+    """先頭・末尾の印を付けた n-gram（短い日本語の名前でも1つ以上できる）。"""
+    padded = f"^{term}$"
+    return [padded[i:i + n] for i in range(len(padded) - n + 1)]
+
+
+def max_distance(query: str) -> int:
+    """検索語の長さに応じて許す編集距離（短い語ほど厳しくする）。"""
+    if len(query) <= 2:
+        return 0
+    if len(query) <= 5:
+        return 1
+    return 2
+
+
+def bounded_levenshtein(a: str, b: str, limit: int) -> Optional[int]:
+    """編集距離が limit 以下ならその値、超える場合は途中で打ち切って None を返す。"""
+    if abs(len(a) - len(b)) > limit:
+        return None
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        row_min = i
+        for j, cb in enumerate(b, 1):
+            cost = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            current.append(cost)
+            row_min = min(row_min, cost)
+        if row_min > limit:
+            return None
+        previous = current
+    return previous[-1] if previous[-1] <= limit else None
+
+
+@dataclass
+class SearchDocument:
+    id: str
+    type: str          # vegetable / dish
+    display_name: str
+
+
+@dataclass
+class SearchResult:
+    id: str
+    type: str
+    display_name: str
+    matched: str       # 一致した検索キー（正規化済み）
+    match: str         # exact / prefix / fuzzy
+    score: float
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "type": self.type,
+            "display_name": self.display_name,
+            "matched": self.matched,
+            "match": self.match,
+            "score": round(self.score, 4),
+        }
+
+
+class SearchEngine:
+    """
+    野菜と料理の名前・別名・英名・学名を対象にした検索エンジン。
+
+    - 正規化済みの検索キー（term）をソートして持ち、完全一致・前方一致は二分探索で引く。
+    - term の n-gram の転置リストで候補を絞り、上限付きの編集距離で表記ゆれ・誤字を拾う。
+    - 文書ごとに最も良い一致の点数（一致の種類 × キーの種類の重み）で並べる。
+    """
+
+    def __init__(self):
+        self.documents: List[SearchDocument] = []
+        self.terms: List[str] = []
+        # term の添字 → [(文書の添字, 重み)]
+        self.postings: List[List[Tuple[int, float]]] = []
+        # n-gram → term の添字のリスト
+        self.grams: Dict[str, List[int]] = {}
+
+    @classmethod
+    def build(cls, entries: Iterable[Tuple[SearchDocument, Iterable[Tuple[str, str]]]]) -> "SearchEngine":
+        """(文書, [(検索キー, キーの種類)]) の並びから索引を作る。"""
+        engine = cls()
+        term_postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        for document, keys in entries:
+            doc_no = len(engine.documents)
+            engine.documents.append(document)
+            for key, field_name in keys:
+                term = normalize_key(key)
+                if term:
+                    weight = FIELD_WEIGHTS[field_name]
+                    postings = term_postings[term]
+                    postings[doc_no] = max(weight, postings.get(doc_no, 0.0))
+
+        engine.terms = sorted(term_postings)
+        engine.postings = [sorted(term_postings[term].items()) for term in engine.terms]
+        grams: Dict[str, List[int]] = defaultdict(list)
+        for term_no, term in enumerate(engine.terms):
+            for gram in set(ngrams(term)):
+                grams[gram].append(term_no)
+        engine.grams = dict(grams)
+        return engine
+
+    @classmethod
+    def from_app_data(cls, data_dir: Path) -> "SearchEngine":
+        """5_app_data と同じ構成のディレクトリから、野菜（vegetable_summary）と料理（dish_data）を索引する。"""
+        entries = []
+        for file_path in sorted((data_dir / "vegetable_summary").glob("*.json")):
+            with open(file_path, 'r', encoding='utf-8') as f:
+                entries.append(vegetable_entry(file_path.stem, json.load(f)))
+        for file_path in sorted((data_dir / "dish_data").glob("*.json")):
+            with open(file_path, 'r', encoding='utf-8') as f:
+                entries.append(dish_entry(file_path.stem, json.load(f)))
+        return cls.build(entries)
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def search(self, query: str, limit: int = 20, fuzzy: bool = True) -> List[SearchResult]:
+        query = normalize_key(query)
+        if not query:
+            return []
+
+        # 文書の添字 → (点数, 一致した term, 一致の種類)
+        best: Dict[int, Tuple[float, str, str]] = {}
+
+        def add(term_no: int, base: float, match: str):
+            term = self.terms[term_no]
+            for doc_no, weight in self.postings[term_no]:
+                score = base * weight
+                if doc_no not in best or score > best[doc_no][0]:
+                    best[doc_no] = (score, term, match)
+
+        # 完全一致・前方一致（短い term ほど検索語に近いので少し高くする）
+        start = bisect.bisect_left(self.terms, query)
+        for term_no in range(start, len(self.terms)):
+            term = self.terms[term_no]
+            if not term.startswith(query):
+                break
+            if term == query:
+                add(term_no, EXACT_SCORE, "exact")
+            else:
+                add(term_no, PREFIX_SCORE + len(query) / len(term) * 0.5, "prefix")
+
+        limit_distance = max_distance(query)
+        if fuzzy and limit_distance:
+            for term_no, distance in self._fuzzy_terms(query, limit_distance):
+                add(term_no, FUZZY_SCORE - distance / (len(query) + 1), "fuzzy")
+
+        ranked = sorted(
+            best.items(),
+            key=lambda item: (-item[1][0], len(self.documents[item[0]].display_name), self.documents[item[0]].id),
+        )
+        return [
+            SearchResult(
+                id=self.documents[doc_no].id,
+                type=self.documents[doc_no].type,
+                display_name=self.documents[doc_no].display_name,
+                matched=term,
+                match=match,
+                score=score,
+            )
+            for doc_no, (score, term, match) in ranked[:limit]
+        ]
+
+    def _fuzzy_terms(self, query: str, limit_distance: int) -> List[Tuple[int, int]]:
+        """
+        n-gram を共有する数で候補を絞ってから、編集距離を計算する。
+        1回の編集で壊れる bigram は最大2つなので、共有数が (bigram 数 - 2×距離) 未満の term は候補にしない。
+        """
+        query_grams = set(ngrams(query))
+        min_shared = max(1, len(query_grams) - NGRAM * limit_distance)
+        shared: Dict[int, int] = defaultdict(int)
+        for gram in query_grams:
+            for term_no in self.grams.get(gram, ()):
+                shared[term_no] += 1
+
+        results = []
+        for term_no, count in shared.items():
+            if count < min_shared:
+                continue
+            term = self.terms[term_no]
+            if term == query:
+                continue
+            distance = bounded_levenshtein(query, term, limit_distance)
+            if distance is not None:
+                results.append((term_no, distance))
+        return results
+
+
+def vegetable_entry(item_id: str, veg_data: Dict[str, Any]) -> Tuple[SearchDocument, List[Tuple[str, str]]]:
+    """野菜の概要データから、文書と検索キーを作る（_index.json と同じ検索キー + 英名・学名）。"""
+    global_info = GlobalInfo.from_dict(veg_data.get("global_info"))
+    content = (veg_data.get("content") or {}).get("ja") or {}
+    display_name = content.get("display_name") or item_id
+
+    keys = [(item_id, "name")] + vegetable_search_terms(global_info, content)
+    keys += [(name, "english") for name in global_info.names.common("en")]
+    if global_info.scientific_name:
+        keys.append((global_info.scientific_name, "scientific"))
+    return SearchDocument(id=item_id, type="vegetable", display_name=display_name), keys
+
+
+def dish_entry(item_id: str, dish_data: Dict[str, Any]) -> Tuple[SearchDocument, List[Tuple[str, str]]]:
+    """料理データの entry_metadata から、文書と検索キー（料理名・現地名・英名・別名）を作る。"""
+    metadata = dish_data.get("entry_metadata", {})
+    display_name = metadata.get("concept_name_ja", "") or item_id
+    aliases = metadata.get("aliases", {})
+
+    keys = [(display_name, "name")]
+    if metadata.get("concept_name_local"):
+        keys.append((metadata["concept_name_local"], "alias"))
+    if metadata.get("concept_name_en"):
+        keys.append((metadata["concept_name_en"], "english"))
+    keys += [(name, "alias") for name in aliases.get("ja", []) + aliases.get("local", [])]
+    keys += [(name, "english") for name in aliases.get("en", [])]
+    return SearchDocument(id=item_id, type="dish", display_name=display_name), keys
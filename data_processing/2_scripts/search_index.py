@@ -0,0 +1,126 @@
+import bisect
+import re
+import unicodedata
+from typing import Any, Dict, Iterable, List, Tuple
+
+from corpus_model import GlobalInfo
+
+# カタカナ(ァ〜ヶ) → ひらがな(ぁ〜ゖ)
+_KATAKANA_TO_HIRAGANA = {code: code - 0x60 for code in range(0x30A1, 0x30F7)}
+# 検索時に無視する区切り文字
+_IGNORED_CHARS = {ord(ch): None for ch in " 　・･-‐_"}
+# 表示名の読み・補足の括弧（「明日葉（あしたば）」）
+_PARENTHESIS_START = re.compile(r"[(（]")
+
+
+def normalize_key(text: str) -> str:
+    """
+    検索キーを正規化する。
+
+    - 全角/半角の統一 (NFKC): ｶﾌﾞ → カブ、Ｔｏｍａｔｏ → Tomato
+    - 大文字/小文字の統一 (casefold)
+    - カタカナ → ひらがな: カブ → かぶ
+    - 空白・中黒などの区切り文字を除去
+    """
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return text.translate(_KATAKANA_TO_HIRAGANA).translate(_IGNORED_CHARS)
+
+
+def strip_parenthesis(display_name: str) -> str:
+    """表示名の最初の括弧（全角・半角）より前の部分。"""
+    return _PARENTHESIS_START.split(display_name, 1)[0].strip()
+
+
+def vegetable_search_terms(global_info: GlobalInfo, content: Dict[str, Any], lang: str = "ja") -> List[Tuple[str, str]]:
+    """
+    野菜の global_info と content.<言語> から (検索キー, 種類) のリストを作る。
+    _index.json（6_index_generator.py）と /api/search（search_engine.py）の両方がこれを使う。
+    種類は name（ID・表示名・カタカナ名）と alias（その言語の別名）。
+    """
+    terms = [
+        (global_info.url, "name"),
+        (strip_parenthesis(content.get("display_name") or ""), "name"),
+        (global_info.kana_name, "name"),
+    ]
+    terms += [(name, "alias") for name in global_info.names.common(lang)]
+    return [(key, kind) for key, kind in terms if key]
+
+
+class SearchIndex:
+    """
+    正規化済みキーのソート済み配列と、キー → 野菜ID の転置リスト。
+
+    キーは二分探索できるので、完全一致・前方一致とも O(log n + 件数) で引ける。
+    JSON では keys[i] の該当IDが postings[i]（ids への添字のリスト）になる。
+    """
+
+    def __init__(self, keys: List[str], postings: List[List[int]], ids: List[str]):
+        self.keys = keys
+        self.postings = postings
+        self.ids = ids
+
+    @classmethod
+    def build(cls, entries: Iterable[Tuple[str, Iterable[str]]]) -> "SearchIndex":
+        """(野菜ID, 検索キーのリスト) の並びから索引を作る。"""
+        ids: List[str] = []
+        key_to_items: Dict[str, set] = {}
+        for item_id, search_keys in sorted(entries, key=lambda entry: entry[0]):
+            item_no = len(ids)
+            ids.append(item_id)
+            for key in search_keys:
+                normalized = normalize_key(key)
+                if normalized:
+                    key_to_items.setdefault(normalized, set()).add(item_no)
+        keys = sorted(key_to_items)
+        return cls(keys, [sorted(key_to_items[key]) for key in keys], ids)
+
+    def lookup(self, query: str, limit: int = 20) -> List[str]:
+        """完全一致、前方一致の順に野菜IDを返す。"""
+        prefix = normalize_key(query)
+        if not prefix:
+            return []
+        results: List[str] = []
+        seen = set()
+        start = bisect.bisect_left(self.keys, prefix)
+        for i in range(start, len(self.keys)):
+            if not self.keys[i].startswith(prefix):
+                break
+            for item_no in self.postings[i]:
+                if item_no not in seen:
+                    seen.add(item_no)
+                    results.append(self.ids[item_no])
+                    if len(results) >= limit:
+                        return results
+        return results
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"version": 1, "ids": self.ids, "keys": self.keys, "postings": self.postings}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SearchIndex":
+        return cls(data["keys"], data["postings"], data["ids"])
+
+
+# 分割インデックスのシャード名（正規化後の先頭文字で決める）
+_KANA_ROWS = {
+    "a": "ぁあぃいぅうぇえぉおゔ",
+    "ka": "かがきぎくぐけげこごゕゖ",
+    "sa": "さざしじすずせぜそぞ",
+    "ta": "ただちぢっつづてでとど",
+    "na": "なにぬねの",
+    "ha": "はばぱひびぴふぶぷへべぺほぼぽ",
+    "ma": "まみむめも",
+    "ya": "ゃやゅゆょよ",
+    "ra": "らりるれろ",
+    "wa": "ゎわゐゑをん",
+}
+SHARD_BY_CHAR = {ch: row for row, chars in _KANA_ROWS.items() for ch in chars}
+SHARD_BY_CHAR.update({ch: "latin" for ch in "abcdefghijklmnopqrstuvwxyz0123456789"})
+DEFAULT_SHARD = "other"
+
+
+def shard_name(normalized_key: str) -> str:
+    """正規化済みキーの先頭文字から、シャード名（あ行なら "a"、英数字なら "latin"）を返す。"""
+    if not normalized_key:
+        return DEFAULT_SHARD
+    return SHARD_BY_CHAR.get(normalized_key[0], DEFAULT_SHARD)
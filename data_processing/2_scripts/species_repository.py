@@ -0,0 +1,58 @@
+import json
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from corpus_model import GlobalInfo, read_record
+
+
+class SpeciesRepository:
+    """
+    品目(species)データを url 単位で読み込み、キャッシュするクラス。
+
+    品種は必ず親品目を参照するため、同じ品目ファイルが何十回も読まれる。
+    初回アクセス時にだけファイルを読み、以降はキャッシュから返す。
+    max_cached を指定すると、最近使われた順に最大件数まで保持する（LRU）。
+    数MBになる detail ファイル用。None なら無制限（summary 用）。
+
+    get() が返す辞書はキャッシュと共有されるため、呼び出し側で変更しないこと。
+    get_global_info() は global_info だけを読み、content はキャッシュに残さない。
+    """
+
+    def __init__(self, base_dir: Path, max_cached: Optional[int] = None):
+        self.base_dir = base_dir
+        self._get_text = lru_cache(maxsize=max_cached)(self._read_text)
+        self._get = lru_cache(maxsize=max_cached)(self._load)
+        self._get_global_info = lru_cache(maxsize=max_cached)(self._load_global_info)
+
+    def get_text(self, url: str) -> str:
+        """品目ファイルの生テキストを返す（プロンプトへの埋め込み用）。"""
+        return self._get_text(url)
+
+    def get(self, url: str) -> Dict[str, Any]:
+        """品目ファイルをパースした辞書を返す。"""
+        return self._get(url)
+
+    def get_global_info(self, url: str) -> GlobalInfo:
+        return self._get_global_info(url)
+
+    def cache_info(self) -> Dict[str, Any]:
+        """キャッシュのヒット率確認用。"""
+        return {
+            "text": self._get_text.cache_info(),
+            "json": self._get.cache_info(),
+            "global_info": self._get_global_info.cache_info(),
+        }
+
+    def _path(self, url: str) -> Path:
+        return self.base_dir / f"{url}.json"
+
+    def _read_text(self, url: str) -> str:
+        return self._path(url).read_text(encoding="utf-8")
+
+    def _load(self, url: str) -> Dict[str, Any]:
+        with open(self._path(url), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _load_global_info(self, url: str) -> GlobalInfo:
+        return read_record(self._path(url)).global_info or GlobalInfo()
@@ -0,0 +1,87 @@
+"""
+データ処理の各スクリプトを1つのコマンドから実行する。
+
+    python vegitage.py <コマンド> [スクリプトの引数...]
+    python vegitage.py run --dry-run        # pipeline.py（変更のあったステージだけを実行）
+    python vegitage.py index --shards       # 6_index_generator.py --shards と同じ
+
+起動を速くするため、ここでは標準ライブラリ以外を import しない。
+選ばれたスクリプトだけを読み込み、API キーの確認と SDK の読み込みは API を呼び出すコマンドでだけ行う。
+"""
+import os
+import sys
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# コマンド → (スクリプト, 説明, Gemini API を呼び出すか)。ステージ名は pipeline.STAGES と同じ
+COMMANDS = {
+    "run": ("pipeline.py", "変更のあったステージだけを依存順に実行する", False),
+    "wikitext_extract": ("extract_vegetables_from_wikitext.py", "Wikipedia の野菜一覧から野菜リストを作る", False),
+    "variety_details_jsonl": ("1_variety_details_jsonl_create.py", "品種詳細のバッチリクエストを作る", False),
+    "variety_summary_jsonl": ("1_variety_summary_jsonl_create.py", "品種 summary のバッチリクエストを作る", False),
+    "gemini_batch": ("2_gemini_batch_create.py", "Gemini バッチジョブを投入・回収する", True),
+    "batch_to_files": ("3_gemini_batch_to_files.py", "バッチ結果を個別の JSON ファイルに分割する", False),
+    "gemini_retry": ("3_gemini_batch_retry.py", "失敗・欠落したキーだけを再送する", True),
+    "data_cleansing": ("4_gemini_batch_data_cleansing.py", "エラーになった品目詳細の JSON を修復して戻す", False),
+    "species_processing": ("5_species_processing.py", "品目データを url 名のファイルに整理する", False),
+    "variety_detail": ("5_variety_detail.py", "品種の詳細データを url 名のファイルに整理する", False),
+    "variety_summary": ("5_variety_summary.py", "品種の summary を最終形式に組み立てる", False),
+    "index": ("6_index_generator.py", "vegetable_summary から _index.json を作る", False),
+    "graph": ("6_relationship_graph.py", "野菜・品種・料理・地域の関係グラフを作る", False),
+    "dish_facets": ("6_dish_facet_index.py", "料理の絞り込み用索引を作る", False),
+    "package": ("7_app_data_packager.py", "5_app_data を配信用にパッケージ化する", False),
+    "sqlite_export": ("7_sqlite_export.py", "全文検索付きの SQLite データベースを作る", False),
+    "publish": ("8_delta_publish.py", "内容ハッシュ付きで公開し、前回からの差分をまとめる", False),
+    "validate": ("schema_validation.py", "生成データを出力スキーマで検証する", False),
+    "cache": ("response_cache.py", "Gemini 応答キャッシュの整理と統計", False),
+    "bench": ("benchmark.py", "合成データで各ステージを計測する", False),
+    "bench_corpus": ("benchmark_corpus.py", "ベンチマーク用の合成データを作る", False),
+}
+
+
+def usage() -> str:
+    width = max(len(name) for name in COMMANDS)
+    lines = [
+        "使い方: python vegitage.py <コマンド> [引数...]",
+        "各コマンドの引数は python vegitage.py <コマンド> --help で表示します。",
+        "",
+        "コマンド:",
+    ]
+    for name, (script, description, online) in COMMANDS.items():
+        mark = "（API）" if online else ""
+        lines.append(f"  {name:<{width}}  {description}{mark}  [{script}]")
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ("-h", "--help", "help"):
+        print(usage())
+        return 0
+
+    command, *args = argv
+    if command not in COMMANDS:
+        print(f"不明なコマンド: {command}\n", file=sys.stderr)
+        print(usage(), file=sys.stderr)
+        return 2
+
+    script, _, online = COMMANDS[command]
+    if online and not {"-h", "--help"} & set(args):
+        # 入力の読み込みや分割を始める前に、キーがないことを知らせる
+        import config
+        try:
+            config.require_api_key("GOOGLE_API_KEY")
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 1
+
+    # スクリプトを直接実行したときと同じように、__main__ として実行する（引数はそのまま渡す）
+    import runpy
+    path = os.path.join(SCRIPT_DIR, script)
+    sys.argv = [path, *args]
+    runpy.run_path(path, run_name="__main__")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())